@@ -0,0 +1,83 @@
+"""
+Benchmark: restoring a page item by item vs. the batched Tcl path.
+
+Run from the project root (needs a display):
+    python benchmarks/bench_batch_restore.py [element_count]
+"""
+import os
+import random
+import sys
+import time
+import tkinter as tk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.batch_renderer import BatchRenderer
+
+
+def make_elements(count):
+    """Generate brush segments in the FileManager element format"""
+    random.seed(1)
+    elements = []
+    x, y = 400.0, 300.0
+    for _ in range(count):
+        nx, ny = x + random.uniform(-8, 8), y + random.uniform(-8, 8)
+        elements.append({
+            "type": "line",
+            "points": [x, y, nx, ny],
+            "color": "black",
+            "width": 5,
+            "smooth": True
+        })
+        x, y = nx, ny
+    return elements
+
+
+def restore_loop(canvas, elements):
+    """The original per-element restore loop"""
+    for element in elements:
+        canvas.create_line(
+            element["points"],
+            fill=element["color"],
+            width=element["width"],
+            smooth=element["smooth"],
+            capstyle=tk.ROUND,
+            joinstyle=tk.ROUND
+        )
+
+
+def time_it(label, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed * 1000:8.1f} ms")
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    elements = make_elements(count)
+
+    root = tk.Tk()
+    canvas = tk.Canvas(root, width=800, height=600)
+    canvas.pack()
+    renderer = BatchRenderer(canvas)
+
+    print(f"Restoring {count} line elements")
+    loop_time = time_it("per-element create_line", lambda: restore_loop(canvas, elements))
+    canvas.delete("all")
+    batch_time = time_it("single batched eval", lambda: renderer.render(elements))
+    canvas.delete("all")
+
+    def chunked():
+        renderer.render(elements, chunk_size=BatchRenderer.DEFAULT_CHUNK_SIZE)
+        root.update()
+
+    time_it("chunked batched eval", chunked)
+
+    print(f"Speedup (single batch): {loop_time / batch_time:.1f}x")
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark: file size vs. save and load time for each board format and codec level.
+
+Compares the plain .wb format (as written before page-by-page saving, and
+as written now), a whole-file gzip .wb, the .wbz container with every
+zlib level (and a range of zstd levels when the zstandard package is
+installed), and the uncompressed, memory-mapped "none" archive. Load
+times are for reading the whole board, for the first page arriving while
+loading, and for reading one page in the middle on its own.
+
+Run from the project root (no display needed):
+    python benchmarks/bench_compression.py [pages] [strokes_per_page]
+"""
+import gzip
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.board_container import BoardContainer, available_codecs, write_container
+from modules.board_reader import BOARD_VERSION, load_board, stream_board
+from modules.board_stream import write_board
+
+CODEC_LEVELS = {"zlib": [1, 3, 6, 9], "zstd": [1, 3, 9, 19], "none": [0]}
+
+
+def make_board(page_count, strokes):
+    """Pages of random-walk pen strokes, 20 segments each, in the FileManager element format"""
+    random.seed(1)
+    pages = []
+    for _ in range(page_count):
+        elements = []
+        for stroke in range(strokes):
+            x, y = random.uniform(0, 1600), random.uniform(0, 900)
+            for _ in range(20):
+                nx, ny = round(x + random.uniform(-8, 8), 1), round(y + random.uniform(-8, 8), 1)
+                elements.append({"type": "line", "points": [x, y, nx, ny], "color": "black",
+                                 "width": 5, "smooth": True, "t": stroke * 400})
+                x, y = nx, ny
+        pages.append({"elements": elements, "background_color": "#FFFFFF"})
+    settings = {"version": BOARD_VERSION, "current_page_index": 0, "is_dark_mode": False, "grid_visible": False}
+    return settings, pages
+
+
+def first_page_time(path):
+    start = time.perf_counter()
+    for message in stream_board(path):
+        if message[0] == "page" and message[1] is not None:
+            return time.perf_counter() - start
+    return float("nan")
+
+
+def random_page_time(path, number):
+    start = time.perf_counter()
+    with BoardContainer(path) as board:
+        board.read_page(number)
+    return time.perf_counter() - start
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    page_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    strokes = int(sys.argv[2]) if len(sys.argv) > 2 else 250
+    settings, pages = make_board(page_count, strokes)
+    directory = tempfile.mkdtemp(prefix="wb_bench_")
+    print(f"{page_count} pages, {page_count * strokes * 20} line segments")
+    print(f"{'format':<22} {'size KB':>10} {'save ms':>9} {'load ms':>9} {'1st page ms':>12} {'1 page ms':>10}")
+
+    def report(label, path, save_time, random_page=None):
+        size = os.path.getsize(path) / 1024
+        load_time = timed(lambda: load_board(path))
+        first = first_page_time(path)
+        single = f"{random_page * 1000:10.1f}" if random_page is not None else f"{'-':>10}"
+        print(f"{label:<22} {size:10.0f} {save_time * 1000:9.1f} {load_time * 1000:9.1f} {first * 1000:12.1f} {single}")
+
+    try:
+        path = os.path.join(directory, "indented.wb")
+        def save_indented():
+            with open(path, "w") as f:
+                json.dump(dict(settings, pages=pages), f, indent=2)
+        report("json indent=2 (old)", path, timed(save_indented))
+
+        path = os.path.join(directory, "plain.wb")
+        def save_plain():
+            with open(path, "w", encoding="utf-8") as f:
+                write_board(f, settings, pages)
+        report("json page by page", path, timed(save_plain))
+
+        for level in (1, 6, 9):
+            path = os.path.join(directory, f"gzip{level}.wb")
+            def save_gzip():
+                with gzip.open(path, "wt", encoding="utf-8", compresslevel=level) as f:
+                    write_board(f, settings, pages)
+            report(f"gzip whole file -{level}", path, timed(save_gzip))
+
+        for codec in available_codecs():
+            for level in CODEC_LEVELS[codec]:
+                path = os.path.join(directory, f"{codec}{level}.wbz")
+                def save_container():
+                    with open(path, "wb") as f:
+                        write_container(f, settings, pages, codec=codec, level=level)
+                save_time = timed(save_container)
+                report(f"wbz {codec} -{level}", path, save_time, random_page_time(path, page_count // 2))
+        if "zstd" not in available_codecs():
+            print("(install the zstandard package to include zstd)")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
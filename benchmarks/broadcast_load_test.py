@@ -0,0 +1,174 @@
+"""
+Load test: one presenter broadcasting strokes to many simulated viewers.
+
+Starts a BroadcastServer in-process (or targets a running one), connects
+N viewer sockets and one presenter, shows a large page, streams strokes
+at a fixed rate and reports whether every viewer got the whole page, the
+delivery latency per op and the size of a late joiner's snapshot.
+
+Run from the project root (no display needed):
+    python benchmarks/broadcast_load_test.py [viewers] [strokes] [--page-objects N] [--host H --port P]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.broadcast_server import BroadcastServer, page_ops
+from modules.sync_server import FRAME_LIMIT, encode_frames, encode_message, decode_message
+
+POINTS_PER_STROKE = 40
+SEND_INTERVAL = 0.03    # Same flush interval as SyncClient
+
+
+class Viewer:
+    def __init__(self):
+        self.received = 0
+        self.latencies = []
+        self.snapshot_bytes = 0
+        self.page_objects = 0
+
+    async def run(self, host, port, ready, done):
+        reader, writer = await asyncio.open_connection(host, port, limit=FRAME_LIMIT)
+        writer.write(encode_message({"type": "hello", "client": "viewer", "role": "viewer"}))
+        await writer.drain()
+        ready.release()
+        try:
+            while not done.is_set():
+                try:
+                    line = await asyncio.wait_for(reader.readline(), 0.5)
+                except asyncio.TimeoutError:
+                    continue
+                if not line:
+                    break
+                message = decode_message(line)
+                now = time.perf_counter()
+                if message.get("type") in ("welcome", "snapshot"):
+                    self.snapshot_bytes += len(line)
+                    continue
+                for op in message.get("ops", []):
+                    if op.get("op") in ("page", "page_more"):
+                        self.page_objects += len(op.get("objects", []))
+                        continue
+                    self.received += 1
+                    if "sent" in op:
+                        self.latencies.append(now - op["sent"])
+        finally:
+            writer.close()
+
+
+def page_objects(count):
+    """A page of count line segments in the PageManager "objects" format"""
+    return [{"type": "line", "coords": [i % 1600, i // 1600 * 10, i % 1600 + 8, i // 1600 * 10 + 8],
+             "options": {"fill": "black", "width": 2.0, "capstyle": "round", "tags": "layer_ink t_0"}}
+            for i in range(count)]
+
+
+async def present(host, port, strokes, objects):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode_message({"type": "hello", "client": "presenter", "role": "presenter"}))
+    # Show a large page first, sent in chunks as BroadcastManager does
+    for frame in encode_frames({"type": "ops", "client": "presenter", "ops": page_ops(0, objects)}, "ops"):
+        writer.write(frame)
+    await writer.drain()
+    sent = 0
+    for stroke in range(strokes):
+        element_id = f"presenter:{stroke}"
+        ops = [{"op": "begin", "page": 0, "id": element_id, "color": "black", "width": 2,
+                "pts": [0, stroke], "sent": time.perf_counter()}]
+        for i in range(1, POINTS_PER_STROKE, 4):
+            ops.append({"op": "pts", "page": 0, "id": element_id,
+                        "pts": [p for j in range(i, i + 4) for p in (j, stroke)],
+                        "sent": time.perf_counter()})
+            writer.write(encode_message({"type": "ops", "client": "presenter", "ops": ops}))
+            await writer.drain()
+            sent += len(ops)
+            ops = []
+            await asyncio.sleep(SEND_INTERVAL)
+        writer.write(encode_message({"type": "ops", "client": "presenter", "ops": [
+            {"op": "end", "page": 0, "id": element_id, "sent": time.perf_counter()}]}))
+        sent += 1
+    await writer.drain()
+    writer.close()
+    return sent
+
+
+async def late_joiner(host, port):
+    """(bytes, ops, page objects) of the snapshot a viewer joining now receives, over all its frames"""
+    reader, writer = await asyncio.open_connection(host, port, limit=FRAME_LIMIT)
+    writer.write(encode_message({"type": "hello", "client": "late", "role": "viewer"}))
+    size = ops = objects = 0
+    try:
+        while True:
+            line = await asyncio.wait_for(reader.readline(), 0.5)
+            message = decode_message(line) if line else {}
+            if message.get("type") not in ("welcome", "snapshot"):
+                break
+            size += len(line)
+            for op in message.get("snapshot", []):
+                if op.get("op") in ("page", "page_more"):
+                    objects += len(op.get("objects", []))
+                else:
+                    ops += 1
+    except asyncio.TimeoutError:
+        pass
+    writer.close()
+    return size, ops, objects
+
+
+async def run(viewer_count, strokes, object_count, host, port):
+    server = None
+    if port is None:
+        server = BroadcastServer(host=host, port=0)
+        await server.start()
+        port = server.port
+
+    viewers = [Viewer() for _ in range(viewer_count)]
+    ready = asyncio.Semaphore(0)
+    done = asyncio.Event()
+    tasks = [asyncio.create_task(v.run(host, port, ready, done)) for v in viewers]
+    for _ in viewers:
+        await ready.acquire()
+
+    start = time.perf_counter()
+    objects = page_objects(object_count)
+    sent = await present(host, port, strokes, objects)
+    await asyncio.sleep(0.5)    # Let the last frames arrive
+    elapsed = time.perf_counter() - start
+    snapshot_bytes, snapshot_ops, snapshot_objects = await late_joiner(host, port)
+    done.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if server is not None:
+        await asyncio.sleep(0.1)    # Let the server see every viewer disconnect
+        await server.stop()
+
+    latencies = sorted(l for v in viewers for l in v.latencies)
+    delivered = sum(v.received for v in viewers)
+    print(f"{viewer_count} viewers, {strokes} strokes, {sent} ops sent in {elapsed:.2f}s")
+    whole_page = sum(1 for v in viewers if v.page_objects == object_count)
+    print(f"  page of {object_count} objects: {whole_page} / {viewer_count} viewers got all of it")
+    print(f"  delivered {delivered} / {sent * viewer_count} ops")
+    if latencies:
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        print(f"  latency p50 {statistics.median(latencies) * 1000:.1f} ms, "
+              f"p95 {p95 * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+    print(f"  late joiner snapshot: {snapshot_objects} page objects and {snapshot_ops} ops, {snapshot_bytes} bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Broadcast fan-out load test")
+    parser.add_argument("viewers", nargs="?", type=int, default=100)
+    parser.add_argument("strokes", nargs="?", type=int, default=20)
+    parser.add_argument("--page-objects", type=int, default=2000, help="Objects on the page shown first")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="Target a running server instead of starting one")
+    args = parser.parse_args()
+    asyncio.run(run(args.viewers, args.strokes, args.page_objects, args.host, args.port))
+
+
+if __name__ == "__main__":
+    main()
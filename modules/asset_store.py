@@ -0,0 +1,167 @@
+import base64
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class AssetStore:
+    """
+    Content-addressed blobs (background images and PDFs) used by a board.
+
+    Blobs are keyed by the SHA-256 of their bytes, and page data only
+    refers to them by that hash, so a file used on many pages is stored
+    once and copying a page copies a reference. A saved board embeds each
+    blob once in its "assets" section. An imported file is copied into a
+    private temp directory as it is hashed, so editing or deleting the
+    original does not change the board, and blobs are checked against
+    their hash whenever they are read whole. An embedded blob stays
+    encoded until a page that uses it is opened. Safe to read from worker
+    threads.
+    """
+
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self):
+        self._paths = {}        # hash -> file in the store's directory holding the blob
+        self._encoded = {}      # hash -> base64 text from a loaded board
+        self._data = {}         # hash -> decoded bytes
+        self._directory = None  # Temp directory for the files, removed by clear() or at exit
+        self._cleanup = None
+        self._lock = threading.Lock()
+
+    def __contains__(self, digest):
+        return digest in self._paths or digest in self._encoded or digest in self._data
+
+    def __len__(self):
+        return len(set(self._paths) | set(self._encoded) | set(self._data))
+
+    def add_file(self, path):
+        """Copy a file's contents into the store and return their hash (the file is read once)"""
+        with self._lock:
+            directory = self._files_directory()
+        handle, copy = tempfile.mkstemp(dir=directory, prefix="import_")
+        digest = hashlib.sha256()
+        try:
+            with open(path, "rb") as source, os.fdopen(handle, "wb") as target:
+                for chunk in iter(lambda: source.read(self.CHUNK_SIZE), b""):
+                    digest.update(chunk)
+                    target.write(chunk)
+        except BaseException:
+            os.remove(copy)
+            raise
+        digest = digest.hexdigest()
+        with self._lock:
+            stored = digest not in self
+            if stored:
+                self._paths[digest] = os.path.join(directory, digest)
+                os.replace(copy, self._paths[digest])
+        if not stored:
+            os.remove(copy)
+        return digest
+
+    def add_bytes(self, data):
+        digest = sha256_bytes(data)
+        with self._lock:
+            if digest not in self:
+                self._data[digest] = bytes(data)
+        return digest
+
+    def read(self, digest):
+        """Return a blob's bytes"""
+        with self._lock:
+            data = self._data.get(digest)
+            if data is not None:
+                return data
+            encoded = self._encoded.get(digest)
+            path = self._paths.get(digest)
+        if encoded is not None:
+            data = base64.b64decode(encoded)
+            if sha256_bytes(data) != digest:
+                raise ValueError(f"Asset {digest[:12]} is corrupt")
+            with self._lock:
+                self._data[digest] = data
+                self._encoded.pop(digest, None)
+            return data
+        if path is not None:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"Asset file {path} is missing")
+            with open(path, "rb") as f:
+                data = f.read()
+            if sha256_bytes(data) != digest:
+                raise ValueError(f"Asset {digest[:12]} has changed on disk")
+            return data
+        raise KeyError(f"Asset {digest[:12]} is not in this board")
+
+    def open(self, digest):
+        """Return a binary file object with the blob's contents"""
+        with self._lock:
+            path = self._paths.get(digest)
+        if path is not None and os.path.exists(path):
+            return open(path, "rb")
+        return io.BytesIO(self.read(digest))
+
+    def local_path(self, digest):
+        """Return a file path holding the blob, writing embedded blobs to the store's directory once"""
+        with self._lock:
+            path = self._paths.get(digest)
+        if path is not None and os.path.exists(path):
+            return path
+        data = self.read(digest)
+        with self._lock:
+            directory = self._files_directory()
+        handle, temp_path = tempfile.mkstemp(dir=directory, prefix="embedded_")
+        with os.fdopen(handle, "wb") as f:
+            f.write(data)
+        path = os.path.join(directory, digest)
+        os.replace(temp_path, path)
+        with self._lock:
+            self._paths[digest] = path
+        return path
+
+    def to_json(self, digests):
+        """The "assets" section of a saved board, holding the given blobs once each"""
+        section = {}
+        for digest in sorted(set(digests)):
+            with self._lock:
+                encoded = self._encoded.get(digest)
+            if encoded is None:
+                try:
+                    data = self.read(digest)
+                except (KeyError, OSError) as e:
+                    print(f"Not embedding asset {digest[:12]}: {e}")
+                    continue
+                encoded = base64.b64encode(data).decode("ascii")
+            section[digest] = {"encoding": "base64", "data": encoded}
+        return section
+
+    def load_json(self, section):
+        """Register the blobs of a loaded board's "assets" section (decoded when first read)"""
+        for digest, entry in (section or {}).items():
+            if isinstance(entry, dict) and entry.get("encoding", "base64") == "base64" and digest not in self:
+                self._encoded[digest] = entry.get("data", "")
+
+    def clear(self):
+        """Forget every blob, e.g. before loading another board, and delete the store's files"""
+        with self._lock:
+            self._paths.clear()
+            self._encoded.clear()
+            self._data.clear()
+            cleanup, self._cleanup, self._directory = self._cleanup, None, None
+        if cleanup is not None:
+            cleanup()
+
+    def _files_directory(self):
+        """The store's temp directory, made when first needed (call with the lock held)"""
+        if self._directory is None:
+            self._directory = tempfile.mkdtemp(prefix="whiteboard_assets_")
+            # Removed at exit too, or when the store is garbage collected
+            self._cleanup = weakref.finalize(self, shutil.rmtree, self._directory, True)
+        return self._directory
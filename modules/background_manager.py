@@ -0,0 +1,233 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import ImageTk
+
+from modules.image_cache import MipCache, image_source, mip_level, pdf_sources
+from modules.page_store import PackedPage
+from modules.thumbnail_renderer import PAGE_WIDTH, PAGE_HEIGHT
+
+
+class BackgroundManager:
+    """
+    Images and PDF slides shown behind a page's drawings.
+
+    A page only stores a reference to its background's file in the board's
+    asset store (see modules.image_cache) and the box it fills on the
+    canvas, so a PDF's slides share one stored file. Nothing is
+    decoded when a file is opened or a PDF imported: the background of the
+    page on screen is decoded on a worker thread at the mip level matching
+    its size on screen, then the next page's is prefetched. Zooming asks
+    for the level that suits the new size.
+    """
+
+    TAG = "page_background"
+    MAX_WORKERS = 2
+    POLL_INTERVAL_MS = 30
+
+    def __init__(self, app):
+        self.app = app
+        self.cache = MipCache(app.page_manager.asset_store)
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS,
+                                            thread_name_prefix="whiteboard-backgrounds")
+        self._results = queue.Queue()
+        self._pending = set()           # Cache keys being decoded
+        self._wanted = None             # (page index, cache key, background) to show
+        self._item = None
+        self._photo = None
+        self._poll_job = None
+
+    @property
+    def canvas(self):
+        return self.app.canvas_manager.canvas
+
+    # Importing
+
+    def import_image(self):
+        """Use an image file as the current page's background"""
+        from tkinter import filedialog, messagebox
+        path = filedialog.askopenfilename(
+            filetypes=[("Images", "*.png *.jpg *.jpeg *.bmp *.gif *.webp *.tif *.tiff"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            source = image_source(path, self.app.page_manager.asset_store)
+        except Exception as e:
+            print(f"Error importing background image: {e}")
+            messagebox.showerror("Import Image", f"Could not open image: {e}")
+            return
+        self.set_background(self.app.page_manager.current_page_index, source)
+
+    def import_pdf(self):
+        """Add a page per PDF slide, each with the slide as its background"""
+        from tkinter import filedialog, messagebox
+        path = filedialog.askopenfilename(filetypes=[("PDF documents", "*.pdf"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            sources = pdf_sources(path, self.app.page_manager.asset_store)
+        except Exception as e:
+            print(f"Error importing PDF: {e}")
+            messagebox.showerror("Import PDF", f"Could not import PDF: {e}")
+            return
+        if not sources:
+            return
+
+        page_manager = self.app.page_manager
+        index = page_manager.current_page_index
+        first = index + 1
+        # An empty page takes the first slide; the others become new pages after it
+        if not page_manager.pages[index].get("background") and not self.app.canvas_manager.document_items():
+            self.set_background(index, sources[0], show=False)
+            first = index
+        for offset, source in enumerate(sources[1:] if first == index else sources):
+            page_manager.pages.insert(index + 1 + offset, {
+                "objects": [],
+                "undo_stack": [],
+                "redo_stack": [],
+                "background": self._placed(source)
+            })
+            if hasattr(self.app, 'collaboration_manager'):
+                self.app.collaboration_manager.page_added(index + 1 + offset)
+            # Slides are only decoded when shown, so they are stored packed right away
+            page_manager.pack_page(index + 1 + offset)
+        print(f"Imported {len(sources)} PDF pages from {path}")
+        if first == index:
+            page_manager.update_page_info()
+        else:
+            page_manager.go_to_page(first)
+
+    def remove_background(self):
+        self.set_background(self.app.page_manager.current_page_index, None)
+
+    def set_background(self, index, source, show=True):
+        page = self.app.page_manager.hydrate_page(index)
+        if source is None:
+            page.pop("background", None)
+        else:
+            page["background"] = self._placed(source)
+        if show:
+            self.show_page()
+
+    def _placed(self, source):
+        """Source plus the box it fills: the page area at the current zoom, keeping its aspect"""
+        zoom = getattr(self.app, 'zoom_level', 1.0)
+        width, height = source["size"]
+        scale = min(PAGE_WIDTH / max(1, width), PAGE_HEIGHT / max(1, height)) * zoom
+        return dict(source, box=[0, 0, round(width * scale), round(height * scale)])
+
+    # Showing
+
+    def show_page(self):
+        """Show the current page's background (called after every page change)"""
+        page_manager = self.app.page_manager
+        index = page_manager.current_page_index
+        if not 0 <= index < len(page_manager.pages):
+            return
+        background = page_manager.pages[index].get("background")
+        if not background:
+            self._wanted = None
+            self._delete_item()
+            return
+        self._request(index, background)
+        self._prefetch(index + 1)
+
+    def on_zoom(self, x, y, factor):
+        """Scale the current page's background box with the canvas and redecode at the new size"""
+        page_manager = self.app.page_manager
+        index = page_manager.current_page_index
+        background = page_manager.pages[index].get("background") if page_manager.pages else None
+        if not background:
+            return
+        page = page_manager.hydrate_page(index)
+        x0, y0, x1, y1 = background["box"]
+        page["background"] = dict(background, box=[x + (x0 - x) * factor, y + (y0 - y) * factor,
+                                                   x + (x1 - x) * factor, y + (y1 - y) * factor])
+        self._request(index, page["background"])
+
+    def _display_size(self, background):
+        x0, y0, x1, y1 = background["box"]
+        return max(1, round(x1 - x0)), max(1, round(y1 - y0))
+
+    def _request(self, index, background):
+        size = self._display_size(background)
+        level = mip_level(background["size"], size)
+        key = MipCache.key(background, level)
+        self._wanted = (index, key, background)
+        image = self.cache.get(background, level)
+        if image is not None:
+            self._show(image, background)
+        else:
+            self._submit(background, level)
+
+    def _prefetch(self, index):
+        pages = self.app.page_manager.pages
+        if not 0 <= index < len(pages):
+            return
+        page = pages[index]
+        # Packed pages keep their background reference unpacked
+        background = page.background if isinstance(page, PackedPage) else page.get("background")
+        if background:
+            level = mip_level(background["size"], self._display_size(background))
+            if self.cache.get(background, level) is None:
+                self._submit(background, level)
+
+    def _submit(self, background, level):
+        key = MipCache.key(background, level)
+        if key in self._pending:
+            return
+        self._pending.add(key)
+        future = self._executor.submit(self.cache.load, background, level)
+        future.add_done_callback(lambda f, k=key: self._results.put((k, f)))
+        if self._poll_job is None:
+            self._poll_job = self.app.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self):
+        self._poll_job = None
+        while True:
+            try:
+                key, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending.discard(key)
+            try:
+                image = future.result()
+            except Exception as e:
+                print(f"Could not decode page background: {e}")
+                continue
+            # Results for a page that is no longer shown only warm the cache
+            if self._wanted is not None and self._wanted[1] == key \
+                    and self._wanted[0] == self.app.page_manager.current_page_index:
+                self._show(image, self._wanted[2])
+        if self._pending:
+            self._poll_job = self.app.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def _show(self, image, background):
+        x0, y0, _, _ = background["box"]
+        size = self._display_size(background)
+        if image.size != size:
+            image = image.resize(size)
+        # PhotoImages must be created on the Tk thread
+        self._photo = ImageTk.PhotoImage(image)
+        canvas = self.canvas
+        if self._item is None:
+            self._item = canvas.create_image(x0, y0, image=self._photo, anchor="nw", tags=(self.TAG,))
+            # Not part of the page's drawings: not saved, selected or erased
+            self.app.canvas_manager.overlay_ids.add(self._item)
+        else:
+            canvas.coords(self._item, x0, y0)
+            canvas.itemconfigure(self._item, image=self._photo)
+        canvas.tag_lower(self._item)
+        # Grid lines stay visible on top of the background, also after each grid layout
+        grid = self.app.canvas_manager.grid
+        grid.floor_tag = self.TAG
+        if canvas.find_withtag(grid.TAG):
+            canvas.tag_raise(grid.TAG, self._item)
+
+    def _delete_item(self):
+        if self._item is not None:
+            self.canvas.delete(self._item)
+            self.app.canvas_manager.overlay_ids.discard(self._item)
+        self._item = None
+        self._photo = None
@@ -0,0 +1,358 @@
+import re
+import time
+import tkinter as tk
+
+from modules.timeline import time_tag
+from modules.layer_manager import DEFAULT_LAYER, LAYER_TAG_PREFIX, layer_tag
+
+# Characters that must be backslash-escaped inside a bare Tcl word
+_TCL_SPECIAL = re.compile(r'([\\\[\]{}"$; \t])')
+
+
+def _tcl_quote(value):
+    """Quote a Python value so it is read back as a single Tcl word"""
+    text = str(value)
+    if not text:
+        return "{}"
+    text = _TCL_SPECIAL.sub(r"\\\1", text)
+    return text.replace("\n", "\\n").replace("\r", "\\r")
+
+
+def element_to_item(element):
+    """
+    Convert a saved page entry into (item_type, coords, options).
+
+    Handles both the PageManager "objects" format ({type, coords, options})
+    and the FileManager "elements" format (points/x1../x,y). Returns None
+    for entries that cannot be drawn. A FileManager timestamp ("t") and
+    layer become the item's time and layer tags; every item gets a layer tag.
+    """
+    item = _saved_item(element)
+    if item is None:
+        return None
+    options = item[2]
+    if "coords" in element:
+        saved_tags = options.get("tags") or ""
+        if isinstance(saved_tags, (list, tuple)):
+            saved_tags = " ".join(saved_tags)
+        if LAYER_TAG_PREFIX not in saved_tags:
+            options["tags"] = f"{saved_tags} {layer_tag(DEFAULT_LAYER)}".strip()
+    else:
+        tags = [layer_tag(element.get("layer", DEFAULT_LAYER))]
+        if "t" in element:
+            tags.append(time_tag(element["t"]))
+        options["tags"] = " ".join(tags)
+    return item
+
+
+def _saved_item(element):
+    element_type = element.get("type")
+
+    # PageManager format
+    if "coords" in element:
+        coords = list(element.get("coords") or [])
+        if element_type not in ("line", "oval", "rectangle", "polygon", "text") or len(coords) < 2:
+            return None
+        return element_type, coords, dict(element.get("options") or {})
+
+    # FileManager format
+    if element_type == "line":
+        points = list(element.get("points") or [])
+        if len(points) < 4:
+            return None
+        options = {
+            "fill": element.get("color", "black"),
+            "width": element.get("width", 2),
+            "smooth": 1 if element.get("smooth", True) else 0,
+            "capstyle": tk.ROUND,
+            "joinstyle": tk.ROUND,
+        }
+        if element.get("arrow"):
+            options["arrow"] = tk.LAST
+        return "line", points, options
+
+    if element_type == "polygon":
+        points = list(element.get("points") or [])
+        if len(points) < 6:
+            return None
+        # Variable-width ink strokes: a filled outline
+        options = {
+            "fill": element.get("color", "black"),
+            "outline": "",
+            "smooth": 1,
+        }
+        return "polygon", points, options
+
+    if element_type in ("rectangle", "oval"):
+        coords = [element.get("x1", 0), element.get("y1", 0),
+                  element.get("x2", 0), element.get("y2", 0)]
+        options = {
+            "outline": element.get("outline", "black"),
+            "fill": element.get("fill", ""),
+            "width": element.get("width", 2),
+        }
+        return element_type, coords, options
+
+    if element_type == "text":
+        coords = [element.get("x", 0), element.get("y", 0)]
+        options = {
+            "text": element.get("text", ""),
+            "fill": element.get("color", "black"),
+            "font": (element.get("font_family", "Arial"), element.get("font_size", 12)),
+            "anchor": "nw",
+        }
+        return "text", coords, options
+
+    return None
+
+
+def element_bbox(element, metrics=None):
+    """
+    Return the (x1, y1, x2, y2) bounding box of a saved element, or None.
+    Text only has its anchor point unless a FontMetrics is given to lay it out.
+    """
+    item = element_to_item(element)
+    if item is None:
+        return None
+    item_type, coords, options = item
+    if item_type == "text" and metrics is not None and len(coords) >= 2:
+        family, size = metrics.parse(options.get("font"))
+        return metrics.text_bbox(float(coords[0]), float(coords[1]), str(options.get("text", "")),
+                                 family, size, options.get("anchor", "center"))
+    xs, ys = coords[0::2], coords[1::2]
+    try:
+        return min(xs), min(ys), max(xs), max(ys)
+    except (TypeError, ValueError):
+        return None
+
+
+class BatchRenderer:
+    """
+    Draw many canvas items with a single Tcl evaluation.
+
+    Creating items one by one costs a Python->Tcl round trip per element
+    plus keyword option marshalling. The batch path builds the Tcl
+    "create" commands for a whole page as one script and evaluates it in
+    one call. Large pages can instead be drawn progressively: the items
+    inside the viewport go first and the rest follow in time-sliced chunks
+    scheduled with after(), which a page change can cancel.
+    """
+
+    DEFAULT_CHUNK_SIZE = 2000
+    SLICE_SIZE = 250            # Commands per Tcl eval while rendering progressively
+    TIME_BUDGET_MS = 12         # Time spent drawing per slice before yielding to the UI
+
+    def __init__(self, canvas, style_resolver=None, metrics=None):
+        self.canvas = canvas
+        # Optional callable (color, attribute) -> (display color, tags) for themed colors
+        self.style_resolver = style_resolver
+        # Optional FontMetrics, so text is placed in or out of the viewport by its whole box
+        self.metrics = metrics
+        self._pending_job = None
+        self._queue = []
+        self._on_complete = None
+        self._visible_ids = []
+        self._tags = None
+
+    @property
+    def is_busy(self):
+        """True while a chunked or progressive render still has items to draw"""
+        return bool(self._queue)
+
+    def build_command(self, element, tags=None):
+        """Build the Tcl create command for one element, or None if it can't be drawn"""
+        item = element_to_item(element)
+        if item is None:
+            return None
+        item_type, coords, options = item
+
+        tags = list(tags or ())
+        # Tags saved with the element are merged with the ones requested here
+        saved_tags = options.pop("tags", None)
+        if saved_tags:
+            tags.extend(saved_tags.split() if isinstance(saved_tags, str) else saved_tags)
+        if self.style_resolver:
+            for attribute in ("fill", "outline"):
+                if options.get(attribute):
+                    options[attribute], style_tags = self.style_resolver(options[attribute], attribute)
+                    tags.extend(style_tags)
+
+        parts = [self.canvas._w, "create", item_type]
+        parts.extend(_tcl_quote(float(c)) for c in coords)
+        for key, value in options.items():
+            if isinstance(value, (tuple, list)):
+                # Font tuples and similar become a Tcl list
+                value = " ".join("{%s}" % v for v in value)
+            parts.append("-" + key)
+            parts.append(_tcl_quote(value))
+        if tags:
+            parts.append("-tags")
+            parts.append(_tcl_quote(" ".join(tags)))
+        return " ".join(parts)
+
+    def build_script(self, elements, tags=None):
+        """Build one Tcl script creating all given elements"""
+        commands = []
+        for element in elements:
+            command = self._safe_build(element, tags)
+            if command:
+                # catch keeps one bad item (e.g. an unknown color) from aborting the page
+                commands.append("catch {%s}" % command)
+        return "\n".join(commands), len(commands)
+
+    def render(self, elements, tags=None, chunk_size=None, on_complete=None):
+        """
+        Draw all elements on the canvas.
+
+        With chunk_size set and more elements than fit in one chunk, the
+        page is drawn in chunks scheduled with after_idle so the UI keeps
+        processing events in between. Returns the number of items queued.
+        """
+        self.cancel()
+        elements = list(elements or [])
+
+        if not chunk_size or len(elements) <= chunk_size:
+            script, count = self.build_script(elements, tags)
+            self._eval(script)
+            if on_complete:
+                on_complete()
+            return count
+
+        self._queue = [(element, None) for element in elements]
+        self._on_complete = on_complete
+        self._tags = tags
+
+        def run_chunk():
+            self._pending_job = None
+            self._run_commands(chunk_size)
+            if self._queue:
+                self._pending_job = self.canvas.after_idle(run_chunk)
+            else:
+                self._finish_render()
+
+        run_chunk()
+        return len(elements)
+
+    def render_progressive(self, elements, viewport=None, tags=None, on_complete=None):
+        """
+        Draw elements in time-sliced chunks, visible ones first.
+
+        Items intersecting viewport (x1, y1, x2, y2 in canvas coordinates)
+        are drawn in the first slices; off-screen items follow and are
+        lowered beneath the next visible item so the stacking order matches
+        the page order. Call cancel() to abandon the rest of the page.
+        """
+        self.cancel()
+        elements = list(elements or [])
+        self._tags = tags
+        self._on_complete = on_complete
+        self._visible_ids = []
+
+        if viewport is None:
+            self._queue = [(element, None) for element in elements]
+        else:
+            vx1, vy1, vx2, vy2 = viewport
+            visible, deferred = [], []
+            for element in elements:
+                bbox = element_bbox(element, self.metrics)
+                if bbox is None or (bbox[0] <= vx2 and bbox[2] >= vx1 and
+                                    bbox[1] <= vy2 and bbox[3] >= vy1):
+                    visible.append(element)
+                else:
+                    deferred.append((element, len(visible)))
+            # Visible items record their ids; deferred ones are lowered below
+            # the first visible item that followed them in the page order
+            self._queue = [(element, "visible") for element in visible]
+            self._queue.extend(deferred)
+
+        def run_slice():
+            self._pending_job = None
+            deadline = time.perf_counter() + self.TIME_BUDGET_MS / 1000.0
+            while self._queue and time.perf_counter() < deadline:
+                self._run_commands(self.SLICE_SIZE)
+            if self._queue:
+                self._pending_job = self.canvas.after(1, run_slice)
+            else:
+                self._finish_render()
+
+        run_slice()
+        return len(elements)
+
+    def finish(self):
+        """Draw everything still queued right now (e.g. before capturing the page)"""
+        if self._pending_job is not None:
+            try:
+                self.canvas.after_cancel(self._pending_job)
+            except tk.TclError:
+                pass
+            self._pending_job = None
+        if not self._queue:
+            return
+        while self._queue:
+            self._run_commands(self.DEFAULT_CHUNK_SIZE)
+        self._finish_render()
+
+    def cancel(self):
+        """Cancel any chunked or progressive render still waiting to run"""
+        if self._pending_job is not None:
+            try:
+                self.canvas.after_cancel(self._pending_job)
+            except tk.TclError:
+                pass
+            self._pending_job = None
+        if self._queue:
+            print(f"Cancelled render with {len(self._queue)} items left")
+        self._queue = []
+        self._on_complete = None
+        self._visible_ids = []
+
+    def _safe_build(self, element, tags):
+        try:
+            return self.build_command(element, tags)
+        except (TypeError, ValueError, AttributeError) as e:
+            print(f"Skipping invalid element: {e}")
+            return None
+
+    def _run_commands(self, count):
+        """Evaluate up to count queued elements as one script"""
+        if self._queue and self._queue[0][1] == "visible":
+            # Deferred items need the ids of every visible item, so never mix the two
+            visible_left = sum(1 for _, mode in self._queue[:count] if mode == "visible")
+            count = min(count, visible_left)
+        batch, self._queue = self._queue[:count], self._queue[count:]
+        lines = ["set ::wb_ids {}"]
+        for element, mode in batch:
+            command = self._safe_build(element, self._tags)
+            if not command:
+                if mode == "visible":
+                    lines.append("lappend ::wb_ids {}")
+                continue
+            if mode == "visible":
+                lines.append("if {[catch {%s} ::wb_id]} {set ::wb_id {}}; lappend ::wb_ids $::wb_id" % command)
+            elif mode is not None and mode < len(self._visible_ids) and self._visible_ids[mode]:
+                lines.append("if {![catch {%s} ::wb_id]} {catch {%s lower $::wb_id %s}}"
+                             % (command, self.canvas._w, self._visible_ids[mode]))
+            else:
+                lines.append("catch {%s}" % command)
+        lines.append("set ::wb_ids")
+        result = self._eval("\n".join(lines))
+        if result:
+            self._visible_ids.extend(self.canvas.tk.splitlist(result))
+        elif any(mode == "visible" for _, mode in batch):
+            self._visible_ids.extend([""] * sum(1 for _, mode in batch if mode == "visible"))
+
+    def _finish_render(self):
+        on_complete = self._on_complete
+        self._on_complete = None
+        self._visible_ids = []
+        if on_complete:
+            on_complete()
+
+    def _eval(self, script):
+        if not script:
+            return ""
+        try:
+            return self.canvas.tk.eval(script)
+        except tk.TclError as e:
+            print(f"Batch render failed: {e}")
+            return ""
@@ -0,0 +1,530 @@
+"""
+Compressed board files (.wbz), with every page compressed on its own.
+
+Layout:
+    b"WBZ1" + codec id (1 byte)
+    frames: kind (1 byte) + payload size (8 bytes, big-endian) + payload
+        b"S" settings, b"P" one page, b"T" trailer, b"I" index
+        b"B" one page, uncompressed binary (codec "none")
+    footer: index frame offset (8 bytes) + b"WBZ1"
+
+Every payload is compressed JSON (except with codec "none", below); a page
+payload is the same text a page has in a plain .wb file (see
+board_stream.page_text), checksum included.
+The index lists where each page is, with its CRC, element count, content
+digest and background, so one page can be read without touching the
+others, and a zlib page is handed to PageStore as it is, without being
+decompressed. A file whose index is missing (cut off while saving) is
+read frame by frame instead.
+
+zstd is used when the zstandard package is installed; zlib otherwise.
+Pages are compressed on worker threads (both codecs release the GIL)
+while the next pages are being serialized.
+
+Codec "none" is for large archived boards opened read-only: its pages are
+stored as a JSON header for everything but the coordinates, followed by
+all the page's coordinates as one block of float64s. BoardContainer maps
+the file into memory, so the OS only reads in the pages that are viewed,
+and such a page is decoded straight from the mapping (the coordinate
+block with array.frombytes on a memoryview, the header without copying
+it to bytes first).
+
+To convert a board for that:
+    python -m modules.board_container pack board.wb archive.wbz --codec none
+
+open_text() also reads plain .wb files that were gzip- or zstd-compressed
+as a whole, so the JSON readers work on those unchanged.
+"""
+import argparse
+import io
+import json
+import mmap
+import struct
+import sys
+import zlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from modules.board_stream import CHECKSUM_KEY, iter_board, page_text, page_text_intact
+from modules.page_store import PackedPage, content_digest
+from modules.timeline import page_start
+
+MAGIC = b"WBZ1"
+CODEC_IDS = {"zlib": 0, "zstd": 1, "none": 2}
+DEFAULT_LEVELS = {"zlib": 6, "zstd": 3, "none": 0}
+_FRAME = struct.Struct(">cQ")
+_PAGE_HEADER = struct.Struct("<I")
+_FOOTER = struct.Struct(">Q4s")
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def available_codecs():
+    """Codec names that can be written here, the default first"""
+    return ["zstd", "zlib", "none"] if zstandard is not None else ["zlib", "none"]
+
+
+def default_codec():
+    return available_codecs()[0]
+
+
+def _compressor(codec, level):
+    if codec == "none":
+        return lambda data: data
+    if codec == "zlib":
+        return lambda data: zlib.compress(data, level)
+    if codec == "zstd" and zstandard is not None:
+        # ZstdCompressor objects are not thread-safe, so each call makes its own
+        return lambda data: zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"codec {codec} is not available")
+
+
+def _decompressor(codec):
+    if codec == "none":
+        return bytes
+    if codec == "zlib":
+        return zlib.decompress
+    if codec == "zstd":
+        if zstandard is None:
+            raise ValueError("this board is zstd-compressed; install the zstandard package to open it")
+        return lambda data: zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"unknown codec {codec}")
+
+
+def sniff(path):
+    """"container", "gzip", "zstd" or "json", from the first bytes of the file"""
+    with open(path, "rb") as f:
+        head = f.read(4)
+    if head == MAGIC:
+        return "container"
+    if head.startswith(_GZIP_MAGIC):
+        return "gzip"
+    if head == _ZSTD_MAGIC:
+        return "zstd"
+    return "json"
+
+
+def open_text(path, kind=None):
+    """Open a plain board for reading as text, decompressing it on the fly if it is gzip or zstd"""
+    kind = kind or sniff(path)
+    if kind == "gzip":
+        return io.TextIOWrapper(io.BufferedReader(_GzipReader(open(path, "rb"))), encoding="utf-8")
+    if kind == "zstd":
+        if zstandard is None:
+            raise ValueError("this board is zstd-compressed; install the zstandard package to open it")
+        raw = open(path, "rb")
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(raw, closefd=True), encoding="utf-8")
+    if kind == "container":
+        raise ValueError("a compressed board container is not a text file")
+    return open(path, "r", encoding="utf-8")
+
+
+class _GzipReader(io.RawIOBase):
+    """
+    Decompresses a gzip file as it is read. Unlike gzip.open, a file that
+    was cut off simply ends where the data does, so it can be recovered.
+    """
+
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, raw):
+        self.raw = raw
+        self._inflater = zlib.decompressobj(wbits=31)
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._pending:
+            data = self.raw.read(self.CHUNK_SIZE)
+            if not data:
+                self._pending = self._inflater.flush()
+                if not self._pending:
+                    return 0
+                break
+            self._pending = self._inflater.decompress(data)
+            if self._inflater.eof and self._inflater.unused_data:
+                # Another gzip member follows
+                rest = self._inflater.unused_data
+                self._inflater = zlib.decompressobj(wbits=31)
+                self._pending += self._inflater.decompress(rest)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self):
+        self.raw.close()
+        super().close()
+
+
+def encode_binary_page(page):
+    """
+    A page as a b"B" frame payload: the size of a JSON header, the header
+    (the page without its coordinate lists, plus how many coordinates each
+    entry had) and then every coordinate as one block of float64s.
+    """
+    items_key = "objects" if page.get("objects") else "elements"
+    coords_key = "coords" if items_key == "objects" else "points"
+    coords = array("d")
+    counts, items, integral = [], [], []
+    for item in page.get(items_key) or []:
+        values = item.get(coords_key) if isinstance(item, dict) else None
+        kinds = {type(value) for value in values} if isinstance(values, (list, tuple)) else None
+        if not kinds or not kinds <= {float} and kinds != {int}:
+            # Anything but all floats or all ints is kept in the header as it is,
+            # so every page comes back exactly as it was (and with the same digest)
+            counts.append(-1)
+            items.append(item)
+            continue
+        if kinds == {int}:
+            integral.append(len(items))
+        coords.extend(array("d", values))
+        counts.append(len(values))
+        # The key keeps its place, so the entry comes back with its keys in the same order
+        items.append({key: None if key == coords_key else value for key, value in item.items()})
+    content = {key: value for key, value in page.items() if key != CHECKSUM_KEY}
+    content[items_key] = items
+    header = _json_bytes({"page": content, "items": items_key, "coords": coords_key, "counts": counts,
+                          "ints": integral})
+    if sys.byteorder == "big":
+        coords.byteswap()
+    return _PAGE_HEADER.pack(len(header)) + header + coords.tobytes()
+
+
+def decode_binary_page(payload):
+    """The page dict of a b"B" frame payload (bytes, or a memoryview, which is not copied)"""
+    view = memoryview(payload)
+    (size,) = _PAGE_HEADER.unpack_from(view)
+    header = json.loads(str(view[_PAGE_HEADER.size:_PAGE_HEADER.size + size], "utf-8"))
+    coords = array("d")
+    coords.frombytes(view[_PAGE_HEADER.size + size:])
+    if sys.byteorder == "big":
+        coords.byteswap()
+    values = coords.tolist()
+    page, coords_key, position = header["page"], header["coords"], 0
+    integral = set(header.get("ints", ()))
+    for number, (item, count) in enumerate(zip(page.get(header["items"]) or [], header["counts"])):
+        if count >= 0:
+            item[coords_key] = values[position:position + count]
+            if number in integral:
+                item[coords_key] = [int(value) for value in item[coords_key]]
+            position += count
+    return page
+
+
+class ContainerWriter:
+    """
+    Writes a .wbz file to a binary file object, a page at a time.
+
+    Compression runs on a pool of worker threads, with a few pages in
+    flight at once; frames are still written in page order.
+    """
+
+    def __init__(self, f, codec=None, level=None, workers=2):
+        self.f = f
+        self.codec = codec or default_codec()
+        self.level = DEFAULT_LEVELS[self.codec] if level is None else level
+        self._compress = _compressor(self.codec, self.level)
+        self._page_kind = b"B" if self.codec == "none" else b"P"
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._in_flight = []
+        self._limit = workers * 2
+        self._index = {"settings": None, "trailer": None, "pages": []}
+        self.f.write(MAGIC + bytes([CODEC_IDS[self.codec]]))
+
+    def write_settings(self, settings):
+        self._index["settings"] = self._frame(b"S", self._compress(_json_bytes(settings)))
+
+    def add_page(self, page, digest=None):
+        """Queue a page dict for compression; digest is its content_digest(), if the caller has it"""
+        items = page.get("objects") or page.get("elements") or []
+        data = encode_binary_page(page) if self._page_kind == b"B" else page_text(page).encode("utf-8")
+        entry = {"count": len(items), "digest": digest or content_digest(items), "start": page_start(items)}
+        if page.get("background"):
+            entry["background"] = page["background"]
+        self._in_flight.append((entry, self._executor.submit(self._compress, data)))
+        if len(self._in_flight) > self._limit:
+            self._write_page()
+
+    def close(self, trailer=None):
+        """Write the remaining pages, the trailer and the index. Returns the number of pages"""
+        try:
+            while self._in_flight:
+                self._write_page()
+            if trailer:
+                self._index["trailer"] = self._frame(b"T", self._compress(_json_bytes(trailer)))
+            index_at = self.f.tell()
+            self._frame(b"I", self._compress(_json_bytes(self._index)))
+            self.f.write(_FOOTER.pack(index_at, MAGIC))
+        finally:
+            self._executor.shutdown(wait=True)
+        return len(self._index["pages"])
+
+    def abort(self):
+        """Stop without finishing the file"""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        self._in_flight = []
+
+    def _write_page(self):
+        entry, future = self._in_flight.pop(0)
+        blob = future.result()
+        entry["at"], entry["size"] = self._frame(self._page_kind, blob)
+        entry["crc"] = zlib.crc32(blob)
+        self._index["pages"].append(entry)
+
+    def _frame(self, kind, payload):
+        """Write a frame; returns (payload offset, payload size)"""
+        self.f.write(_FRAME.pack(kind, len(payload)))
+        at = self.f.tell()
+        self.f.write(payload)
+        return at, len(payload)
+
+
+def write_container(f, settings, pages, trailer=None, codec=None, level=None, workers=2, digests=None):
+    """
+    Write a .wbz board, like board_stream.write_board but compressed. Returns the number of pages.
+    digests may hold the pages' content digests, saving the time to compute them again; it may
+    be a list that pages fills in as it goes.
+    """
+    writer = ContainerWriter(f, codec, level, workers)
+    try:
+        writer.write_settings(settings)
+        for number, page in enumerate(pages):
+            writer.add_page(page, digests[number] if digests and number < len(digests) else None)
+    except BaseException:
+        writer.abort()
+        raise
+    return writer.close(trailer() if callable(trailer) else trailer)
+
+
+class BoardContainer:
+    """
+    Random access to the pages of a .wbz file.
+
+    The file is mapped into memory read-only and only the index is read
+    when it is opened; each page is read (and checked against its CRC)
+    when asked for, straight from the mapping, which is safe from any
+    thread. Use as a context manager or call close().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            head = f.read(5)
+            if len(head) < 5 or head[:4] != MAGIC:
+                raise ValueError("not a compressed board")
+            # The mapping stays valid once the file is closed
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        try:
+            self.codec = next((name for name, number in CODEC_IDS.items() if number == head[4]), None)
+            self._decompress = _decompressor(self.codec)
+            self.recovered = False
+            self._index = self._read_index()
+            if self._index is None:
+                self.recovered = True
+                self._index = self._scan_frames()
+        except BaseException:
+            self.close()
+            raise
+        self.entries = self._index["pages"]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def close(self):
+        if self._view is None:
+            return
+        self._view.release()
+        self._view = None
+        try:
+            self._map.close()
+        except BufferError:
+            # A page still being read holds a view; the mapping goes when it does
+            pass
+
+    @property
+    def settings(self):
+        return self._read_json(self._index.get("settings")) or {}
+
+    @property
+    def trailer(self):
+        return self._read_json(self._index.get("trailer")) or {}
+
+    def read_blob(self, number):
+        """
+        The stored bytes of page number (from 0), as a memoryview of the
+        mapping; raises ValueError if they fail their CRC
+        """
+        entry = self.entries[number]
+        blob = self._read(entry["at"], entry["size"])
+        if len(blob) != entry["size"] or zlib.crc32(blob) != entry["crc"]:
+            raise ValueError(f"page {number + 1} failed its checksum")
+        return blob
+
+    def read_page(self, number):
+        """Page number (from 0) as a dict, without its checksum; raises ValueError if it is damaged"""
+        blob = self.read_blob(number)
+        if self.codec == "none":
+            return decode_binary_page(blob)
+        text = self._decompress(blob).decode("utf-8")
+        page = json.loads(text)
+        if not isinstance(page, dict) or page_text_intact(text) is False:
+            raise ValueError(f"page {number + 1} failed its checksum")
+        page.pop(CHECKSUM_KEY, None)
+        return page
+
+    def packed_page(self, number, compress_level=1):
+        """(blob, object count, digest, background, start) of a page, the way PageStore.add_blob takes them"""
+        entry = self.entries[number]
+        if self.codec == "zlib":
+            blob = bytes(self.read_blob(number))
+        else:
+            # PageStore keeps zlib-compressed JSON
+            blob = zlib.compress(json.dumps(self.read_page(number), separators=(",", ":")).encode("utf-8"),
+                                 compress_level)
+        # Containers written before the index kept start times have none
+        return blob, entry["count"], entry["digest"], entry.get("background"), entry.get("start")
+
+    def _read(self, at, size):
+        return self._view[at:at + size]
+
+    def _read_json(self, location):
+        if not location:
+            return None
+        return json.loads(self._decompress(self._read(*location)))
+
+    def _read_index(self):
+        end = len(self._view)
+        if end < 5 + _FOOTER.size:
+            return None
+        index_at, magic = _FOOTER.unpack_from(self._view, end - _FOOTER.size)
+        if magic != MAGIC or not 5 <= index_at <= end - _FOOTER.size - _FRAME.size:
+            return None
+        kind, size = _FRAME.unpack_from(self._view, index_at)
+        if kind != b"I":
+            return None
+        try:
+            return json.loads(self._decompress(self._read(index_at + _FRAME.size, size)))
+        except (ValueError, zlib.error) as e:
+            print(f"{self.path}: damaged index ({e})")
+            return None
+
+    def _scan_frames(self):
+        """Rebuild the index from the frames, for a file cut off before its index was written"""
+        index = {"settings": None, "trailer": None, "pages": []}
+        at, end = 5, len(self._view)
+        while at + _FRAME.size <= end:
+            kind, size = _FRAME.unpack_from(self._view, at)
+            at += _FRAME.size
+            if at + size > end:
+                break
+            payload = self._read(at, size)
+            if kind == b"S":
+                index["settings"] = (at, size)
+            elif kind == b"T":
+                index["trailer"] = (at, size)
+            elif kind in (b"P", b"B"):
+                try:
+                    page = decode_binary_page(payload) if kind == b"B" else json.loads(self._decompress(payload))
+                except (ValueError, zlib.error):
+                    at += size
+                    continue
+                items = page.get("objects") or page.get("elements") or []
+                entry = {"at": at, "size": size, "crc": zlib.crc32(payload),
+                         "count": len(items), "digest": content_digest(items), "start": page_start(items)}
+                if page.get("background"):
+                    entry["background"] = page["background"]
+                index["pages"].append(entry)
+            elif kind != b"I":
+                break
+            at += size
+        print(f"{self.path}: no index, recovered {len(index['pages'])} pages from the frames")
+        return index
+
+
+class MappedPages:
+    """
+    Stands in for PageStore behind the pages of an open BoardContainer:
+    they stay in the mapped file, and are decoded from it each time they
+    are unpacked, until the page is shown and becomes a dict.
+    """
+
+    def __init__(self, board):
+        self.board = board
+
+    def pages(self):
+        """A PackedPage for every page of the board"""
+        return [PackedPage(self, number, entry["count"], entry["digest"], entry.get("background"), entry.get("start"))
+                for number, entry in enumerate(self.board.entries)]
+
+    def load(self, key):
+        try:
+            return self.board.read_page(key)
+        except (ValueError, zlib.error) as e:
+            print(f"{self.board.path}: page {key + 1} could not be read ({e})")
+            return {"elements": [], "background_color": "#FFFFFF"}
+
+    def discard(self, key):
+        """Nothing to free: the page is still in the file"""
+
+
+def _json_bytes(value):
+    return json.dumps(value, separators=(",", ":")).encode("utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert saved whiteboard files to compressed boards")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack_parser = commands.add_parser("pack", help="Write a board as a .wbz file")
+    pack_parser.add_argument("board", help="Saved .wb file (plain, or gzip- or zstd-compressed)")
+    pack_parser.add_argument("output", help=".wbz file to write")
+    pack_parser.add_argument("--codec", choices=available_codecs(), default=default_codec(),
+                             help="\"none\" stores pages uncompressed, for large boards opened read-only")
+    pack_parser.add_argument("--level", type=int, help="Compression level")
+    args = parser.parse_args()
+
+    settings = {}
+    number, skipped = 0, []
+    with open(args.output, "wb") as f:
+        writer = ContainerWriter(f, args.codec, args.level)
+        try:
+            # Pages are copied one at a time; the settings frame can go anywhere
+            with open_text(args.board) as board:
+                for key, value in iter_board(board, verify=True):
+                    if key != "pages":
+                        settings[key] = value
+                        continue
+                    number += 1
+                    # iter_board leaves the checksum on pages that fail it; add_page would sign them again
+                    if not isinstance(value, dict) or CHECKSUM_KEY in value:
+                        skipped.append(number)
+                        continue
+                    writer.add_page(value)
+        except (ValueError, EOFError) as e:
+            writer.abort()
+            print(f"Could not read {args.board}: {e} (open it in the app to recover what is intact)")
+            return 1
+        writer.write_settings(settings)
+        count = writer.close()
+    if skipped:
+        print(f"Pages that failed their checksum were skipped: {', '.join(map(str, skipped))}")
+    print(f"Wrote {count} pages to {args.output} ({args.codec})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
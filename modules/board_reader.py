@@ -0,0 +1,362 @@
+"""
+Reading and validating saved boards (.wb files) outside the UI.
+
+read_board() is a plain module-level function so it can run in worker
+processes: it parses one file, validates every page, and returns each
+page already packed the way PageStore keeps inactive pages (compact,
+zlib-compressed JSON plus its content digest). Only those blobs cross
+back to the UI process, which adds them to its page list without
+parsing, rendering or even decompressing them.
+
+Saved pages carry a checksum of their own content, so load_board() can
+leave out a page that was damaged on disk and keep the rest of the board.
+A file that does not parse at all is salvaged with the streaming reader
+in modules.board_stream. Compressed boards (see modules.board_container)
+are read the same way.
+"""
+import json
+import math
+import os
+import zlib
+
+from modules.board_container import BoardContainer, open_text, sniff
+from modules.board_stream import CHECKSUM_KEY, iter_board, page_checksum, recover_board
+from modules.page_store import content_digest
+from modules.style_table import upgrade_legacy_page
+from modules.timeline import page_start
+
+POINT_TYPES = {"line": 4, "polygon": 6}     # Minimum number of coordinates
+BOX_TYPES = ("rectangle", "oval")
+OBJECT_TYPES = ("line", "polygon", "rectangle", "oval", "text")
+# Saved as "version" ahead of the pages. Older boards ("1.0", with the
+# settings after the pages) saved colors as shown, so the white ink of those
+# saved in dark mode is mapped back
+BOARD_VERSION = "1.1"
+
+
+class BoardError(ValueError):
+    """A file that is not a readable board"""
+
+
+def _numbers(values, minimum):
+    return (isinstance(values, list) and len(values) >= minimum and len(values) % 2 == 0
+            and all(isinstance(v, (int, float)) and not isinstance(v, bool) and math.isfinite(v)
+                    for v in values))
+
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+def valid_element(element):
+    """True if a page entry (FileManager "elements" or CanvasManager "objects" format) can be drawn"""
+    if not isinstance(element, dict):
+        return False
+    element_type = element.get("type")
+    if "coords" in element:
+        # CanvasManager objects: {type, coords, options}
+        coords = element["coords"]
+        if element_type not in OBJECT_TYPES or not isinstance(element.get("options", {}), dict):
+            return False
+        if isinstance(coords, list):
+            try:
+                coords = [float(v) for v in coords]
+            except (TypeError, ValueError):
+                return False
+        minimum = 2 if element_type == "text" else POINT_TYPES.get(element_type, 4)
+        return _numbers(coords, minimum)
+    if element_type in POINT_TYPES:
+        return _numbers(element.get("points"), POINT_TYPES[element_type])
+    if element_type in BOX_TYPES:
+        return all(_number(element.get(key)) for key in ("x1", "y1", "x2", "y2"))
+    if element_type == "text":
+        return _number(element.get("x")) and _number(element.get("y")) and isinstance(element.get("text"), str)
+    return False
+
+
+def validate_page(page):
+    """Return (page with only drawable entries, number of entries dropped); raises BoardError if page is not a page"""
+    if not isinstance(page, dict):
+        raise BoardError("page is not an object")
+    key = "objects" if page.get("objects") else "elements"
+    items = page.get(key, [])
+    if not isinstance(items, list):
+        raise BoardError(f"page {key} is not a list")
+    kept = [item for item in items if valid_element(item)]
+    clean = {key: kept, "background_color": page.get("background_color", "#FFFFFF")}
+    background = page.get("background")
+    if isinstance(background, dict) and isinstance(background.get("hash"), str):
+        clean["background"] = background
+    return clean, len(items) - len(kept)
+
+
+def check_pages(pages):
+    """Return (pages whose checksum matches, numbers from 1 of those that do not); pages saved without one pass"""
+    kept, damaged = [], []
+    for number, page in enumerate(pages, 1):
+        if isinstance(page, dict) and CHECKSUM_KEY in page and page[CHECKSUM_KEY] != page_checksum(page):
+            damaged.append(number)
+        else:
+            kept.append(page)
+    return kept, damaged
+
+
+def saved_as_shown(settings):
+    """True for the settings of an older board saved in dark mode, whose ink was saved white"""
+    return settings.get("version", "1.0") == "1.0" and settings.get("is_dark_mode") is True
+
+
+def kept_index(index, skipped):
+    """Position among the pages read of the page at index in the file, given the file indexes of skipped pages"""
+    return index - sum(1 for number in skipped if number < index)
+
+
+def load_board(path):
+    """
+    Read a board file, leaving out damaged pages.
+
+    Returns (data, problems). Pages that fail their checksum are dropped,
+    and a file that does not parse is salvaged page by page; problems
+    describes what was lost, one message per line. Raises BoardError if no
+    page could be read, and OSError if the file cannot be opened.
+    """
+    kind = sniff(path)
+    if kind == "container":
+        data, problems, skipped = _load_container(path)
+    else:
+        data, problems, skipped = _load_text(path, kind)
+    if not isinstance(data, dict) or not isinstance(data.get("pages"), list):
+        raise BoardError("no page list")
+
+    # File indexes of the pages read so far, to tell which ones fail their checksum
+    read = [index for index in range(len(data["pages"]) + len(skipped)) if index not in skipped]
+    data["pages"], damaged = check_pages(data["pages"])
+    if damaged:
+        damaged = [read[number - 1] for number in damaged]
+        skipped = sorted(skipped + damaged)
+        problems.append("Pages that failed their checksum were skipped: "
+                        + ", ".join(str(index + 1) for index in damaged))
+        if not data["pages"]:
+            raise BoardError("every page failed its checksum")
+    if saved_as_shown(data):
+        for page in data["pages"]:
+            upgrade_legacy_page(page)
+    if problems:
+        # Page positions changed, so the saved index is moved past the skipped pages
+        index = data.get("current_page_index")
+        index = kept_index(index, skipped) if isinstance(index, int) else 0
+        data["current_page_index"] = max(0, min(index, len(data["pages"]) - 1))
+    for problem in problems:
+        print(f"{os.path.basename(path)}: {problem}")
+    return data, problems
+
+
+def _load_text(path, kind):
+    """(data, problems, file indexes of skipped pages) of a plain board, compressed as a whole or not"""
+    problems = []
+    try:
+        with open_text(path, kind) as f:
+            data = {}
+            for key, value in iter_board(f, verify=True):
+                if key == "pages":
+                    data.setdefault("pages", []).append(value)
+                else:
+                    data[key] = value
+        return data, problems, []
+    except (ValueError, EOFError) as e:
+        failure = e
+    print(f"{os.path.basename(path)} is damaged ({failure}); recovering the pages that are intact")
+    with open_text(path, kind) as f:
+        data, report = recover_board(f)
+    if report["unreadable"]:
+        problems.append("Unreadable pages skipped: " + ", ".join(map(str, report["unreadable"])))
+    if report["partial"]:
+        problems.append(f"The file ends part way through page {report['partial']}; "
+                        f"its complete strokes were kept")
+    elif report["truncated"]:
+        problems.append("The file ends early; settings saved after the pages were lost")
+    if not data["pages"]:
+        raise BoardError(f"no intact pages ({failure})")
+    return data, problems, [number - 1 for number in report["unreadable"]]
+
+
+def _load_container(path):
+    """(data, problems, skipped page indexes) of a compressed board; its pages are checked against their CRC and checksum"""
+    problems, skipped = [], []
+    with BoardContainer(path) as board:
+        data = dict(board.settings)
+        data["pages"] = []
+        for number in range(len(board)):
+            try:
+                data["pages"].append(board.read_page(number))
+            except (ValueError, zlib.error) as e:
+                problems.append(f"Page {number + 1} was skipped: {e}")
+                skipped.append(number)
+        data.update(board.trailer)
+        if board.recovered:
+            problems.append("The file ends early; settings saved after the pages were lost")
+    if not data["pages"]:
+        raise BoardError("no intact pages")
+    return data, problems, skipped
+
+
+def stream_board(path, keep_index=None, compress_level=1):
+    """
+    Read a board incrementally, for loading it while it is being read.
+
+    Yields, in file order:
+        ("setting", key, value)     a top-level entry other than the pages
+        ("page", page, None)        the page to show, as a dict: keep_index,
+                                    or the saved current page, or else the first
+        ("page", None, packed)      any other page, already packed as pack_page() does
+                                    (its text entries are None when not known)
+        ("skipped", index)          the page at index in the file (from 0) was
+                                    left out; later pages move up one
+        ("restart", reason)         the file is damaged: drop everything so far,
+                                    what can be recovered follows
+        ("end", problems)           done; problems lists what was lost
+    Pages that fail their checksum are skipped. Only about one page is
+    decoded at a time. Raises OSError or BoardError if nothing can be read.
+    """
+    problems = []
+    kind = sniff(path)
+    if kind == "container":
+        yield from _stream_container(path, keep_index, compress_level, problems)
+        yield "end", problems
+        return
+    try:
+        with open_text(path, kind) as f:
+            yield from _stream_entries(iter_board(f, verify=True), keep_index, compress_level, problems,
+                                       lambda: _settings(path, kind))
+    except (ValueError, EOFError) as e:
+        # Damaged: salvage it the slow way, settings first as in a good file
+        yield "restart", str(e)
+        data, problems = load_board(path)
+        entries = [(key, value) for key, value in data.items() if key != "pages"]
+        entries.extend(("pages", page) for page in data["pages"])
+        yield from _stream_entries(iter(entries), keep_index, compress_level, [])
+    yield "end", problems
+
+
+def _stream_entries(entries, keep_index, compress_level, problems, read_settings=None):
+    """
+    stream_board() for (key, value) entries in file order. read_settings
+    returns all the board's settings, for a board that saves them after
+    its pages; it is only called for such a board.
+    """
+    number = 0
+    settings, legacy = {}, False
+    for key, value in entries:
+        if key != "pages":
+            if key == "current_page_index" and keep_index is None and isinstance(value, int):
+                keep_index = value
+            settings[key] = value
+            yield "setting", key, value
+            continue
+        if number == 0:
+            if "version" not in settings and read_settings is not None:
+                # An older board: whether it was saved in dark mode is only known from its end
+                settings = read_settings()
+            legacy = saved_as_shown(settings)
+        number += 1
+        if not isinstance(value, dict):
+            problems.append(f"Page {number} is not a page and was skipped")
+            yield "skipped", number - 1
+            continue
+        if CHECKSUM_KEY in value and value[CHECKSUM_KEY] != page_checksum(value):
+            problems.append(f"Page {number} failed its checksum and was skipped")
+            yield "skipped", number - 1
+            continue
+        value.pop(CHECKSUM_KEY, None)
+        if legacy:
+            upgrade_legacy_page(value)
+        if number - 1 == (keep_index or 0):
+            yield "page", value, None
+        else:
+            yield "page", None, pack_page(value, compress_level)
+
+
+def _settings(path, kind):
+    """Every entry of a plain board but its pages, as far as the file can be read"""
+    settings = {}
+    try:
+        with open_text(path, kind) as f:
+            for key, value in iter_board(f):
+                if key != "pages":
+                    settings[key] = value
+    except (ValueError, EOFError):
+        pass
+    return settings
+
+
+def _stream_container(path, keep_index, compress_level, problems):
+    """stream_board() for a compressed board: zlib pages go to PageStore without being decompressed"""
+    with BoardContainer(path) as board:
+        settings = board.settings
+        for key, value in settings.items():
+            yield "setting", key, value
+        if keep_index is None and isinstance(settings.get("current_page_index"), int):
+            keep_index = settings["current_page_index"]
+        # A packed older board keeps its version; its pages are decoded to map their ink
+        legacy = saved_as_shown(dict(board.trailer, **settings))
+        for number in range(len(board)):
+            try:
+                if number == (keep_index or 0):
+                    page = board.read_page(number)
+                    if legacy:
+                        upgrade_legacy_page(page)
+                elif legacy:
+                    packed = pack_page(upgrade_legacy_page(board.read_page(number)), compress_level)
+                else:
+                    packed = board.packed_page(number, compress_level) + (None,)
+            except (ValueError, zlib.error) as e:
+                problems.append(f"Page {number + 1} was skipped: {e}")
+                yield "skipped", number
+                continue
+            if number == (keep_index or 0):
+                yield "page", page, None
+            else:
+                yield "page", None, packed
+        for key, value in board.trailer.items():
+            yield "setting", key, value
+        if board.recovered:
+            problems.append("The file ends early; settings saved after the pages were lost")
+
+
+def pack_page(page, compress_level=1):
+    """
+    (blob, object count, digest, background, start, text entries) of a page;
+    all but the text entries are what PageStore.add_blob takes
+    """
+    items = page.get("objects") or page.get("elements") or []
+    blob = zlib.compress(json.dumps(page, separators=(",", ":")).encode("utf-8"), compress_level)
+    texts = [item for item in items if item.get("type") == "text"]
+    return blob, len(items), content_digest(items), page.get("background"), page_start(items), texts
+
+
+def read_board(path, compress_level=1):
+    """
+    Parse and validate one board file.
+
+    Returns {"path", "pages": [packed page, ...], "assets", "dropped",
+    "problems", "error"}; damaged pages are skipped as in load_board(). A
+    file that cannot be read has no pages and an error message instead of
+    raising, so one bad file does not stop a batch.
+    """
+    result = {"path": path, "pages": [], "assets": {}, "dropped": 0, "problems": [], "error": None}
+    try:
+        data, result["problems"] = load_board(path)
+        for number, page in enumerate(data["pages"], 1):
+            try:
+                page, dropped = validate_page(page)
+            except BoardError as e:
+                raise BoardError(f"page {number}: {e}")
+            result["dropped"] += dropped
+            result["pages"].append(pack_page(page, compress_level))
+        assets = data.get("assets")
+        if isinstance(assets, dict):
+            result["assets"] = assets
+    except (OSError, ValueError) as e:
+        result["pages"] = []
+        result["error"] = f"{os.path.basename(path)}: {e}"
+    return result
@@ -0,0 +1,300 @@
+"""
+Incremental reading and writing of saved boards (.wb files).
+
+A board is one JSON object whose "pages" list holds nearly all of the
+file. write_board() writes it a page at a time, each page as compact JSON
+on a line of its own with its checksum, and the settings ahead of the
+pages. BoardStream reads it back a chunk at a time and decodes one value
+at a time with json's raw_decode (in C); iter_board() hands out each page
+as soon as its text has been read, so neither side ever holds the whole
+board as text or as objects.
+
+recover_board() uses it to salvage what it can from a damaged file: every
+page that decodes is kept, a page that does not is skipped by looking for
+the start of the next one, and when the file ends part way through (a
+crash while saving) the complete elements of the last page are kept too.
+"""
+import hashlib
+import json
+import re
+
+CHECKSUM_KEY = "checksum"
+_COMPACT = (",", ":")
+_BLANK = re.compile(r"\s*")
+_SEPARATORS = re.compile(r"[\s,]*")
+# The start of a page object in the page list
+_PAGE_START = re.compile(r'\{\s*"(?:elements|objects|background_color|background|checksum)"\s*:')
+
+
+def page_checksum(page):
+    """Checksum of a saved page: a hash of its compact JSON, with keys sorted and without the checksum itself"""
+    return _checksum(_page_json(page))
+
+
+def page_text(page):
+    """A page as saved: compact JSON with sorted keys, ending in its checksum"""
+    # The checksum is of exactly the text before it, which is what page_checksum() hashes
+    text = _page_json(page)
+    return f'{text[:-1]}{"," if len(text) > 2 else ""}"{CHECKSUM_KEY}":"{_checksum(text)}"}}'
+
+
+def page_text_intact(text):
+    """
+    Check a page's saved text against the checksum at its end, without
+    decoding it. Returns True or False, or None if it has no checksum.
+    """
+    text = text.rstrip()
+    at = text.rfind(f'"{CHECKSUM_KEY}":"')
+    if at < 0 or not text.endswith('"}'):
+        return None
+    body = text[:at].rstrip()
+    if body.endswith(","):
+        body = body[:-1]
+    return _checksum(body + "}") == text[at + len(CHECKSUM_KEY) + 4:-2]
+
+
+def _page_json(page):
+    content = {key: value for key, value in page.items() if key != CHECKSUM_KEY}
+    return json.dumps(content, separators=_COMPACT, sort_keys=True)
+
+
+def _checksum(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def write_board(f, settings, pages, trailer=None):
+    """
+    Write a board to a text file a page at a time.
+
+    settings (current_page_index, layers...) are written first, so a reader
+    has them before any page. pages may be any iterable of page dicts, e.g.
+    a generator that unpacks one page at a time; each is written as one
+    line of compact JSON ending in its checksum. trailer, a dict or a
+    function returning one, is written after the pages, for entries
+    gathered while writing them. Returns the number of pages written.
+    """
+    f.write("{")
+    for key, value in settings.items():
+        f.write(f"{json.dumps(key)}:{json.dumps(value, separators=_COMPACT)},\n")
+    f.write('"pages":[')
+    count = 0
+    for page in pages:
+        f.write("\n" if count == 0 else ",\n")
+        f.write(page_text(page))
+        count += 1
+    f.write("\n]")
+    for key, value in (trailer() if callable(trailer) else trailer or {}).items():
+        f.write(f",\n{json.dumps(key)}:{json.dumps(value, separators=_COMPACT)}")
+    f.write("}\n")
+    return count
+
+
+def iter_board(f, verify=False):
+    """
+    Decode a board from a text file one entry at a time.
+
+    Yields ("pages", page) for every page and (key, value) for every other
+    top-level entry, in file order, holding no more than about one page of
+    text at a time. Raises ValueError if the file is damaged. With verify,
+    pages are checked against the checksum at the end of their text as
+    read, which is much cheaper than page_checksum(); the checksum is
+    removed from pages that match and left on those that do not.
+    """
+    stream = BoardStream(f)
+    stream.expect("{")
+    while True:
+        char = stream.peek(separators=True)
+        if char == "}":
+            return
+        if char == "":
+            raise ValueError("the file ends early")
+        key = stream.value()
+        stream.expect(":")
+        if key != "pages" or stream.peek() != "[":
+            yield key, stream.value()
+            continue
+        stream.expect("[")
+        while stream.peek(separators=True) != "]":
+            if stream.peek() == "":
+                raise ValueError("the file ends early")
+            start = stream.position()
+            page = stream.value()
+            if verify and isinstance(page, dict) and CHECKSUM_KEY in page:
+                text = stream.buffer[start - stream.position() + stream.pos:stream.pos]
+                if page_text_intact(text):
+                    del page[CHECKSUM_KEY]
+            yield "pages", page
+        stream.pos += 1
+
+
+class BoardStream:
+    """Reads JSON values one at a time from a text file opened for reading"""
+
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, f, chunk_size=None):
+        self.f = f
+        self.chunk_size = chunk_size or self.CHUNK_SIZE
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self._offset = 0            # Characters dropped from the front of the buffer
+        self._decoder = json.JSONDecoder()
+
+    def peek(self, separators=False):
+        """The next character after whitespace (and commas, with separators), without taking it; "" at the end"""
+        pattern = _SEPARATORS if separators else _BLANK
+        while True:
+            self.pos = pattern.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read(self.chunk_size):
+                return ""
+
+    def expect(self, char):
+        """Take the next character, which must be char"""
+        if self.peek() != char:
+            raise ValueError(f"expected {char!r} at character {self.position()}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next JSON value; raises json.JSONDecodeError if it is damaged or cut off"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Probably not all read yet: read at least as much again, so long values stay linear
+                if self._read(max(self.chunk_size, len(self.buffer) - self.pos)):
+                    continue
+                raise
+            if end == len(self.buffer) and self._read(self.chunk_size):
+                continue    # A number may go on in the next chunk
+            self.pos = end
+            return value
+
+    def skip_to_page(self):
+        """Move past a page that did not decode to the start of the next one; False if there is none"""
+        while True:
+            match = _PAGE_START.search(self.buffer, self.pos + 1)
+            if match:
+                self.pos = match.start()
+                return True
+            # Keep a little in case a page start straddles the chunk boundary
+            self.pos = max(self.pos, len(self.buffer) - 64)
+            if not self._read(self.chunk_size):
+                return False
+
+    def position(self):
+        """Characters read from the file before the current position"""
+        return self._offset + self.pos
+
+    def _read(self, size):
+        """Append up to size characters to the buffer; False at the end of the file"""
+        if self.eof:
+            return False
+        if self.pos > len(self.buffer) // 2:
+            # Drop what has been decoded already
+            self._offset += self.pos
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        try:
+            text = self.f.read(size)
+        except EOFError:
+            # A compressed file that was cut off
+            text = ""
+        if not text:
+            self.eof = True
+            return False
+        self.buffer += text
+        return True
+
+
+def salvage_object(text, pos):
+    """
+    Entries of a JSON object at text[pos] that was cut off: every entry that
+    is complete, and for lists the items that are complete.
+    """
+    decoder = json.JSONDecoder()
+    salvaged = {}
+    pos = _BLANK.match(text, pos + 1).end()
+    try:
+        while text[pos:pos + 1] == '"':
+            key, pos = decoder.raw_decode(text, pos)
+            pos = _BLANK.match(text, pos).end()
+            if text[pos:pos + 1] != ":":
+                break
+            pos = _BLANK.match(text, pos + 1).end()
+            if text[pos:pos + 1] == "[":
+                items = salvaged[key] = []
+                pos += 1
+                while True:
+                    pos = _SEPARATORS.match(text, pos).end()
+                    if text[pos:pos + 1] in ("]", ""):
+                        pos += 1
+                        break
+                    item, pos = decoder.raw_decode(text, pos)
+                    items.append(item)
+            else:
+                salvaged[key], pos = decoder.raw_decode(text, pos)
+            pos = _SEPARATORS.match(text, pos).end()
+    except json.JSONDecodeError:
+        pass
+    return salvaged
+
+
+def recover_board(f):
+    """
+    Read what can be read of a damaged board file.
+
+    Returns (data, report): the board's top-level entries with the pages
+    that decoded, and {"unreadable": numbers (from 1) of pages that did not
+    and were skipped, "partial": number of the page the file ends in, if it
+    ends part way through one, "truncated": whether the file ends early}.
+    The complete elements of a partial page are kept.
+    """
+    stream = BoardStream(f)
+    data, pages = {}, []
+    report = {"unreadable": [], "partial": None, "truncated": True}
+    try:
+        stream.expect("{")
+        while True:
+            char = stream.peek(separators=True)
+            if char == "}":
+                report["truncated"] = False
+                break
+            if char == "":
+                break
+            key = stream.value()
+            stream.expect(":")
+            if key != "pages" or stream.peek() != "[":
+                data[key] = stream.value()
+                continue
+            data["pages"] = pages
+            stream.expect("[")
+            while stream.peek(separators=True) not in ("]", ""):
+                start = stream.position()
+                try:
+                    pages.append(stream.value())
+                    continue
+                except json.JSONDecodeError:
+                    pass
+                number = len(pages) + len(report["unreadable"]) + 1
+                if stream.skip_to_page():
+                    report["unreadable"].append(number)
+                    continue
+                # No page follows: the file was cut off in this one, all of which is in the buffer
+                page = salvage_object(stream.buffer, start - stream.position() + stream.pos)
+                page.pop(CHECKSUM_KEY, None)
+                if page.get("objects") or page.get("elements"):
+                    pages.append(page)
+                    report["partial"] = number
+                else:
+                    report["unreadable"].append(number)
+                return data, report
+            if stream.peek(separators=True) == "]":
+                stream.pos += 1
+    except ValueError as e:
+        print(f"Recovery stopped at character {stream.position()}: {e}")
+    data.setdefault("pages", pages)
+    return data, report
@@ -0,0 +1,143 @@
+from modules.collaboration_manager import CollaborationManager
+from modules.broadcast_server import BroadcastServer, DEFAULT_BROADCAST_PORT, page_ops
+
+
+class BroadcastManager(CollaborationManager):
+    """
+    Read-only broadcast of one presenter's board to many viewers.
+
+    The presenter publishes the same ops as a shared session, including
+    the points of strokes in progress, and a "page" op with the page's
+    objects whenever it shows another page (in chunks, see page_ops). The
+    page's items are given "sync_" tags first, so later edits of them are
+    shared like those of newly drawn ones. A viewer draws nothing itself:
+    it clears and renders the page it is sent once all of it has arrived,
+    then applies the live ops incrementally on top.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.mode = None            # "presenter", "viewer" or None
+        self._presented_page = None
+        self._viewer_page = None
+        self._viewer_objects = None     # Objects of a page still arriving
+
+    def host_broadcast(self, port=DEFAULT_BROADCAST_PORT):
+        """Start a broadcast server inside this app and present to it"""
+        if self.server is None:
+            self.server = BroadcastServer(host="0.0.0.0", port=port)
+            self.server.run_in_thread()
+        self.present("127.0.0.1", self.server.port)
+
+    def present(self, host, port):
+        self.connect(host, port, role="presenter")
+        self.mode = "presenter"
+        self._presented_page = None
+        self._check_page()
+
+    def watch(self, host, port):
+        self.connect(host, port, role="viewer", publish=False)
+        self.mode = "viewer"
+        self._viewer_page = None
+        self._viewer_objects = None
+        self.app.read_only = True
+
+    def disconnect(self):
+        was_viewer = self.mode == "viewer"
+        super().disconnect()
+        self.mode = None
+        if was_viewer:
+            self.app.read_only = False
+            self.app.page_manager.update_page_info()
+
+    def prompt_present(self):
+        from tkinter import messagebox
+        try:
+            self.host_broadcast()
+            messagebox.showinfo("Broadcast", f"Broadcasting this board on port {self.server.port}")
+        except (OSError, ConnectionError) as e:
+            print(f"Error starting broadcast: {e}")
+            messagebox.showerror("Broadcast", f"Could not start broadcast: {e}")
+
+    def prompt_watch(self):
+        from tkinter import simpledialog, messagebox
+        address = simpledialog.askstring(
+            "Watch Broadcast", "Presenter address (host:port):",
+            initialvalue=f"127.0.0.1:{DEFAULT_BROADCAST_PORT}", parent=self.app.root
+        )
+        if not address:
+            return
+        host, _, port = address.rpartition(":")
+        try:
+            self.watch(host or "127.0.0.1", int(port))
+        except (ValueError, ConnectionError) as e:
+            print(f"Error watching broadcast: {e}")
+            messagebox.showerror("Watch Broadcast", f"Could not watch broadcast: {e}")
+
+    # Presenter
+
+    def _page(self):
+        # Viewers only ever see the page being presented, so its position names it
+        return self.app.page_manager.current_page_index
+
+    def _on_canvas_event(self, event, data):
+        # A page change must reach the server before anything drawn on the new page
+        self._check_page()
+        super()._on_canvas_event(event, data)
+        # Presenters get no echo from the broadcast server, so nothing stays pending
+        self._pending_local.clear()
+
+    def _after_poll(self):
+        if self.mode == "presenter":
+            self._check_page()
+
+    def _check_page(self):
+        page_index = self._page()
+        if self.mode != "presenter" or page_index == self._presented_page:
+            return
+        self._presented_page = page_index
+        canvas_manager = self.app.canvas_manager
+        if canvas_manager.is_rendering():
+            canvas_manager.renderer.finish()
+        # Items drawn before the broadcast get element ids too (kept in the page's
+        # objects), so erasing, undoing or moving them reaches the viewers
+        for item in canvas_manager.document_items():
+            if self._element_id(item) is None:
+                canvas_manager.canvas.addtag_withtag(self._tag(self.client.new_element_id()), item)
+        objects = canvas_manager.get_canvas_objects()
+        for op in page_ops(page_index, objects):
+            self.client.send(op)
+        print(f"Broadcasting page {page_index + 1} with {len(objects)} objects")
+
+    # Viewer
+
+    def apply_remote_op(self, op):
+        if self.mode != "viewer":
+            super().apply_remote_op(op)
+            return
+
+        canvas_manager = self.app.canvas_manager
+        if op.get("op") in ("page", "page_more"):
+            if op["op"] == "page":
+                self._viewer_page = op.get("page", 0)
+                self._viewer_objects = []
+            elif self._viewer_objects is None or op.get("page", 0) != self._viewer_page:
+                return
+            self._viewer_objects.extend(op.get("objects", []))
+            if op.get("more"):
+                return
+            objects, self._viewer_objects = self._viewer_objects, None
+            self._remote_points.clear()
+            canvas_manager.clear_canvas(maintain_history=False)
+            canvas_manager.render_page(objects)
+            toolbar = self.app.toolbar_manager
+            if hasattr(toolbar, 'page_info'):
+                toolbar.page_info.config(text=f"Live: Page {self._viewer_page + 1}")
+            return
+
+        if op.get("page", 0) != self._viewer_page:
+            return
+        if op.get("op") in ("erase", "clear") and canvas_manager.is_rendering():
+            # The erased item may still be waiting in the page render
+            canvas_manager.renderer.finish()
+        self.apply_to_canvas(op)
@@ -0,0 +1,159 @@
+"""
+Fan-out server for read-only broadcasts (one presenter, many viewers).
+
+The presenter streams the same compact ops as a shared session, including
+the points of strokes still being drawn, plus a "page" op carrying the
+page's objects (PageManager format) whenever it changes page. A page
+with many objects is sent as a "page" op followed by "page_more" ops
+(see page_ops), "more" being true on all but the last. Viewers are
+read-only. A late joiner gets a snapshot of the current page (the page's
+objects plus the ops drawn on it since) and then the live stream.
+
+Run with:
+    python -m modules.broadcast_server --host 0.0.0.0 --port 8766
+"""
+import argparse
+import asyncio
+
+from modules.sync_document import transform_coords
+from modules.sync_server import SyncServer, DEFAULT_HOST, encode_frames
+
+DEFAULT_BROADCAST_PORT = 8766
+PAGE_CHUNK_OBJECTS = 500
+
+
+def page_ops(page, objects, chunk=PAGE_CHUNK_OBJECTS):
+    """The ops that send a page's objects, chunk objects at a time"""
+    ops = []
+    for start in range(0, max(len(objects), 1), chunk):
+        ops.append({"op": "page" if start == 0 else "page_more", "page": page,
+                    "objects": objects[start:start + chunk], "more": start + chunk < len(objects)})
+    return ops
+
+
+class BroadcastServer(SyncServer):
+    # A viewer whose unsent backlog grows past this is dropped; it can rejoin for a fresh snapshot
+    MAX_VIEWER_BACKLOG = 1024 * 1024
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_BROADCAST_PORT):
+        super().__init__(host, port)
+        self.presenters = set()
+        self.viewers = set()
+        self.current_page = 0
+        self.page_objects = []
+
+    async def on_connect(self, writer):
+        # Nothing is sent until the client says whether it presents or watches
+        pass
+
+    def on_disconnect(self, writer):
+        self.presenters.discard(writer)
+        self.viewers.discard(writer)
+
+    def snapshot(self):
+        """Compact state of the current page for a late joiner"""
+        ops = page_ops(self.current_page, self.page_objects)
+        ops.extend(self.document.snapshot(page=self.current_page))
+        return ops
+
+    async def handle_message(self, message, writer):
+        kind = message.get("type")
+        if kind == "hello":
+            if message.get("role") == "presenter":
+                self.presenters.add(writer)
+                print("Presenter joined the broadcast")
+            else:
+                self.viewers.add(writer)
+                self.send_welcome(writer, self.snapshot())
+                print(f"Viewer joined ({len(self.viewers)} watching)")
+            return
+
+        # Viewers are read-only
+        if kind != "ops" or writer not in self.presenters:
+            return
+
+        client = message.get("client")
+        accepted = []
+        for op in message.get("ops", []):
+            if not isinstance(op, dict):
+                continue
+            self.seq += 1
+            op = dict(op, seq=self.seq, client=client)
+            if op.get("op") == "page":
+                # The page op carries the page's full content, so earlier ops on it are dropped
+                self.current_page = op.get("page", 0)
+                self.page_objects = list(op.get("objects", []))
+                self.document.pages[self.current_page] = {}
+                accepted.append(op)
+            elif op.get("op") == "page_more":
+                if op.get("page", 0) == self.current_page:
+                    self.page_objects.extend(op.get("objects", []))
+                    accepted.append(op)
+            elif self._apply_to_page_objects(op) or self.document.apply(op):
+                accepted.append(op)
+
+        if accepted:
+            self.fan_out({"type": "ops", "ops": accepted})
+
+    def _apply_to_page_objects(self, op):
+        """
+        Keep the current page's objects up to date for late joiners. Their
+        items carry "sync_" tags too, so they can be erased, edited and
+        moved; returns True when op was about one of them.
+        """
+        if op.get("page", 0) != self.current_page:
+            return False
+        if op.get("op") == "clear":
+            self.page_objects = []
+            return False
+        tag = "sync_" + str(op.get("id"))
+
+        def tagged(obj):
+            return tag in str(obj.get("options", {}).get("tags", "")).split()
+
+        matches = [obj for obj in self.page_objects if tagged(obj)]
+        if not matches:
+            return False
+        kind = op.get("op")
+        if kind == "erase":
+            self.page_objects = [obj for obj in self.page_objects if not tagged(obj)]
+        elif kind == "text":
+            for obj in matches:
+                obj["options"]["text"] = op.get("text", "")
+        elif kind == "transform":
+            for obj in matches:
+                coords = transform_coords(obj["coords"], op.get("transform"),
+                                          box=obj.get("type") in ("rectangle", "oval"))
+                if coords is None:
+                    return False
+                obj["coords"] = coords
+        else:
+            return False
+        return True
+
+    def fan_out(self, message):
+        """Encode once and queue the frames on every viewer without waiting on any of them"""
+        frames = encode_frames(message, "ops")
+        for viewer in list(self.viewers):
+            if viewer.transport.get_write_buffer_size() > self.MAX_VIEWER_BACKLOG:
+                print("Dropping a viewer that cannot keep up")
+                self.viewers.discard(viewer)
+                viewer.close()
+                continue
+            for frame in frames:
+                viewer.write(frame)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Digital Whiteboard broadcast server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_BROADCAST_PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(BroadcastServer(args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        print("Broadcast server stopped")
+
+
+if __name__ == "__main__":
+    main()
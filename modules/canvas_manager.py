@@ -1,11 +1,23 @@
+import itertools
 import tkinter as tk
 from tkinter import ttk
 from collections import deque
+from modules.batch_renderer import BatchRenderer
+from modules.style_table import StyleTable
+from modules.grid_renderer import GridRenderer
+from modules.timeline import Timeline, TIME_TAG_PREFIX, time_tag
+from modules.layer_manager import LAYER_TAG_PREFIX
+from modules.shape_recognizer import recognize
+from modules.ink_stroke import stroke_outline, width_factor
+from modules.font_metrics import FontMetrics
 
 class CanvasManager:
     def __init__(self, app):
         self.app = app
         self.canvas = None
+        self.renderer = None
+        self.styles = StyleTable()
+        self.grid = None
         self.h_scrollbar = None
         self.v_scrollbar = None
         
@@ -16,6 +28,25 @@ class CanvasManager:
         # Drawing state variables
         self.last_x, self.last_y = None, None
         self.shape_start_x, self.shape_start_y = None, None
+        # Points, times, widths and segment items of the brush stroke being drawn,
+        # for shape recognition and variable-width ink
+        self._stroke_points = []
+        self._stroke_times = []
+        self._stroke_widths = []
+        self._stroke_items = []
+        
+        # Callbacks told about drawing operations, called as listener(event, data)
+        self.listeners = []
+        
+        # Every drawn item is tagged with its time on this clock, for replay
+        self.timeline = Timeline()
+        
+        # Bumped whenever items change other than through the listener events
+        # (page switch, load, remote edits), so indexes know to rebuild
+        self.content_version = 0
+        
+        # Selection outlines and handles: on the canvas but not part of the page
+        self.overlay_ids = set()
     
     def create_canvas(self, parent):
         """Create canvas with scrollbars"""
@@ -31,12 +62,12 @@ class CanvasManager:
         self.h_scrollbar = ttk.Scrollbar(
             parent,
             orient=tk.HORIZONTAL,
-            command=self.canvas.xview
+            command=self._xview
         )
         self.v_scrollbar = ttk.Scrollbar(
             parent,
             orient=tk.VERTICAL,
-            command=self.canvas.yview
+            command=self._yview
         )
         self.canvas.configure(
             xscrollcommand=self.h_scrollbar.set,
@@ -47,6 +78,32 @@ class CanvasManager:
         self.h_scrollbar.pack(side=tk.BOTTOM, fill=tk.X)
         self.v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        # Text layout without a Tk round trip per string
+        self.font_metrics = FontMetrics(self.canvas)
+
+        # Bulk renderer used when restoring whole pages
+        self.renderer = BatchRenderer(self.canvas, style_resolver=self.resolve_style, metrics=self.font_metrics)
+
+        # Grid lines are pooled and re-laid out whenever the viewport changes
+        self.grid = GridRenderer(self.canvas)
+        self.canvas.bind("<Configure>", self.grid.schedule_layout, add="+")
+
+    def _xview(self, *args):
+        self.canvas.xview(*args)
+        self.grid.schedule_layout()
+
+    def _yview(self, *args):
+        self.canvas.yview(*args)
+        self.grid.schedule_layout()
+
+    def scroll_to(self, x, y):
+        """Scroll so that canvas point (x, y) is in the middle of the view"""
+        left, top, right, bottom = [float(v) for v in self.canvas.tk.splitlist(self.canvas.cget("scrollregion"))]
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        self.canvas.xview_moveto((x - width / 2 - left) / max(1, right - left))
+        self.canvas.yview_moveto((y - height / 2 - top) / max(1, bottom - top))
+        self.grid.schedule_layout()
     
     def setup_bindings(self):
         self.canvas.bind("<Button-1>", self.start_draw)
@@ -54,19 +111,48 @@ class CanvasManager:
         self.canvas.bind("<ButtonRelease-1>", self.stop_draw)
         self.canvas.bind("<MouseWheel>", self.zoom_canvas)
     
+    def _can_draw(self):
+        """Drawing is blocked while watching a broadcast or on a hidden/locked layer"""
+        if self.app.read_only:
+            return False
+        if self.app.current_tool not in ("eraser", "select", "lasso") and hasattr(self.app, 'layer_manager'):
+            return self.app.layer_manager.can_draw()
+        return True
+    
     def start_draw(self, event):
+        if not self._can_draw():
+            return
+        if self.app.current_tool in ("select", "lasso"):
+            self.app.selection_manager.press(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+            return
+        if self.app.current_tool == "text":
+            self.app.text_manager.press(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+            return
         self.last_x = self.canvas.canvasx(event.x)
         self.last_y = self.canvas.canvasy(event.y)
         # For shapes, store the initial point separately
         self.shape_start_x = self.last_x
         self.shape_start_y = self.last_y
+        if self.app.current_tool == "brush":
+            self._stroke_points = [self.last_x, self.last_y]
+            self._stroke_times = [event.time]
+            self._stroke_widths = [self._ink_width(event)]
+            self._stroke_items = []
+            self._notify("stroke_start", x=self.last_x, y=self.last_y,
+                         color=self.app.brush_color, width=self.app.brush_size)
 
     def draw(self, event):
+        if not self._can_draw():
+            return
         x = self.canvas.canvasx(event.x)
         y = self.canvas.canvasy(event.y)
         
+        if self.app.current_tool in ("select", "lasso"):
+            self.app.selection_manager.drag(x, y)
+            return
+        
         if self.app.current_tool in ["brush", "eraser"]:
-            color = "white" if self.app.current_tool == "eraser" else self.get_draw_color(self.app.brush_color)
+            color, style_tags = self.resolve_style(self.app.brush_color, "fill")
             
             # For eraser tool, handle preserving grid lines differently
             if self.app.current_tool == "eraser":
@@ -74,9 +160,11 @@ class CanvasManager:
                 items_at_position = self.canvas.find_overlapping(x-self.app.brush_size/2, y-self.app.brush_size/2, 
                                                                x+self.app.brush_size/2, y+self.app.brush_size/2)
                 
-                # Only erase non-grid items
+                # Only erase non-grid items on unlocked layers
                 for item in items_at_position:
-                    if item and "grid" not in self.canvas.gettags(item):
+                    if (item and not self.grid.is_grid_item(item) and item not in self.overlay_ids
+                            and self.app.layer_manager.is_erasable(item)):
+                        self._notify("erase", item=item)
                         self.canvas.delete(item)
                         # Track the deletion in undo stack - simplified for this example
                         self.undo_stack.append({
@@ -90,21 +178,29 @@ class CanvasManager:
                 return
             
             # Normal drawing tool behavior continues as before
+            width = self._ink_width(event, x, y)
             line = self.canvas.create_line(
                 self.last_x, self.last_y, x, y,
-                width=self.app.brush_size,
+                width=width,
                 fill=color,
                 capstyle=tk.ROUND,
-                smooth=True
+                smooth=True,
+                tags=style_tags + (time_tag(self.timeline.now()),) + self.app.layer_manager.tags()
             )
+            self.app.layer_manager.place(line)
             self.undo_stack.append({
                 "type": "line",
                 "id": line,
                 "coords": [self.last_x, self.last_y, x, y],
-                "color": color,
-                "width": self.app.brush_size
+                "color": self.app.brush_color,
+                "width": width
             })
             self.redo_stack.clear()
+            self._stroke_points.extend((x, y))
+            self._stroke_times.append(event.time)
+            self._stroke_widths.append(width)
+            self._stroke_items.append(line)
+            self._notify("stroke_segment", item=line, x=x, y=y)
             self.last_x = x
             self.last_y = y  # Only update for brush/eraser
         
@@ -135,81 +231,234 @@ class CanvasManager:
         # Do not update self.last_x/self.last_y for shapes
 
     def stop_draw(self, event):
-        if self.app.current_tool in ["rectangle", "circle", "line"]:
+        if not self._can_draw():
+            return
+        if self.app.current_tool in ("select", "lasso"):
+            self.app.selection_manager.release(self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
+        elif self.app.current_tool == "brush":
+            self._notify("stroke_end")
+            recognized = self.app.recognize_shapes and self._recognize_stroke()
+            if not recognized and self.app.variable_width:
+                self._fill_stroke()
+        elif self.app.current_tool in ["rectangle", "circle", "line"]:
             x = self.canvas.canvasx(event.x)
             y = self.canvas.canvasy(event.y)
             shape = None
             
             # Use shape_start_x/y as the fixed starting point
-            if self.app.current_tool == "rectangle":
-                shape = self.canvas.create_rectangle(
-                    self.shape_start_x, self.shape_start_y, x, y,
-                    outline=self.get_draw_color(self.app.brush_color),
-                    width=self.app.brush_size
-                )
-            elif self.app.current_tool == "circle":
-                shape = self.canvas.create_oval(
-                    self.shape_start_x, self.shape_start_y, x, y,
-                    outline=self.get_draw_color(self.app.brush_color),
-                    width=self.app.brush_size
-                )
-            elif self.app.current_tool == "line":
-                shape = self.canvas.create_line(
-                    self.shape_start_x, self.shape_start_y, x, y,
-                    fill=self.get_draw_color(self.app.brush_color),
-                    width=self.app.brush_size
-                )
+            shape = self._create_shape(
+                self.app.current_tool,
+                [self.shape_start_x, self.shape_start_y, x, y],
+                self.app.brush_color,
+                self.app.brush_size
+            )
             
             if shape:
+                self.canvas.addtag_withtag(time_tag(self.timeline.now()), shape)
                 self.undo_stack.append({
                     "type": self.app.current_tool,
                     "id": shape,
                     "coords": [self.shape_start_x, self.shape_start_y, x, y],
-                    "color": self.get_draw_color(self.app.brush_color),
+                    "color": self.app.brush_color,
                     "width": self.app.brush_size
                 })
                 self.redo_stack.clear()
+                self._notify("shape", item=shape, tool=self.app.current_tool,
+                             coords=[self.shape_start_x, self.shape_start_y, x, y],
+                             color=self.app.brush_color, width=self.app.brush_size)
             
             self.canvas.delete("temp_shape")
 
+    def _ink_width(self, event, x=None, y=None):
+        """
+        Width of the brush at this event: from stylus pressure if the event
+        carries it, otherwise slower strokes are drawn wider
+        """
+        if not self.app.variable_width:
+            return self.app.brush_size
+        pressure = getattr(event, "pressure", None)
+        speed = None
+        previous = None
+        if x is not None and self._stroke_widths:
+            speed = ((x - self.last_x) ** 2 + (y - self.last_y) ** 2) ** 0.5 / max(1, event.time - self._stroke_times[-1])
+            previous = self._stroke_widths[-1] / self.app.brush_size
+        return self.app.brush_size * width_factor(speed, pressure, previous)
+
+    def _fill_stroke(self):
+        """Replace the brush stroke's segments with one filled outline polygon"""
+        items = self._stroke_items
+        if not items:
+            return
+        coords = stroke_outline(self._stroke_points, self._stroke_widths)
+        # The first segment's tags carry the stroke's style, time, layer and sync id
+        polygon = self.canvas.create_polygon(*coords, fill=self.canvas.itemcget(items[0], "fill"),
+                                             outline="", smooth=True, tags=self.canvas.gettags(items[0]))
+        self.canvas.tag_lower(polygon, items[0])
+        
+        segments = set(items)
+        while self.undo_stack and self.undo_stack[-1].get("id") in segments:
+            self.undo_stack.pop()
+        self.canvas.delete(*items)
+        self.undo_stack.append({
+            "type": "polygon",
+            "id": polygon,
+            "coords": coords,
+            "color": self.app.brush_color,
+            "width": self.app.brush_size
+        })
+        # The segments went away without erase events; indexes of items rebuild
+        self.content_version += 1
+
+    def _recognize_stroke(self):
+        """Replace the brush stroke just finished with the shape it was drawn as; True if it was"""
+        items = self._stroke_items
+        if len(items) < 2:
+            return False
+        result = recognize(self._stroke_points)
+        if result is None:
+            return False
+        kind, coords = result
+        tool = {"oval": "circle", "arrow": "line"}.get(kind, kind)
+        arrow = kind == "arrow"
+        
+        # The stroke's segments leave the canvas and the undo history together
+        segments = set(items)
+        while self.undo_stack and self.undo_stack[-1].get("id") in segments:
+            self.undo_stack.pop()
+        for item in items:
+            self._notify("erase", item=item)
+        self.canvas.delete(*items)
+        
+        shape = self._create_shape(tool, coords, self.app.brush_color, self.app.brush_size, arrow=arrow)
+        self.canvas.addtag_withtag(time_tag(self.timeline.now()), shape)
+        self.undo_stack.append({
+            "type": tool,
+            "id": shape,
+            "coords": coords,
+            "color": self.app.brush_color,
+            "width": self.app.brush_size,
+            "arrow": arrow
+        })
+        self._notify("shape", item=shape, tool=tool, coords=coords,
+                     color=self.app.brush_color, width=self.app.brush_size, arrow=arrow)
+        print(f"Recognized a {kind} drawn with {len(items)} segments")
+        return True
+
+    def _create_shape(self, tool, coords, color, width, layer=None, arrow=False):
+        """
+        Create a finished rectangle/circle/line/filled polygon item in a (possibly
+        themed) color on the given layer (the current layer by default); lines may
+        end in an arrowhead
+        """
+        layer_tags = self.app.layer_manager.tags(layer)
+        if tool == "line":
+            fill, style_tags = self.resolve_style(color, "fill")
+            shape = self.canvas.create_line(*coords, fill=fill, width=width, tags=style_tags + layer_tags,
+                                            arrow=tk.LAST if arrow else tk.NONE)
+        elif tool == "rectangle":
+            outline_color, style_tags = self.resolve_style(color, "outline")
+            shape = self.canvas.create_rectangle(*coords, outline=outline_color, width=width,
+                                                 tags=style_tags + layer_tags)
+        elif tool == "circle":
+            outline_color, style_tags = self.resolve_style(color, "outline")
+            shape = self.canvas.create_oval(*coords, outline=outline_color, width=width,
+                                            tags=style_tags + layer_tags)
+        elif tool == "polygon":
+            fill, style_tags = self.resolve_style(color, "fill")
+            shape = self.canvas.create_polygon(*coords, fill=fill, outline="", smooth=True,
+                                               tags=style_tags + layer_tags)
+        else:
+            return None
+        self.app.layer_manager.place(shape, layer)
+        return shape
+
+    def add_listener(self, listener):
+        """Register listener(event, data) to be told about drawing operations"""
+        if listener not in self.listeners:
+            self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _notify(self, event, **data):
+        for listener in list(self.listeners):
+            try:
+                listener(event, data)
+            except Exception as e:
+                print(f"Error in canvas listener for {event}: {e}")
+
     def zoom_canvas(self, event):
         if event.state == 4:  # Check if Ctrl key is pressed
             factor = 1.1 if event.delta > 0 else 0.9
             self.app.zoom_level *= factor
             self.canvas.scale("all", event.x, event.y, factor, factor)
+            # The grid is re-laid out for the new zoom rather than scaled with the content
+            self.grid.on_zoom(event.x, event.y, factor)
+            # Cached layer images are redrawn at the new scale
+            self.app.layer_manager.invalidate()
+            self.app.background_manager.on_zoom(event.x, event.y, factor)
 
     def undo(self):
-        if self.undo_stack:
+        # Text being typed is committed first, so it is its own undo step
+        if hasattr(self.app, 'text_manager'):
+            self.app.text_manager.finish()
+        if self.undo_stack and not self.app.read_only:
             action = self.undo_stack.pop()
-            self.canvas.delete(action["id"])
+            if action["type"] == "transform":
+                self.app.selection_manager.apply_transform(action["tag"], action["transform"], inverse=True)
+            elif action["type"] == "text_edit":
+                self.app.text_manager.set_text(action["id"], action["before"])
+            elif action["type"] == "paste":
+                self.app.selection_manager.clear()
+                for item in self.canvas.find_withtag(action["id"]):
+                    self._notify("erase", item=item)
+                self.canvas.delete(action["id"])
+            else:
+                self._notify("erase", item=action["id"])
+                self.canvas.delete(action["id"])
             self.redo_stack.append(action)
 
     def redo(self):
-        if self.redo_stack:
+        # Text being typed is committed first, so it is its own undo step
+        if hasattr(self.app, 'text_manager'):
+            self.app.text_manager.finish()
+        if self.redo_stack and not self.app.read_only:
             action = self.redo_stack.pop()
             shape = None
             
-            if action["type"] in ["rectangle", "circle", "line"]:
-                if action["type"] == "rectangle":
-                    shape = self.canvas.create_rectangle(
-                        *action["coords"],
-                        outline=action["color"],
-                        width=action["width"]
-                    )
-                elif action["type"] == "circle":
-                    shape = self.canvas.create_oval(
-                        *action["coords"],
-                        outline=action["color"],
-                        width=action["width"]
-                    )
-                elif action["type"] == "line":
-                    shape = self.canvas.create_line(
-                        *action["coords"],
-                        fill=action["color"],
-                        width=action["width"]
-                    )
+            if action["type"] == "transform":
+                self.app.selection_manager.apply_transform(action["tag"], action["transform"])
+                self.undo_stack.append(action)
+            elif action["type"] == "paste":
+                action["id"] = self.app.clipboard_manager.insert(action["elements"], record=False)
+                self.undo_stack.append(action)
+            elif action["type"] == "text_edit":
+                self.app.text_manager.set_text(action["id"], action["after"])
+                self.undo_stack.append(action)
+            elif action["type"] == "text":
+                old_id, action["id"] = action["id"], self.app.text_manager.create(action["element"])
+                # Later edits of the label refer to the item it was before the undo
+                # (the stacks may be a deque and a list)
+                for entry in itertools.chain(self.undo_stack, self.redo_stack):
+                    if entry.get("type") == "text_edit" and entry["id"] == old_id:
+                        entry["id"] = action["id"]
+                self.undo_stack.append(action)
+                self._notify("text", item=action["id"])
+            elif action["type"] in ["rectangle", "circle", "line", "polygon"]:
+                shape = self._create_shape(
+                    action["type"],
+                    action["coords"],
+                    action["color"],
+                    action["width"],
+                    arrow=action.get("arrow", False)
+                )
                 action["id"] = shape
+                if shape:
+                    self.canvas.addtag_withtag(time_tag(self.timeline.now()), shape)
                 self.undo_stack.append(action)
+                self._notify("shape", item=shape, tool=action["type"], coords=action["coords"],
+                             color=action["color"], width=action["width"], arrow=action.get("arrow", False))
 
     def clear_canvas(self, maintain_history=True):
         """
@@ -218,10 +467,21 @@ class CanvasManager:
         """
         if maintain_history and hasattr(self, "save_state"):
             self.save_state()
-        for item_id in self.canvas.find_all():
-            tags = self.canvas.gettags(item_id)
-            if not tags or 'grid' not in tags:
-                self.canvas.delete(item_id)
+        if maintain_history:
+            self._notify("clear")
+        # Stop any page still being drawn progressively
+        if self.renderer:
+            self.renderer.cancel()
+        if hasattr(self.app, 'layer_manager'):
+            self.app.layer_manager.drop_rasters()
+        if hasattr(self.app, 'text_manager'):
+            self.app.text_manager.finish()
+        if hasattr(self.app, 'selection_manager'):
+            self.app.selection_manager.clear()
+        document_items = self.document_items()
+        if document_items:
+            self.canvas.delete(*document_items)
+        self.content_version += 1
         if hasattr(self, "redo_stack") and maintain_history:
             self.redo_stack = []
         # Optionally, reset undo stack if you want a true "clear all"
@@ -237,25 +497,38 @@ class CanvasManager:
     def get_canvas_objects(self):
         """Get all objects on the canvas as serializable data"""
         objects = []
-        all_items = self.canvas.find_all()
         
-        for item_id in all_items:
-            # Skip grid lines or other special items
-            if 'grid' in self.canvas.gettags(item_id):
-                continue
-                
+        for item_id in self.document_items():
+            tags = self.canvas.gettags(item_id)
             item_type = self.canvas.type(item_id)
             item_coords = self.canvas.coords(item_id)
             item_options = {}
             
             # Get all options for this item
+            # Keep element ids of shared (synced) items, timestamps and layers across page switches
+            kept_tags = [tag for tag in tags if tag.startswith(('sync_', TIME_TAG_PREFIX, LAYER_TAG_PREFIX))]
+            if kept_tags:
+                item_options['tags'] = ' '.join(kept_tags)
+            
+            # Themed colors are saved as their logical (light theme) value
             if item_type == 'line':
-                item_options['fill'] = self.canvas.itemcget(item_id, 'fill')
+                item_options['fill'] = self.styles.logical_color(tags, 'fill', self.canvas.itemcget(item_id, 'fill'))
                 item_options['width'] = self.canvas.itemcget(item_id, 'width')
-            elif item_type in ('oval', 'rectangle'):
+                if self.canvas.itemcget(item_id, 'arrow') not in ('', 'none'):
+                    item_options['arrow'] = self.canvas.itemcget(item_id, 'arrow')
+            elif item_type == 'polygon':
+                item_options['fill'] = self.styles.logical_color(tags, 'fill', self.canvas.itemcget(item_id, 'fill'))
                 item_options['outline'] = self.canvas.itemcget(item_id, 'outline')
+                item_options['smooth'] = self.canvas.itemcget(item_id, 'smooth')
+            elif item_type in ('oval', 'rectangle'):
+                item_options['outline'] = self.styles.logical_color(tags, 'outline', self.canvas.itemcget(item_id, 'outline'))
                 item_options['width'] = self.canvas.itemcget(item_id, 'width')
-                item_options['fill'] = self.canvas.itemcget(item_id, 'fill')
+                item_options['fill'] = self.styles.logical_color(tags, 'fill', self.canvas.itemcget(item_id, 'fill'))
+            elif item_type == 'text':
+                item_options['text'] = self.canvas.itemcget(item_id, 'text')
+                item_options['fill'] = self.styles.logical_color(tags, 'fill', self.canvas.itemcget(item_id, 'fill'))
+                item_options['font'] = self.canvas.itemcget(item_id, 'font')
+                item_options['anchor'] = self.canvas.itemcget(item_id, 'anchor')
                 
             objects.append({
                 'type': item_type,
@@ -266,42 +539,57 @@ class CanvasManager:
         print(f"Retrieved {len(objects)} canvas objects")
         return objects
 
-    def restore_canvas_objects(self, objects):
-        """Restore canvas objects from serialized data"""
+    def restore_canvas_objects(self, objects, chunk_size=None):
+        """Restore canvas objects from serialized data in one batched Tcl call"""
         if not objects:
             return
             
-        for obj in objects:
-            obj_type = obj['type']
-            coords = obj['coords']
-            options = obj['options']
-            
-            if obj_type == 'line':
-                self.canvas.create_line(coords, **options)
-            elif obj_type == 'oval':
-                self.canvas.create_oval(coords, **options)
-            elif obj_type == 'rectangle':
-                self.canvas.create_rectangle(coords, **options)
-            # Add handling for other types as needed
-                
-        print(f"Restored {len(objects)} canvas objects")
+        count = self.renderer.render(objects, chunk_size=chunk_size)
+        self.content_version += 1
+        print(f"Restored {count} canvas objects")
+
+    def get_viewport(self):
+        """Return the visible region as (x1, y1, x2, y2) in canvas coordinates"""
+        x1 = self.canvas.canvasx(0)
+        y1 = self.canvas.canvasy(0)
+        return x1, y1, x1 + self.canvas.winfo_width(), y1 + self.canvas.winfo_height()
+
+    def render_page(self, elements, on_complete=None):
+        """
+        Draw a page progressively, visible items first, without blocking the UI.
+        Any render still in progress is cancelled first.
+        """
+        def finished():
+            self.content_version += 1
+            # Items drawn on hidden or locked layers pick up the layer settings
+            self.app.layer_manager.apply()
+            if on_complete:
+                on_complete()
+        
+        count = self.renderer.render_progressive(
+            elements,
+            viewport=self.get_viewport(),
+            on_complete=finished
+        )
+        print(f"Rendering {count} canvas objects progressively")
+        return count
+
+    def is_rendering(self):
+        """True while a progressive page render has not finished"""
+        return bool(self.renderer and self.renderer.is_busy)
+
+    def document_items(self):
+        """
+        Return the ids of all canvas items that belong to the page
+        (grid, cached layer images and selection handles excluded)
+        """
+        rasters = self.app.layer_manager.raster_ids() if hasattr(self.app, 'layer_manager') else ()
+        return [item_id for item_id in self.canvas.find_all()
+                if not self.grid.is_grid_item(item_id) and item_id not in rasters
+                and item_id not in self.overlay_ids]
 
     def draw_grid(self):
-        self.canvas.delete("grid")
-        # Draw vertical lines
-        for i in range(0, int(self.canvas.winfo_width()), 20):
-            self.canvas.create_line(
-                i, 0, i, self.canvas.winfo_height(),
-                fill="gray90",
-                tags="grid"
-            )
-        # Draw horizontal lines
-        for i in range(0, int(self.canvas.winfo_height()), 20):
-            self.canvas.create_line(
-                0, i, self.canvas.winfo_width(), i,
-                fill="gray90",
-                tags="grid"
-            )
+        self.grid.show()
 
     def toggle_grid(self):
         self.app.grid_visible = not self.app.grid_visible
@@ -309,7 +597,7 @@ class CanvasManager:
             self.draw_grid()
             self.app.toolbar_manager.grid_button.config(text="Grid Off")
         else:
-            self.canvas.delete("grid")
+            self.grid.hide()
             self.app.toolbar_manager.grid_button.config(text="Grid On")
 
     def toggle_theme(self):
@@ -323,37 +611,9 @@ class CanvasManager:
         else:
             self.app.toolbar_manager.theme_button.config(text="Dark")
             
-        # Update all drawing colors on the canvas
-        for item in self.canvas.find_all():
-            # Skip grid lines
-            if "grid" in self.canvas.gettags(item):
-                continue
-                
-            # Get the item type to handle it appropriately
-            item_type = self.canvas.type(item)
-            
-            # Handle fill color for shapes and lines
-            try:
-                fill = self.canvas.itemcget(item, "fill")
-                if fill and fill != "":
-                    # Only convert black fill
-                    if fill.lower() in ["black", "#000000"]:
-                        self.canvas.itemconfig(item, fill="white" if self.app.is_dark_mode else "black")
-            except Exception:
-                # Item doesn't have fill property
-                pass
-
-            # Handle outline color for shapes (rectangles, ovals)
-            if item_type in ["rectangle", "oval"]:
-                try:
-                    outline = self.canvas.itemcget(item, "outline")
-                    if outline and outline != "":
-                        # Only convert black outline
-                        if outline.lower() in ["black", "#000000"]:
-                            self.canvas.itemconfig(item, outline="white" if self.app.is_dark_mode else "black")
-                except Exception:
-                    # Item doesn't have outline property
-                    pass
+        # Recolor themed items: one itemconfigure per style instead of per item
+        self.styles.apply(self.canvas, self.app.is_dark_mode)
+        self.app.layer_manager.invalidate()
 
     def set_dark_background(self, enable):
         """Enable or disable dark background mode."""
@@ -365,33 +625,28 @@ class CanvasManager:
             self._redraw_for_dark_mode()
 
     def _redraw_for_dark_mode(self):
-        """Redraw all objects to adapt to dark/light mode."""
-        # Get all items and their colors, then redraw black as white in dark mode
-        for item_id in self.canvas.find_all():
-            tags = self.canvas.gettags(item_id)
-            if 'grid' in tags:
-                continue
-            item_type = self.canvas.type(item_id)
-            if item_type in ("line", "oval", "rectangle"):
-                color = self.canvas.itemcget(item_id, "fill" if item_type == "line" else "outline")
-                if self.app.is_dark_mode and color == "black":
-                    # Change black to white for visibility
-                    if item_type == "line":
-                        self.canvas.itemconfig(item_id, fill="white")
-                    else:
-                        self.canvas.itemconfig(item_id, outline="white")
-                elif not self.app.is_dark_mode and color == "white":
-                    # Change white back to black in light mode
-                    if item_type == "line":
-                        self.canvas.itemconfig(item_id, fill="black")
-                    else:
-                        self.canvas.itemconfig(item_id, outline="black")
+        """Recolor themed objects for dark/light mode."""
+        self.styles.apply(self.canvas, self.app.is_dark_mode)
+        self.app.layer_manager.invalidate()
 
     def get_draw_color(self, color):
         """Return the color to use for drawing, adapting for dark mode."""
-        if self.app.is_dark_mode and color == "black":
-            return "white"
-        return color
+        return self.resolve_style(color, "fill")[0]
+
+    def resolve_style(self, color, attribute):
+        """
+        Return (display color, tags) for a color used as the given item attribute.
+        Styled colors get a tag so theme switches can recolor them in one call.
+        """
+        return self.styles.resolve(color, attribute, self.app.is_dark_mode)
+
+    def logical_color(self, item_id, attribute):
+        """Return the color of an item as it should be saved, ignoring the theme"""
+        return self.styles.logical_color(
+            self.canvas.gettags(item_id),
+            attribute,
+            self.canvas.itemcget(item_id, attribute)
+        )
 
     def export_canvas_as_image(self, filename):
         """
@@ -0,0 +1,180 @@
+import itertools
+import json
+import tkinter as tk
+
+from modules.layer_manager import DEFAULT_LAYER
+
+CLIPBOARD_FORMAT = "whiteboard-elements"
+CLIPBOARD_VERSION = 1
+
+
+def encode_payload(elements):
+    """Serialize elements (FileManager format) as compact clipboard text"""
+    payload = {"format": CLIPBOARD_FORMAT, "version": CLIPBOARD_VERSION, "elements": [
+        {key: _rounded(value) for key, value in element.items() if key not in ("t", "layer")}
+        for element in elements
+    ]}
+    return json.dumps(payload, separators=(",", ":"))
+
+
+def decode_payload(text):
+    """Return the elements of clipboard text written by encode_payload, or None for other text"""
+    try:
+        payload = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(payload, dict) or payload.get("format") != CLIPBOARD_FORMAT:
+        return None
+    elements = payload.get("elements")
+    return [element for element in elements if isinstance(element, dict)] if isinstance(elements, list) else None
+
+
+def _rounded(value):
+    # Sub-pixel precision is not visible and only makes the payload larger
+    if isinstance(value, float):
+        return round(value, 1)
+    if isinstance(value, list):
+        return [round(v, 1) if isinstance(v, float) else v for v in value]
+    return value
+
+
+def offset_element(element, dx, dy):
+    """Return a copy of a FileManager element moved by (dx, dy)"""
+    element = dict(element)
+    if "points" in element:
+        points = element["points"]
+        element["points"] = [v + (dy if i % 2 else dx) for i, v in enumerate(points)]
+    for x_key, y_key in (("x1", "y1"), ("x2", "y2"), ("x", "y")):
+        if x_key in element:
+            element[x_key] = element[x_key] + dx
+            element[y_key] = element.get(y_key, 0) + dy
+    return element
+
+
+class ClipboardManager:
+    """
+    Copy, paste and duplicate the selection, across pages and boards.
+
+    The clipboard holds the selected items as elements in the format
+    FileManager saves, serialized as compact JSON text, so another running
+    board can paste them too. Pasting draws all elements with one batched
+    Tcl call on the current layer, then selects them so they can be moved
+    straight away. A paste is a single undo step.
+    """
+
+    PASTE_OFFSET = 20       # Repeated pastes on the same page step down and right
+
+    def __init__(self, app):
+        self.app = app
+        self._paste_counter = itertools.count(1)
+        self._last_paste = None     # (payload text, page index, pastes so far)
+
+    def copy(self):
+        """Put the selected items on the clipboard"""
+        elements = self._selected_elements()
+        if not elements:
+            print("Nothing selected to copy")
+            return False
+        text = encode_payload(elements)
+        root = self.app.root
+        root.clipboard_clear()
+        root.clipboard_append(text)
+        # Pasting back onto the same page should not land exactly on top of the original
+        self._last_paste = (text, self.app.page_manager.current_page_index, 0)
+        print(f"Copied {len(elements)} elements ({len(text)} bytes)")
+        return True
+
+    def paste(self):
+        """Draw the elements on the clipboard onto the current page"""
+        if not self._can_insert():
+            return None
+        try:
+            text = self.app.root.clipboard_get()
+        except tk.TclError:
+            print("Clipboard is empty")
+            return None
+        elements = decode_payload(text)
+        if not elements:
+            print("Clipboard does not hold whiteboard elements")
+            return None
+
+        page = self.app.page_manager.current_page_index
+        pastes = 0
+        if self._last_paste is not None and self._last_paste[:2] == (text, page):
+            pastes = self._last_paste[2] + 1
+        self._last_paste = (text, page, pastes)
+        offset = self.PASTE_OFFSET * pastes
+        return self.insert([offset_element(element, offset, offset) for element in elements])
+
+    def duplicate(self):
+        """Copy the selection next to itself without touching the clipboard"""
+        if not self._can_insert():
+            return None
+        elements = self._selected_elements()
+        if not elements:
+            print("Nothing selected to duplicate")
+            return None
+        return self.insert([offset_element(element, self.PASTE_OFFSET, self.PASTE_OFFSET)
+                            for element in elements])
+
+    def insert(self, elements, record=True):
+        """
+        Draw elements on the current layer in one batch, select them and
+        return their shared tag. With record set the insert is an undo step.
+        """
+        canvas_manager = self.app.canvas_manager
+        layer_manager = self.app.layer_manager
+        if canvas_manager.is_rendering():
+            # A batch render would cancel the rest of the page
+            canvas_manager.renderer.finish()
+
+        tag = f"paste_{next(self._paste_counter)}"
+        stamp = canvas_manager.timeline.now()
+        placed = []
+        for element in elements:
+            element = dict(element)
+            element["t"] = stamp
+            element.pop("layer", None)
+            if layer_manager.current != DEFAULT_LAYER:
+                element["layer"] = layer_manager.current
+            placed.append(element)
+
+        count = canvas_manager.renderer.render(placed, tags=[tag])
+        canvas = canvas_manager.canvas
+        items = canvas.find_withtag(tag)
+        if not items:
+            return None
+        layer_manager.place(tag)
+
+        if record:
+            canvas_manager.undo_stack.append({
+                "type": "paste",
+                "id": tag,
+                "elements": placed
+            })
+            canvas_manager.redo_stack.clear()
+        canvas_manager._notify("paste", items=items)
+
+        if self.app.current_tool not in ("select", "lasso"):
+            self.app.set_tool("select")
+        self.app.selection_manager.select_items(items)
+        print(f"Pasted {count} elements")
+        return tag
+
+    def _can_insert(self):
+        if self.app.read_only:
+            return False
+        if not self.app.layer_manager.can_draw():
+            print(f"The {self.app.layer_manager.current} layer is hidden or locked")
+            return False
+        return True
+
+    def _selected_elements(self):
+        canvas = self.app.canvas_manager.canvas
+        file_manager = self.app.file_manager
+        elements = []
+        for item in self.app.selection_manager.selected:
+            element = file_manager.canvas_element(canvas, item)
+            if element is not None:
+                elements.append(element)
+        return elements
@@ -0,0 +1,473 @@
+import tkinter as tk
+from collections import OrderedDict
+
+from modules.page_store import PackedPage
+from modules.sync_client import SyncClient
+from modules.sync_document import transform_coords
+from modules.sync_server import SyncServer, DEFAULT_PORT
+from modules.timeline import time_tag
+from modules.layer_manager import layer_tag
+
+
+class CollaborationManager:
+    """
+    Optional real-time sync of drawing operations between whiteboards.
+
+    Listens to CanvasManager drawing events and publishes them as compact
+    ops through a SyncClient, and applies ops from other clients to the
+    canvas (or to the stored page if it is not on screen). Every shared
+    canvas item carries a "sync_<element id>" tag. While connected the
+    eraser and undo remove whole strokes, so every client holds the same
+    set of elements.
+
+    Ops name their page by a stable page id (the page's "id"), not its
+    position, so pages inserted by one client do not shift the others'
+    drawing. Pages that existed before connecting are "p<index>"; inserted
+    pages are shared as "add_page" ops with a new id.
+    """
+
+    POLL_INTERVAL_MS = 30
+    TAG_PREFIX = "sync_"
+
+    def __init__(self, app):
+        self.app = app
+        self.client = None
+        self.server = None
+        self._poll_job = None
+        self._current_stroke = None
+        self._publishing = False
+        # Set while a remote op is drawn, so the canvas events it causes are not sent back
+        self._applying_remote = False
+        # Local elements sent but not yet sequenced by the server, oldest first
+        self._pending_local = OrderedDict()
+        # Ids of pages we inserted that are not yet sequenced
+        self._pending_pages = set()
+        # Points of remote strokes still being drawn, by element id
+        self._remote_points = {}
+
+    @property
+    def is_connected(self):
+        return self.client is not None and self.client.connected.is_set()
+
+    def host_session(self, port=DEFAULT_PORT):
+        """Start a sync server inside this app and join it"""
+        if self.server is None:
+            self.server = SyncServer(host="0.0.0.0", port=port)
+            self.server.run_in_thread()
+        self.connect("127.0.0.1", self.server.port)
+
+    def connect(self, host, port, role=None, publish=True):
+        """
+        Join a shared session; raises ConnectionError if the server is unreachable.
+        With publish=False local drawing is not sent (used by broadcast viewers).
+        """
+        self.disconnect()
+        client = SyncClient(host, port, role=role)
+        client.start()
+        self.client = client
+        for index in range(len(self.app.page_manager.pages)):
+            self._page_id(index)
+        if publish:
+            self._publishing = True
+            self.app.canvas_manager.add_listener(self._on_canvas_event)
+        self._schedule_poll()
+        print(f"Joined sync session at {host}:{port} as {client.client_id}")
+
+    def disconnect(self):
+        if self.client is None:
+            return
+        self.app.canvas_manager.remove_listener(self._on_canvas_event)
+        self._publishing = False
+        if self._poll_job is not None:
+            self.app.root.after_cancel(self._poll_job)
+            self._poll_job = None
+        self.client.stop()
+        self.client = None
+        self._pending_local.clear()
+        self._pending_pages.clear()
+        self._remote_points.clear()
+        print("Left sync session")
+
+    def prompt_connect(self):
+        """Ask for host:port and join that session"""
+        from tkinter import simpledialog, messagebox
+        address = simpledialog.askstring(
+            "Join Session", "Server address (host:port):",
+            initialvalue=f"127.0.0.1:{DEFAULT_PORT}", parent=self.app.root
+        )
+        if not address:
+            return
+        host, _, port = address.rpartition(":")
+        try:
+            self.connect(host or "127.0.0.1", int(port))
+        except (ValueError, ConnectionError) as e:
+            print(f"Error joining session: {e}")
+            messagebox.showerror("Join Session", f"Could not join session: {e}")
+
+    def prompt_host(self):
+        from tkinter import messagebox
+        try:
+            self.host_session()
+            messagebox.showinfo("Host Session", f"Hosting a shared board on port {self.server.port}")
+        except (OSError, ConnectionError) as e:
+            print(f"Error hosting session: {e}")
+            messagebox.showerror("Host Session", f"Could not host session: {e}")
+
+    # Local -> server
+
+    def _tag(self, element_id):
+        return self.TAG_PREFIX + element_id
+
+    def _element_id(self, item):
+        for tag in self.app.canvas_manager.canvas.gettags(item):
+            if tag.startswith(self.TAG_PREFIX):
+                return tag[len(self.TAG_PREFIX):]
+        return None
+
+    def _page(self):
+        return self._page_id(self.app.page_manager.current_page_index)
+
+    def _page_id(self, index):
+        """The stable id of the page at index, given one if it has none yet"""
+        page = self.app.page_manager.pages[index]
+        page_id = page.page_id if isinstance(page, PackedPage) else page.get("id")
+        if page_id is None:
+            page_id = f"p{index}"
+            self._set_page_id(page, page_id)
+        return page_id
+
+    def _set_page_id(self, page, page_id):
+        if isinstance(page, PackedPage):
+            page.page_id = page_id
+        else:
+            page["id"] = page_id
+
+    def _page_index(self, page_id):
+        """Index of the page with page_id, or None if this board has no such page"""
+        for index, page in enumerate(self.app.page_manager.pages):
+            if (page.page_id if isinstance(page, PackedPage) else page.get("id")) == page_id:
+                return index
+        return None
+
+    def page_added(self, index):
+        """Share a page the user inserted at index (called by PageManager and PDF import)"""
+        if not self._publishing or not self.is_connected:
+            return
+        page_id = self.client.new_element_id()
+        self._set_page_id(self.app.page_manager.pages[index], page_id)
+        self._pending_pages.add(page_id)
+        self.client.send({"op": "add_page", "page": page_id,
+                          "after": self._page_id(index - 1) if index else None})
+
+    def _on_canvas_event(self, event, data):
+        if self._applying_remote:
+            return
+        canvas = self.app.canvas_manager.canvas
+        page = self._page()
+
+        if event == "stroke_start":
+            self._current_stroke = self.client.new_element_id()
+            self._pending_local[self._current_stroke] = True
+            self.client.send({"op": "begin", "page": page, "id": self._current_stroke,
+                              "color": data["color"], "width": data["width"],
+                              "pts": [data["x"], data["y"]]})
+
+        elif event == "stroke_segment" and self._current_stroke:
+            canvas.addtag_withtag(self._tag(self._current_stroke), data["item"])
+            self.client.send({"op": "pts", "page": page, "id": self._current_stroke,
+                              "pts": [data["x"], data["y"]]})
+
+        elif event == "stroke_end" and self._current_stroke:
+            self.client.send({"op": "end", "page": page, "id": self._current_stroke})
+            self._current_stroke = None
+
+        elif event == "shape":
+            element_id = self.client.new_element_id()
+            self._pending_local[element_id] = True
+            canvas.addtag_withtag(self._tag(element_id), data["item"])
+            op = {"op": "shape", "page": page, "id": element_id, "kind": data["tool"],
+                  "coords": list(data["coords"]), "color": data["color"], "width": data["width"]}
+            if data.get("arrow"):
+                op["arrow"] = True
+            self.client.send(op)
+
+        elif event == "erase":
+            element_id = self._element_id(data["item"])
+            if element_id:
+                # Shared strokes are erased as a whole on every client
+                canvas.delete(self._tag(element_id))
+                self.client.send({"op": "erase", "page": page, "id": element_id})
+
+        elif event == "clear":
+            self.client.send({"op": "clear", "page": page})
+
+        elif event == "paste":
+            self._send_pasted(data["items"], page)
+
+        elif event == "text":
+            self._send_text(data["item"], page)
+
+        elif event == "transform" and data.get("transform"):
+            # One op per shared element; a stroke's segments share its tag
+            sent = set()
+            for item in canvas.find_withtag(data["tag"]):
+                element_id = self._element_id(item)
+                if element_id and element_id not in sent:
+                    sent.add(element_id)
+                    self.client.send({"op": "transform", "page": page, "id": element_id,
+                                      "transform": list(data["transform"])})
+
+    def _send_text(self, item, page):
+        """Share a new or edited label as a "text" op (the label keeps its element id)"""
+        element = self.app.file_manager.canvas_element(self.app.canvas_manager.canvas, item)
+        if element is None:
+            return
+        element_id = self._element_id(item)
+        if element_id is None:
+            element_id = self.client.new_element_id()
+            self._pending_local[element_id] = True
+            self.app.canvas_manager.canvas.addtag_withtag(self._tag(element_id), item)
+        self.client.send({"op": "text", "page": page, "id": element_id, "x": element["x"], "y": element["y"],
+                          "text": element["text"], "color": element["color"],
+                          "font_family": element["font_family"], "font_size": element["font_size"]})
+
+    def _send_pasted(self, items, page):
+        """Share pasted items as whole strokes, shapes and labels"""
+        canvas = self.app.canvas_manager.canvas
+        for item in items:
+            element = self.app.file_manager.canvas_element(canvas, item)
+            if element is None:
+                continue
+            if element["type"] == "text":
+                self._send_text(item, page)
+                continue
+            element_id = self.client.new_element_id()
+            if element["type"] == "line":
+                self.client.send({"op": "begin", "page": page, "id": element_id,
+                                  "color": element["color"], "width": element["width"],
+                                  "pts": element["points"]})
+                self.client.send({"op": "end", "page": page, "id": element_id})
+            elif element["type"] in ("rectangle", "oval"):
+                self.client.send({"op": "shape", "page": page, "id": element_id,
+                                  "kind": "circle" if element["type"] == "oval" else "rectangle",
+                                  "coords": [element["x1"], element["y1"], element["x2"], element["y2"]],
+                                  "color": element["outline"], "width": element["width"]})
+            else:
+                continue
+            self._pending_local[element_id] = True
+            canvas.addtag_withtag(self._tag(element_id), item)
+
+    # Server -> local
+
+    def _schedule_poll(self):
+        self._poll_job = self.app.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def _poll(self):
+        self._poll_job = None
+        if self.client is None:
+            return
+        for message in self.client.poll():
+            kind = message.get("type")
+            if kind in ("welcome", "snapshot"):
+                # A large snapshot goes on in "snapshot" frames after the welcome
+                for op in message.get("snapshot", []):
+                    self.apply_remote_op(op)
+            elif kind == "ops":
+                for op in message.get("ops", []):
+                    self.apply_remote_op(op)
+            elif kind == "disconnected":
+                print("Sync server closed the connection")
+                self.disconnect()
+                return
+        self._after_poll()
+        self._schedule_poll()
+
+    def _after_poll(self):
+        """Hook run after each batch of incoming messages"""
+        pass
+
+    def apply_remote_op(self, op):
+        """Apply one sequenced op from the server"""
+        if self.client is not None and op.get("client") == self.client.client_id:
+            # Our own op coming back: it is now sequenced, nothing to draw
+            self._pending_local.pop(op.get("id"), None)
+            if op.get("op") == "add_page":
+                self._pending_pages.discard(op.get("page"))
+            return
+
+        if op.get("op") == "add_page":
+            self._insert_page(op.get("page"), op.get("after"))
+            return
+        index = self._page_index(op.get("page", 0))
+        if index is None:
+            # A page we have not heard of (e.g. added before we joined) goes at the end
+            index = self._insert_page(op.get("page", 0), None)
+        if index != self.app.page_manager.current_page_index:
+            self._apply_to_stored_page(index, op)
+            return
+        self.apply_to_canvas(op)
+
+    def _insert_page(self, page_id, after):
+        """Insert a remote page after page "after" and return its index"""
+        page_manager = self.app.page_manager
+        index = self._page_index(page_id)
+        if index is not None:
+            return index
+        after_index = self._page_index(after) if after is not None else None
+        index = len(page_manager.pages) if after_index is None else after_index + 1
+        # Our own pages inserted there but not yet sequenced will come after it
+        while index < len(page_manager.pages) and self._page_id(index) in self._pending_pages:
+            index += 1
+        page_manager.pages.insert(index, {"objects": [], "undo_stack": [], "redo_stack": [], "id": page_id})
+        if index <= page_manager.current_page_index:
+            page_manager.current_page_index += 1
+        page_manager.update_page_info()
+        return index
+
+    def apply_to_canvas(self, op):
+        """Draw the effect of one remote op on the canvas"""
+        canvas_manager = self.app.canvas_manager
+        canvas = canvas_manager.canvas
+        kind = op.get("op")
+        element_id = op.get("id")
+
+        if kind == "begin":
+            points = list(op.get("pts", []))
+            self._remote_points[element_id] = points
+            fill, style_tags = canvas_manager.resolve_style(op.get("color", "black"), "fill")
+            item = canvas.create_line(
+                *self._drawable(points), fill=fill, width=op.get("width", 2),
+                capstyle=tk.ROUND, smooth=True,
+                tags=(self._tag(element_id), time_tag(canvas_manager.timeline.now()),
+                      layer_tag("ink")) + tuple(style_tags)
+            )
+            self._place_below_pending(item)
+
+        elif kind == "pts":
+            points = self._remote_points.get(element_id)
+            if points is not None:
+                points.extend(op.get("pts", []))
+                canvas.coords(self._tag(element_id), *self._drawable(points))
+
+        elif kind == "end":
+            self._remote_points.pop(element_id, None)
+
+        elif kind == "shape":
+            item = canvas_manager._create_shape(op.get("kind"), op.get("coords", []),
+                                                op.get("color", "black"), op.get("width", 2),
+                                                layer="ink", arrow=op.get("arrow", False))
+            if item:
+                canvas.addtag_withtag(self._tag(element_id), item)
+                canvas.addtag_withtag(time_tag(canvas_manager.timeline.now()), item)
+                self._place_below_pending(item)
+
+        elif kind == "text":
+            if canvas.find_withtag(self._tag(element_id)):
+                canvas.itemconfigure(self._tag(element_id), text=op.get("text", ""))
+            else:
+                element = {"type": "text", "x": op.get("x", 0), "y": op.get("y", 0), "text": op.get("text", ""),
+                           "color": op.get("color", "black"), "font_family": op.get("font_family", "Arial"),
+                           "font_size": op.get("font_size", 12)}
+                item = self.app.text_manager.create(element, layer="ink")
+                canvas.addtag_withtag(self._tag(element_id), item)
+                self._place_below_pending(item)
+
+        elif kind == "transform" and op.get("transform"):
+            self._applying_remote = True
+            try:
+                self.app.selection_manager.apply_transform(self._tag(element_id), tuple(op["transform"]))
+            finally:
+                self._applying_remote = False
+
+        elif kind == "erase":
+            self._remote_points.pop(element_id, None)
+            self._pending_local.pop(element_id, None)
+            canvas.delete(self._tag(element_id))
+
+        elif kind == "clear":
+            canvas_manager.clear_canvas(maintain_history=False)
+
+        canvas_manager.content_version += 1
+
+    def _drawable(self, points):
+        # A line item needs two points; repeat a lone starting point
+        return points if len(points) >= 4 else list(points[:2]) * 2
+
+    def _place_below_pending(self, item):
+        """
+        Remote ops arrive in sequence order, and our unacknowledged elements
+        will be sequenced after them, so remote items go below those.
+        """
+        for element_id in self._pending_local:
+            try:
+                self.app.canvas_manager.canvas.tag_lower(item, self._tag(element_id))
+                return
+            except tk.TclError:
+                continue
+
+    def _apply_to_stored_page(self, page, op):
+        """Apply an op to the page at index page, which is not on screen, by editing its stored objects"""
+        page_manager = self.app.page_manager
+        was_packed = not isinstance(page_manager.pages[page], dict)
+        page_data = page_manager.hydrate_page(page)
+        if "objects" not in page_data:
+            # Pages loaded from a file only have "elements"; both formats can be mixed
+            page_data["objects"] = list(page_data.get("elements", []))
+        objects = page_data["objects"]
+        tag = self._tag(op.get("id", ""))
+        kind = op.get("op")
+
+        if kind == "begin":
+            objects.append({
+                "type": "line",
+                "coords": self._drawable(list(op.get("pts", []))),
+                "options": {"fill": op.get("color", "black"), "width": op.get("width", 2),
+                            "capstyle": "round", "smooth": 1, "tags": tag}
+            })
+        elif kind == "pts":
+            for obj in reversed(objects):
+                if tag in str(obj.get("options", {}).get("tags", "")).split():
+                    coords = obj["coords"]
+                    if len(coords) == 4 and coords[:2] == coords[2:]:
+                        del coords[2:]
+                    coords.extend(op.get("pts", []))
+                    break
+        elif kind == "shape":
+            shape_kind = op.get("kind")
+            color_option = "fill" if shape_kind in ("line", "polygon") else "outline"
+            options = {color_option: op.get("color", "black"), "width": op.get("width", 2), "tags": tag}
+            if op.get("arrow"):
+                options["arrow"] = "last"
+            objects.append({
+                "type": "oval" if shape_kind == "circle" else shape_kind,
+                "coords": list(op.get("coords", [])),
+                "options": options
+            })
+        elif kind == "text":
+            for obj in objects:
+                if tag in str(obj.get("options", {}).get("tags", "")).split():
+                    obj["options"]["text"] = op.get("text", "")
+                    break
+            else:
+                objects.append({
+                    "type": "text",
+                    "coords": [op.get("x", 0), op.get("y", 0)],
+                    "options": {"text": op.get("text", ""), "fill": op.get("color", "black"),
+                                "font": f"{{{op.get('font_family', 'Arial')}}} {op.get('font_size', 12)}",
+                                "anchor": "nw", "tags": tag}
+                })
+        elif kind == "transform":
+            for obj in objects:
+                if tag in str(obj.get("options", {}).get("tags", "")).split():
+                    coords = transform_coords(obj["coords"], op.get("transform"),
+                                              box=obj.get("type") in ("rectangle", "oval"))
+                    if coords is not None:
+                        obj["coords"] = coords
+        elif kind == "erase":
+            page_data["objects"] = [obj for obj in objects
+                                    if tag not in str(obj.get("options", {}).get("tags", "")).split()]
+        elif kind == "clear":
+            page_data["objects"] = []
+
+        if was_packed:
+            page_manager.pack_page(page)
@@ -0,0 +1,138 @@
+import os
+
+from modules.batch_renderer import BatchRenderer
+from modules.board_diff import diff_boards, diff_items, page_items
+from modules.board_reader import BoardError, load_board, validate_page
+from modules.layer_manager import LAYERS, layer_tag
+
+
+class DiffManager:
+    """
+    Compares the open board with a saved .wb file (see modules.board_diff).
+
+    A summary lists the pages that differ. While comparing, the page on
+    screen is marked up with overlay items that are not part of the page:
+    strokes only the file has are drawn as green ghosts and strokes only
+    the board has are boxed in red. The marks follow page changes.
+    """
+
+    TAG = "diff_overlay"
+    ADDED_TAG = "diff_added"
+    ADDED_COLOR = "#2e9e44"     # In the file, not on the board
+    REMOVED_COLOR = "#d0342c"   # On the board, not in the file
+    RETRY_MS = 50
+
+    def __init__(self, app):
+        self.app = app
+        self.other_pages = None
+        self.other_name = None
+        self._renderer = None
+        self._job = None
+
+    @property
+    def canvas(self):
+        return self.app.canvas_manager.canvas
+
+    def compare_with_file(self):
+        from tkinter import filedialog, messagebox
+        path = filedialog.askopenfilename(filetypes=[("Whiteboard files", "*.wb *.wbz"), ("All files", "*.*")])
+        if not path:
+            return
+        try:
+            data, _ = load_board(path)
+            pages = [validate_page(page)[0] for page in data.get("pages", [])]
+        except (OSError, ValueError, AttributeError, BoardError) as e:
+            print(f"Error reading {path} for comparison: {e}")
+            messagebox.showerror("Compare", f"Could not read {os.path.basename(path)}: {e}")
+            return
+
+        self.other_pages = pages
+        self.other_name = os.path.basename(path)
+        report = diff_boards(self._board_pages(), pages)
+        if report:
+            lines = [f"Page {page['page'] + 1}: {len(page['added'])} only in the file, "
+                     f"{len(page['removed'])} only on the board" for page in report[:20]]
+            if len(report) > 20:
+                lines.append(f"... and {len(report) - 20} more pages")
+            message = f"Differences with {self.other_name}:\n\n" + "\n".join(lines)
+        else:
+            message = f"The board and {self.other_name} have the same content"
+        print(message)
+        messagebox.showinfo("Compare", message)
+        self.show_page()
+
+    def stop(self):
+        """Stop comparing and remove the marks"""
+        self.other_pages = self.other_name = None
+        self._clear_marks()
+
+    def show_page(self):
+        """Mark up the page on screen (called after every page change)"""
+        if self._job is not None:
+            self.app.root.after_cancel(self._job)
+            self._job = None
+        self._clear_marks()
+        if self.other_pages is None:
+            return
+        canvas_manager = self.app.canvas_manager
+        if canvas_manager.is_rendering():
+            # Compare against the whole page, not the part drawn so far
+            self._job = self.app.root.after(self.RETRY_MS, self.show_page)
+            return
+
+        index = self.app.page_manager.current_page_index
+        items, elements = self._canvas_elements()
+        theirs = page_items(self.other_pages[index]) if index < len(self.other_pages) else []
+        removed, added = diff_items(elements, theirs)
+
+        canvas = self.canvas
+        for position in removed:
+            box = canvas.bbox(items[position])
+            if box:
+                canvas_manager.overlay_ids.add(canvas.create_rectangle(
+                    box[0] - 3, box[1] - 3, box[2] + 3, box[3] + 3,
+                    outline=self.REMOVED_COLOR, dash=(4, 2), tags=(self.TAG,)))
+        if added:
+            if self._renderer is None:
+                self._renderer = BatchRenderer(canvas)
+            script, _ = self._renderer.build_script([theirs[i] for i in added], tags=(self.TAG, self.ADDED_TAG))
+            canvas.tk.eval(script)
+            # Ghosts are not on any layer, so layer switches and caches leave them alone
+            for name in LAYERS:
+                canvas.dtag(self.ADDED_TAG, layer_tag(name))
+            canvas.tk.eval(
+                f"foreach id [{canvas._w} find withtag {self.ADDED_TAG}] {{"
+                f"if {{[{canvas._w} type $id] in {{rectangle oval}}}} "
+                f"{{{canvas._w} itemconfigure $id -outline {self.ADDED_COLOR}}} "
+                f"else {{{canvas._w} itemconfigure $id -fill {self.ADDED_COLOR}}}}}"
+            )
+            canvas_manager.overlay_ids.update(canvas.find_withtag(self.ADDED_TAG))
+        print(f"Page {index + 1}: {len(added)} only in {self.other_name}, {len(removed)} only on the board")
+
+    def _board_pages(self):
+        """The board's pages as page dicts, the page on screen read from the canvas"""
+        page_manager = self.app.page_manager
+        pages = []
+        for index, page in enumerate(page_manager.pages):
+            if index == page_manager.current_page_index:
+                pages.append({"elements": self._canvas_elements()[1]})
+            else:
+                pages.append({"elements": page_items(page)})
+        return pages
+
+    def _canvas_elements(self):
+        """Document items on the canvas and their saved elements, in the same order"""
+        file_manager = self.app.file_manager
+        items, elements = [], []
+        for item in self.app.canvas_manager.document_items():
+            element = file_manager.canvas_element(self.canvas, item)
+            if element is not None:
+                items.append(item)
+                elements.append(element)
+        return items, elements
+
+    def _clear_marks(self):
+        canvas_manager = self.app.canvas_manager
+        for item in self.canvas.find_withtag(self.TAG):
+            canvas_manager.overlay_ids.discard(item)
+        self.canvas.delete(self.TAG)
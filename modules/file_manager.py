@@ -1,12 +1,34 @@
-import json
+import multiprocessing
 import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
 from tkinter import filedialog
 import tkinter as tk
 from PIL import Image
+from modules.batch_renderer import BatchRenderer
+from modules.board_reader import BOARD_VERSION, kept_index, read_board, stream_board
+from modules.board_container import BoardContainer, MappedPages, default_codec, sniff, write_container
+from modules.board_stream import write_board
+from modules.page_store import content_digest
+from modules.timeline import time_from_tags
+from modules.layer_manager import DEFAULT_LAYER, layer_from_tags
 
 class FileManager:
+    MERGE_POLL_MS = 50
+    LOAD_POLL_MS = 10
+    LOAD_SLICE_MS = 15      # Time spent adding loaded pages per poll before yielding to the UI
+    LOAD_QUEUE_SIZE = 64    # Pages read ahead by the loading thread
+    COMPRESSED_EXTENSION = ".wbz"
+    
     def __init__(self, app):
         self.app = app
+        # Codec for boards saved as .wbz: zstd when the zstandard package is installed, else zlib
+        self.compression_codec = default_codec()
+        self._merge = None  # (futures, executor) while boards are being merged
+        self._load = None   # State of a board being loaded
+        self._mapped = None # BoardContainer whose pages are read from the mapped file
         self._setup_page_auto_save()
     
     def _setup_page_auto_save(self):
@@ -48,9 +70,15 @@ class FileManager:
             
             # Capture canvas content
             if hasattr(self.app.canvas_manager, 'canvas'):
+                # Finish drawing a page that is still rendering so nothing is lost
+                if getattr(self.app.canvas_manager, 'renderer', None):
+                    self.app.canvas_manager.renderer.finish()
                 canvas = self.app.canvas_manager.canvas
                 elements = self._extract_canvas_elements(canvas)
-                self.app.page_manager.pages[current_page]["elements"] = elements
+                page = self._writable_page(current_page)
+                page["elements"] = elements
+                # Saved "objects" from an earlier visit are older than what was just captured
+                page.pop("objects", None)
                 print(f"Auto-saved {len(elements)} elements for page {current_page}")
                 
         except Exception as e:
@@ -60,66 +88,12 @@ class FileManager:
         """Extract all elements from canvas"""
         elements = []
         try:
-            canvas_items = canvas.find_all()
+            canvas_items = self._document_items(canvas)
             for item_id in canvas_items:
                 try:
-                    item_type = canvas.type(item_id)
-                    coords = canvas.coords(item_id)
-                    
-                    if item_type == "line":
-                        element = {
-                            "type": "line",
-                            "points": list(coords),  # Ensure it's a list, not deque
-                            "color": canvas.itemcget(item_id, "fill") or "black",
-                            "width": int(float(canvas.itemcget(item_id, "width") or "2")),
-                            "smooth": canvas.itemcget(item_id, "smooth") == "1"
-                        }
+                    element = self.canvas_element(canvas, item_id)
+                    if element is not None:
                         elements.append(element)
-                        
-                    elif item_type == "rectangle":
-                        if len(coords) >= 4:
-                            element = {
-                                "type": "rectangle",
-                                "x1": float(coords[0]), "y1": float(coords[1]),
-                                "x2": float(coords[2]), "y2": float(coords[3]),
-                                "outline": canvas.itemcget(item_id, "outline") or "black",
-                                "fill": canvas.itemcget(item_id, "fill") or "",
-                                "width": int(float(canvas.itemcget(item_id, "width") or "2"))
-                            }
-                            elements.append(element)
-                        
-                    elif item_type == "oval":
-                        if len(coords) >= 4:
-                            element = {
-                                "type": "oval",
-                                "x1": float(coords[0]), "y1": float(coords[1]),
-                                "x2": float(coords[2]), "y2": float(coords[3]),
-                                "outline": canvas.itemcget(item_id, "outline") or "black",
-                                "fill": canvas.itemcget(item_id, "fill") or "",
-                                "width": int(float(canvas.itemcget(item_id, "width") or "2"))
-                            }
-                            elements.append(element)
-                        
-                    elif item_type == "text":
-                        if len(coords) >= 2:
-                            font_info = canvas.itemcget(item_id, "font")
-                            try:
-                                font_parts = str(font_info).split()
-                                font_family = font_parts[0] if font_parts else "Arial"
-                                font_size = int(font_parts[1]) if len(font_parts) > 1 else 12
-                            except (ValueError, IndexError):
-                                font_family = "Arial"
-                                font_size = 12
-                                
-                            element = {
-                                "type": "text",
-                                "x": float(coords[0]), "y": float(coords[1]),
-                                "text": canvas.itemcget(item_id, "text") or "",
-                                "color": canvas.itemcget(item_id, "fill") or "black",
-                                "font_family": font_family,
-                                "font_size": font_size
-                            }
-                            elements.append(element)
                             
                 except Exception as e:
                     print(f"Error extracting element {item_id}: {e}")
@@ -130,68 +104,169 @@ class FileManager:
             
         return elements
 
+    def canvas_element(self, canvas, item_id):
+        """Convert one canvas item to a saved element, or None for unsupported items"""
+        item_type = canvas.type(item_id)
+        coords = canvas.coords(item_id)
+        tags = canvas.gettags(item_id)
+        stamp = time_from_tags(tags)
+        layer = layer_from_tags(tags)
+        element = None
+        
+        if item_type == "line":
+            element = {
+                "type": "line",
+                "points": list(coords),  # Ensure it's a list, not deque
+                "color": self._item_color(canvas, item_id, "fill") or "black",
+                "width": int(float(canvas.itemcget(item_id, "width") or "2")),
+                "smooth": canvas.itemcget(item_id, "smooth") == "1"
+            }
+            if canvas.itemcget(item_id, "arrow") not in ("", "none"):
+                element["arrow"] = True
+            
+        elif item_type == "polygon":
+            element = {
+                "type": "polygon",
+                "points": list(coords),
+                "color": self._item_color(canvas, item_id, "fill") or "black"
+            }
+            
+        elif item_type in ("rectangle", "oval"):
+            if len(coords) >= 4:
+                element = {
+                    "type": item_type,
+                    "x1": float(coords[0]), "y1": float(coords[1]),
+                    "x2": float(coords[2]), "y2": float(coords[3]),
+                    "outline": self._item_color(canvas, item_id, "outline") or "black",
+                    "fill": self._item_color(canvas, item_id, "fill") or "",
+                    "width": int(float(canvas.itemcget(item_id, "width") or "2"))
+                }
+            
+        elif item_type == "text":
+            text = canvas.itemcget(item_id, "text") or ""
+            # Labels emptied in the text tool are left out
+            if len(coords) >= 2 and text:
+                font_info = canvas.itemcget(item_id, "font")
+                try:
+                    # Tk quotes multi-word families, e.g. "{Comic Sans MS} 14"
+                    font_parts = canvas.tk.splitlist(font_info)
+                    font_family = font_parts[0] if font_parts else "Arial"
+                    font_size = int(font_parts[1]) if len(font_parts) > 1 else 12
+                except (ValueError, IndexError, tk.TclError):
+                    font_family = "Arial"
+                    font_size = 12
+                    
+                element = {
+                    "type": "text",
+                    "x": float(coords[0]), "y": float(coords[1]),
+                    "text": text,
+                    "color": self._item_color(canvas, item_id, "fill") or "black",
+                    "font_family": font_family,
+                    "font_size": font_size
+                }
+        
+        # Relative time the item was drawn (used by replay) and its layer
+        if element is not None:
+            if stamp is not None:
+                element["t"] = stamp
+            if layer != DEFAULT_LAYER:
+                element["layer"] = layer
+        return element
+
+    def _writable_page(self, index):
+        """Return the page dict at index, unpacking it first if it is stored compactly"""
+        if hasattr(self.app.page_manager, 'hydrate_page'):
+            return self.app.page_manager.hydrate_page(index)
+        return self.app.page_manager.pages[index]
+
+    def _document_items(self, canvas):
+        """Canvas items that belong to the page, leaving out grid lines"""
+        canvas_manager = getattr(self.app, 'canvas_manager', None)
+        if canvas_manager is not None and canvas is getattr(canvas_manager, 'canvas', None):
+            return canvas_manager.document_items()
+        return canvas.find_all()
+
+    def _item_color(self, canvas, item_id, attribute):
+        """Read an item's color, saving themed colors by their logical value"""
+        canvas_manager = getattr(self.app, 'canvas_manager', None)
+        if canvas_manager is not None and canvas is getattr(canvas_manager, 'canvas', None):
+            return canvas_manager.logical_color(item_id, attribute)
+        return canvas.itemcget(item_id, attribute)
+
     def save_whiteboard(self):
         """Save the whiteboard to a file with .wb extension (custom JSON format)"""
+        if self._load is not None:
+            print("Not saving: a board is still being loaded")
+            try:
+                from tkinter import messagebox
+                messagebox.showwarning("Save", "The board is still being loaded. Save again once it has opened.")
+            except Exception:
+                pass
+            return
         file_path = filedialog.asksaveasfilename(
             defaultextension=".wb",
-            filetypes=[("Whiteboard files", "*.wb"), ("All files", "*.*")]
+            filetypes=[("Whiteboard files", "*.wb"), ("Compressed whiteboard files", "*" + self.COMPRESSED_EXTENSION),
+                       ("All files", "*.*")]
         )
         if file_path:
             try:
                 # Force save current page one last time
                 self._auto_save_current_page()
+                page_manager = self.app.page_manager
                 
-                # Convert pages to JSON-serializable format
-                serializable_pages = []
-                for page in self.app.page_manager.pages:
-                    serializable_page = {
-                        "elements": [],
-                        "background_color": page.get("background_color", "#FFFFFF")
-                    }
-                    
-                    # Convert elements to serializable format
-                    elements = page.get("elements", [])
-                    for element in elements:
-                        if isinstance(element, dict):
-                            serializable_element = {}
-                            for key, value in element.items():
-                                # Convert deques and other non-serializable types
-                                if hasattr(value, '__iter__') and not isinstance(value, (str, dict)):
-                                    # Convert deques, lists, tuples to plain lists
-                                    try:
-                                        serializable_element[key] = list(value)
-                                    except (TypeError, ValueError):
-                                        # If conversion fails, convert to string
-                                        serializable_element[key] = str(value)
-                                else:
-                                    serializable_element[key] = value
-                            
-                            # Remove any tkinter-specific properties
-                            serializable_element.pop("tkinter_id", None)
-                            serializable_page["elements"].append(serializable_element)
-                    
-                    serializable_pages.append(serializable_page)
+                # Each image or PDF used by a background is embedded once. Packed
+                # pages keep their background reference unpacked, so this reads no pages.
+                asset_store = page_manager.asset_store
+                used_assets = []
+                for page in page_manager.pages:
+                    background = page.background if hasattr(page, 'unpack') else page.get("background")
+                    if not background:
+                        continue
+                    # Backgrounds that still point at their original file get it embedded
+                    path = background.get("path")
+                    if path and background["hash"] not in asset_store and os.path.exists(path):
+                        if asset_store.add_file(path) != background["hash"]:
+                            print(f"Not embedding {path}: it has changed since it was imported")
+                    used_assets.append(background["hash"])
                 
-                # Create data structure
-                data = {
-                    "pages": serializable_pages,
-                    "current_page_index": self.app.page_manager.current_page_index,
+                settings = {
+                    "version": BOARD_VERSION,
+                    "current_page_index": page_manager.current_page_index,
                     "is_dark_mode": getattr(self.app, 'is_dark_mode', False),
                     "grid_visible": getattr(self.app, 'grid_visible', False),
-                    "version": "1.0"
+                    "timeline_ms": self.app.canvas_manager.timeline.now(),
+                    "layers": self.app.layer_manager.get_state(),
+                    "assets": asset_store.to_json(used_assets),
                 }
                 
-                # Debug output
-                total_elements = sum(len(page["elements"]) for page in serializable_pages)
-                print(f"Saving {len(serializable_pages)} pages with {total_elements} total elements")
-                for i, page in enumerate(serializable_pages):
-                    print(f"  Page {i}: {len(page['elements'])} elements")
+                # Text search index, keyed by the digests the pages will have when loaded
+                page_digests = []
+                def trailer():
+                    if not hasattr(self.app, 'search_manager'):
+                        return {}
+                    return {"text_index": self.app.search_manager.index.to_json(page_digests)}
                 
-                # Save to file
-                with open(file_path, "w") as f:
-                    json.dump(data, f, indent=2)
+                # Pages are written one at a time, next to the file until it is complete,
+                # so a crash while saving leaves the previous save in place
+                temp_path = file_path + ".saving"
+                try:
+                    if file_path.lower().endswith(self.COMPRESSED_EXTENSION):
+                        # Compressed page by page on worker threads
+                        with open(temp_path, "wb") as f:
+                            page_count = write_container(f, settings, self._saved_pages(page_digests), trailer,
+                                                         codec=self.compression_codec, digests=page_digests)
+                    else:
+                        with open(temp_path, "w", encoding="utf-8") as f:
+                            page_count = write_board(f, settings, self._saved_pages(page_digests), trailer)
+                    if self._mapped is not None and os.path.abspath(self._mapped.path) == os.path.abspath(file_path):
+                        # The file is about to be replaced, so its pages can no longer be read from it
+                        self._detach_mapped_board()
+                    os.replace(temp_path, file_path)
+                finally:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
                     
-                print(f"Whiteboard saved successfully to {file_path}")
+                print(f"Whiteboard saved successfully to {file_path} ({page_count} pages)")
                 
                 try:
                     from tkinter import messagebox
@@ -209,12 +284,56 @@ class FileManager:
                 except Exception:
                     pass
 
+    def _saved_pages(self, page_digests):
+        """Yield the pages in their saved form, unpacking one at a time, and record their digests"""
+        for i, page in enumerate(self.app.page_manager.pages):
+            if hasattr(page, 'unpack'):
+                page = page.unpack()
+            # Pages shown since they were loaded hold their current content as "objects"
+            key = "objects" if "objects" in page else "elements"
+            serializable_page = {
+                key: [],
+                "background_color": page.get("background_color", "#FFFFFF")
+            }
+            if page.get("background"):
+                background = dict(page["background"])
+                background.pop("path", None)
+                serializable_page["background"] = background
+            
+            # Convert elements to serializable format
+            elements = page.get(key, [])
+            for element in elements:
+                if isinstance(element, dict):
+                    serializable_element = {}
+                    for name, value in element.items():
+                        # Convert deques and other non-serializable types
+                        if hasattr(value, '__iter__') and not isinstance(value, (str, dict)):
+                            # Convert deques, lists, tuples to plain lists
+                            try:
+                                serializable_element[name] = list(value)
+                            except (TypeError, ValueError):
+                                # If conversion fails, convert to string
+                                serializable_element[name] = str(value)
+                        else:
+                            serializable_element[name] = value
+                    
+                    # Remove any tkinter-specific properties
+                    serializable_element.pop("tkinter_id", None)
+                    serializable_page[key].append(serializable_element)
+            
+            digest = content_digest(serializable_page[key])
+            page_digests.append(digest)
+            if hasattr(self.app, 'search_manager'):
+                self.app.search_manager.index_page(serializable_page, digest)
+            print(f"  Page {i}: {len(serializable_page[key])} elements")
+            yield serializable_page
+
     def load_whiteboard(self):
         """Load a previously saved whiteboard file"""
         from tkinter import filedialog
         filename = filedialog.askopenfilename(
             defaultextension=".wb",
-            filetypes=[("Whiteboard files", "*.wb"), ("All files", "*.*")]
+            filetypes=[("Whiteboard files", "*.wb *.wbz"), ("All files", "*.*")]
         )
         
         if filename:
@@ -222,94 +341,330 @@ class FileManager:
             self.load_file(filename)
 
     def load_file(self, filename):
-        """Load a whiteboard file and restore the state"""
+        """
+        Load a whiteboard file and restore the state.
+
+        The file is read on a worker thread (see board_reader.stream_board),
+        a page at a time. The page to show is drawn as soon as it has been
+        read and the others are added, already packed, while the rest of the
+        file is still being read. An uncompressed .wbz archive is mapped
+        instead (see _load_mapped).
+        """
+        if self._load is not None:
+            # Abandon a load still in progress
+            self._load["stop"].set()
+            self._load = None
         try:
-            with open(filename, "r") as f:
-                data = json.load(f)
-            
-            # Debug: Print what we're loading
-            print(f"Loading whiteboard with {len(data['pages'])} pages")
-            for i, page in enumerate(data['pages']):
-                elements = page.get('elements', [])
-                print(f"  Page {i}: {len(elements)} elements")
-                
-            # Restore the whiteboard state
-            self.app.page_manager.pages = data["pages"]
-            self.app.page_manager.current_page_index = data["current_page_index"]
-            
-            # Restore settings if they exist in the file
-            if "is_dark_mode" in data:
-                self.app.is_dark_mode = data["is_dark_mode"]
-                # Call toggle_dark_mode only if needed
-                if hasattr(self.app, 'toggle_dark_mode'):
-                    if data["is_dark_mode"] != self.app.is_dark_mode:
-                        self.app.toggle_dark_mode()
-                    
-            if "grid_visible" in data:
-                self.app.grid_visible = data["grid_visible"]
-                # Call toggle_grid only if needed
-                if hasattr(self.app, 'toggle_grid'):
-                    if data["grid_visible"] != self.app.grid_visible:
-                        self.app.toggle_grid()
-            
-            # First, ensure we have a canvas and canvas_manager
-            if not hasattr(self.app, 'canvas_manager'):
-                print("Error: No canvas_manager found in the app")
-                return
-                
-            # Clear the canvas completely
-            if hasattr(self.app.canvas_manager, 'canvas'):
-                canvas = self.app.canvas_manager.canvas
-                canvas.delete("all")  # Clear everything from canvas
-                
-            # Get the current page data
-            current_page_index = self.app.page_manager.current_page_index
-            if 0 <= current_page_index < len(self.app.page_manager.pages):
-                current_page = self.app.page_manager.pages[current_page_index]
-                
-                # Apply background color if it exists
-                if hasattr(self.app.canvas_manager, 'canvas'):
-                    canvas = self.app.canvas_manager.canvas
-                    if "background_color" in current_page:
-                        canvas.config(bg=current_page.get("background_color", "#FFFFFF"))
-                
-                # Force immediate redraw of the current page
-                if hasattr(self.app.page_manager, 'load_page'):
-                    print("Using page_manager.load_page method")
-                    self.app.page_manager.load_page(current_page_index)
-                else:
-                    # Fallback: manually redraw elements
-                    print("Manually rendering elements")
-                    if hasattr(self.app.canvas_manager, 'canvas'):
-                        self._redraw_elements_on_canvas(self.app.canvas_manager.canvas, current_page)
-            
-            # Force canvas update and refresh
-            if hasattr(self.app.canvas_manager, 'canvas'):
-                self.app.canvas_manager.canvas.update_idletasks()
-                self.app.canvas_manager.canvas.update()
-            
-            # Update page manager UI if it exists
-            if hasattr(self.app.page_manager, 'update_page_display'):
-                self.app.page_manager.update_page_display()
-            
-            # Show success message
-            print(f"Whiteboard loaded successfully from {filename}")
+            if sniff(filename) == "container":
+                board = BoardContainer(filename)
+                if board.codec == "none":
+                    self._load_mapped(board)
+                    return
+                board.close()
+        except (OSError, ValueError) as e:
+            # stream_board() reports it, or recovers what it can
+            print(f"Could not map {filename}: {e}")
+        state = {
+            "filename": filename,
+            "messages": queue.Queue(maxsize=self.LOAD_QUEUE_SIZE),
+            "stop": threading.Event(),
+            "shown": None,          # Index of the page drawn while loading
+            "saved_index": None,    # current_page_index from the file
+            "skipped": [],          # File indexes of the pages left out
+        }
+        self._load = state
+        try:
+            self._begin_load()
+        except Exception as e:
+            print(f"Error preparing to load whiteboard: {e}")
+        print(f"Loading whiteboard from {filename}")
+        threading.Thread(target=self._read_board, args=(filename, state["messages"], state["stop"]),
+                         daemon=True).start()
+        self.app.root.after(self.LOAD_POLL_MS, self._check_load, state)
+
+    @staticmethod
+    def _read_board(filename, messages, stop):
+        """Worker thread: pass stream_board() messages on to the UI (never touches Tk)"""
+        def send(message):
+            while not stop.is_set():
+                try:
+                    messages.put(message, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        
+        try:
+            for message in stream_board(filename):
+                if not send(message):
+                    return
+        except (OSError, ValueError) as e:
+            send(("failed", str(e)))
+
+    def _check_load(self, state):
+        """Apply what the worker has read so far, for a slice of time at a time"""
+        if state is not self._load:
+            return
+        deadline = time.perf_counter() + self.LOAD_SLICE_MS / 1000.0
+        try:
+            while time.perf_counter() < deadline:
+                try:
+                    message = state["messages"].get_nowait()
+                except queue.Empty:
+                    break
+                kind = message[0]
+                if kind == "setting":
+                    self._apply_setting(state, message[1], message[2])
+                elif kind == "page":
+                    self._add_loaded_page(state, message[1], message[2])
+                elif kind == "skipped":
+                    state["skipped"].append(message[1])
+                elif kind == "restart":
+                    # The file is damaged; what can be recovered is sent again from the start
+                    state["shown"] = state["saved_index"] = None
+                    state["skipped"] = []
+                    self._begin_load()
+                elif kind == "end":
+                    self._finish_load(state, message[1])
+                    return
+                elif kind == "failed":
+                    self._load = None
+                    raise ValueError(message[1])
+        except Exception as e:
+            import traceback
+            traceback.print_exc()
+            print(f"Error loading whiteboard: {e}")
+            self._load = None
+            state["stop"].set()
+            # Show error message in a messagebox
             try:
                 from tkinter import messagebox
-                messagebox.showinfo("Load Successful", f"Whiteboard loaded from {filename}")
+                messagebox.showerror("Load Error", f"Could not load whiteboard: {str(e)}")
             except Exception:
                 pass
-                
+            return
+        self.app.root.after(self.LOAD_POLL_MS, self._check_load, state)
+
+    def _load_mapped(self, board):
+        """
+        Show an uncompressed archive (codec "none") without reading its
+        pages: they stay in the mapped file, and the OS reads in a page
+        only when it is shown or unpacked.
+        """
+        state = {"filename": board.path, "shown": None, "saved_index": None, "skipped": []}
+        print(f"Loading whiteboard from {board.path} (mapped)")
+        try:
+            self._begin_load()
+            self._mapped = board
+            for key, value in board.settings.items():
+                self._apply_setting(state, key, value)
+            self.app.page_manager.pages = MappedPages(board).pages()
+            for key, value in board.trailer.items():
+                self._apply_setting(state, key, value)
         except Exception as e:
             import traceback
             traceback.print_exc()
             print(f"Error loading whiteboard: {e}")
-            # Show error message in a messagebox
             try:
                 from tkinter import messagebox
                 messagebox.showerror("Load Error", f"Could not load whiteboard: {str(e)}")
             except Exception:
                 pass
+            return
+        problems = ["The file ends early; settings saved after the pages were lost"] if board.recovered else []
+        self._finish_load(state, problems)
+
+    def _detach_mapped_board(self):
+        """Move the pages still in the mapped file into the page store and unmap it"""
+        page_manager = self.app.page_manager
+        for index, page in enumerate(page_manager.pages):
+            if hasattr(page, 'unpack') and isinstance(page.store, MappedPages):
+                page_manager.pages[index] = page_manager.page_store.pack(page.unpack())
+        self._mapped.close()
+        self._mapped = None
+
+    def _begin_load(self):
+        """Empty the board before the loaded pages are added"""
+        page_manager = self.app.page_manager
+        # Drop the previous board's packed pages and assets
+        if hasattr(page_manager, 'page_store'):
+            page_manager.page_store.close()
+        page_manager.pages = []
+        if self._mapped is not None:
+            self._mapped.close()
+            self._mapped = None
+        page_manager.current_page_index = 0
+        if hasattr(page_manager, 'asset_store'):
+            page_manager.asset_store.clear()
+        if hasattr(self.app, 'search_manager'):
+            self.app.search_manager.index.clear()
+            self.app.search_manager.reset()
+        # Clear the page content (the pooled grid lines stay)
+        if hasattr(self.app.canvas_manager, 'canvas'):
+            self.app.canvas_manager.clear_canvas(maintain_history=False)
+            self.app.canvas_manager.reset_undo_redo_stacks()
+
+    def _apply_setting(self, state, key, value):
+        """Restore one top-level entry of a loaded board"""
+        if key == "current_page_index":
+            state["saved_index"] = value
+        elif key == "assets" and hasattr(self.app.page_manager, 'asset_store'):
+            self.app.page_manager.asset_store.load_json(value)
+        elif key == "text_index" and hasattr(self.app, 'search_manager'):
+            # Adds the pages not indexed yet as they arrived
+            self.app.search_manager.index.load_json(value)
+        elif key == "timeline_ms":
+            # New strokes are timed after the ones recorded in the file
+            self.app.canvas_manager.timeline.resume(value)
+        elif key == "layers" and hasattr(self.app, 'layer_manager'):
+            self.app.layer_manager.set_state(value)
+        elif key == "is_dark_mode":
+            if value != getattr(self.app, 'is_dark_mode', False) and hasattr(self.app, 'toggle_dark_mode'):
+                self.app.toggle_dark_mode()
+            self.app.is_dark_mode = value
+        elif key == "grid_visible":
+            self.app.grid_visible = value
+            grid = getattr(self.app.canvas_manager, 'grid', None)
+            if grid is not None:
+                if self.app.grid_visible:
+                    grid.show()
+                else:
+                    grid.hide()
+
+    def _add_loaded_page(self, state, page, packed):
+        """Append a page read by the worker: the page to show as a dict, the others packed"""
+        page_manager = self.app.page_manager
+        if page is None:
+            blob, object_count, digest, background, start, texts = packed
+            page_manager.pages.append(page_manager.page_store.add_blob(blob, object_count, digest, background, start))
+            # Pages read from a compressed board come without their text; search unpacks them if needed
+            if texts is not None and hasattr(self.app, 'search_manager'):
+                self.app.search_manager.index.add_page(digest, texts)
+            return
+        
+        # Draw it now, while the rest of the file is still being read
+        page_manager.pages.append(page)
+        page_manager.current_page_index = state["shown"] = len(page_manager.pages) - 1
+        if "background_color" in page and hasattr(self.app.canvas_manager, 'canvas'):
+            self.app.canvas_manager.canvas.config(bg=page["background_color"])
+        page_manager.load_current_page()
+        page_manager.update_page_info()
+
+    def _finish_load(self, state, problems):
+        self._load = None
+        page_manager = self.app.page_manager
+        if not page_manager.pages:
+            page_manager.initialize_page()
+        print(f"Loaded {len(page_manager.pages)} pages")
+        
+        # Older files store the current page after the pages, and skipped pages move it up
+        saved_index = state["saved_index"]
+        if isinstance(saved_index, int):
+            saved_index = kept_index(saved_index, state["skipped"])
+        if not isinstance(saved_index, int) or not 0 <= saved_index < len(page_manager.pages):
+            saved_index = state["shown"] if state["shown"] is not None else 0
+        if state["shown"] is None:
+            page_manager.current_page_index = saved_index
+            page_manager.load_current_page()
+        elif saved_index != state["shown"]:
+            page_manager.go_to_page(saved_index)
+        
+        # Update page manager UI if it exists
+        if hasattr(page_manager, 'update_page_display'):
+            page_manager.update_page_display()
+        
+        # Show success message
+        filename = state["filename"]
+        print(f"Whiteboard loaded successfully from {filename}")
+        try:
+            from tkinter import messagebox
+            if problems:
+                messagebox.showwarning("Load Recovered",
+                                       f"Whiteboard loaded from {filename}, but it was damaged:\n\n"
+                                       + "\n".join(problems))
+            else:
+                messagebox.showinfo("Load Successful", f"Whiteboard loaded from {filename}")
+        except Exception:
+            pass
+    
+    def merge_whiteboards(self):
+        """Append the pages of several saved boards to this one"""
+        filenames = filedialog.askopenfilenames(
+            filetypes=[("Whiteboard files", "*.wb *.wbz"), ("All files", "*.*")]
+        )
+        if filenames:
+            self.merge_files(sorted(filenames))
+    
+    def merge_files(self, filenames):
+        """
+        Parse and validate board files in parallel worker processes, then
+        append their pages after the last page. Pages arrive packed, so
+        nothing is rendered or even decompressed until a page is shown.
+        """
+        from tkinter import messagebox
+        if self._merge is not None:
+            messagebox.showinfo("Merge Boards", "Boards are already being merged")
+            return
+        workers = max(1, min(len(filenames), os.cpu_count() or 1))
+        # Forking would copy this process's Tk interpreter and threads into the workers
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        futures = [executor.submit(read_board, filename) for filename in filenames]
+        self._merge = (futures, executor)
+        print(f"Merging {len(filenames)} boards with {workers} worker processes")
+        self.app.root.after(self.MERGE_POLL_MS, self._check_merge)
+    
+    def _check_merge(self):
+        futures, executor = self._merge
+        if not all(future.done() for future in futures):
+            self.app.root.after(self.MERGE_POLL_MS, self._check_merge)
+            return
+        self._merge = None
+        executor.shutdown(wait=False)
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({"pages": [], "assets": {}, "dropped": 0, "problems": [], "error": str(e)})
+        self._append_boards(results)
+    
+    def _append_boards(self, results):
+        """Add read_board() results to the page list, in order"""
+        page_manager = self.app.page_manager
+        added, dropped, errors, problems = 0, 0, [], []
+        for result in results:
+            if result["error"]:
+                errors.append(result["error"])
+                continue
+            name = os.path.basename(result["path"])
+            problems.extend(f"{name}: {problem}" for problem in result["problems"])
+            page_manager.asset_store.load_json(result["assets"])
+            for blob, object_count, digest, background, start, texts in result["pages"]:
+                packed = page_manager.page_store.add_blob(blob, object_count, digest, background, start)
+                page_manager.pages.append(packed)
+                if hasattr(self.app, 'search_manager'):
+                    # Workers send each page's text elements along, so the index needs no unpacking
+                    self.app.search_manager.index.add_page(digest, texts)
+                added += 1
+            dropped += result["dropped"]
+        page_manager.update_page_info()
+        
+        message = f"Added {added} pages from {len(results) - len(errors)} boards"
+        if dropped:
+            message += f"\n{dropped} unreadable elements were skipped"
+        if problems:
+            message += "\n\nDamaged:\n" + "\n".join(problems)
+        if errors:
+            message += "\n\nCould not read:\n" + "\n".join(errors)
+        print(message)
+        try:
+            from tkinter import messagebox
+            if errors or problems:
+                messagebox.showwarning("Merge Boards", message)
+            else:
+                messagebox.showinfo("Merge Boards", message)
+        except Exception:
+            pass
     
     def _post_load_redraw(self, page_index):
         """Additional redraw after loading to ensure content appears"""
@@ -331,77 +686,21 @@ class FileManager:
     
     def _redraw_elements_on_canvas(self, canvas, page):
         """Manually redraw elements from a page onto the canvas"""
-        elements_count = 0
-        
-        for element in page.get("elements", []):
-            elements_count += 1
-            element_type = element.get("type")
-            
-            if element_type == "line":
-                # Redraw lines
-                points = element.get("points", [])
-                if len(points) >= 4:  # Need at least 2 points (x1,y1,x2,y2)
-                    color = element.get("color", "black")
-                    width = element.get("width", 2)
-                    # Create a new canvas item
-                    try:
-                        line_id = canvas.create_line(
-                            points, 
-                            fill=color, 
-                            width=width, 
-                            smooth=element.get("smooth", True),
-                            capstyle=tk.ROUND,
-                            joinstyle=tk.ROUND
-                        )
-                        print(f"Drew line with {len(points)//2} points")
-                    except Exception as e:
-                        print(f"Error drawing line: {e}")
-            
-            elif element_type == "rectangle":
-                # Redraw rectangles
-                try:
-                    x1, y1 = element.get("x1", 0), element.get("y1", 0)
-                    x2, y2 = element.get("x2", 0), element.get("y2", 0)
-                    color = element.get("outline", "black")
-                    fill = element.get("fill", "")
-                    width = element.get("width", 2)
-                    canvas.create_rectangle(x1, y1, x2, y2, outline=color, fill=fill, width=width)
-                    print(f"Drew rectangle at ({x1},{y1}) to ({x2},{y2})")
-                except Exception as e:
-                    print(f"Error drawing rectangle: {e}")
-            
-            elif element_type == "oval":
-                # Redraw ovals/circles
-                try:
-                    x1, y1 = element.get("x1", 0), element.get("y1", 0)
-                    x2, y2 = element.get("x2", 0), element.get("y2", 0)
-                    color = element.get("outline", "black")
-                    fill = element.get("fill", "")
-                    width = element.get("width", 2)
-                    canvas.create_oval(x1, y1, x2, y2, outline=color, fill=fill, width=width)
-                    print(f"Drew oval at ({x1},{y1}) to ({x2},{y2})")
-                except Exception as e:
-                    print(f"Error drawing oval: {e}")
-            
-            elif element_type == "text":
-                # Redraw text
-                try:
-                    x, y = element.get("x", 0), element.get("y", 0)
-                    text = element.get("text", "")
-                    color = element.get("color", "black")
-                    font_size = element.get("font_size", 12)
-                    font_family = element.get("font_family", "Arial")
-                    canvas.create_text(x, y, text=text, fill=color, 
-                                     font=(font_family, font_size), anchor="nw")
-                    print(f"Drew text '{text}' at ({x},{y})")
-                except Exception as e:
-                    print(f"Error drawing text: {e}")
-        
-        print(f"Manually drew {elements_count} elements on canvas")
+        elements = page.get("elements", [])
+        if canvas is getattr(self.app.canvas_manager, 'canvas', None):
+            # Draw progressively so the window stays responsive on big pages
+            elements_count = self.app.canvas_manager.render_page(elements)
+        else:
+            elements_count = self._get_renderer(canvas).render(elements)
         
-        # Force canvas to update after drawing all elements
-        canvas.update_idletasks()
-        canvas.update()
+        print(f"Drawing {elements_count} elements on canvas")
+
+    def _get_renderer(self, canvas):
+        """Return the canvas manager's batch renderer, or a new one for other canvases"""
+        renderer = getattr(self.app.canvas_manager, 'renderer', None)
+        if renderer is None or renderer.canvas is not canvas:
+            renderer = BatchRenderer(canvas)
+        return renderer
 
     def export_as_image(self):
         """Export the current whiteboard page as an image"""
@@ -516,8 +815,8 @@ class FileManager:
                     "background_color": "#FFFFFF"
                 })
             
-            # Get all canvas items
-            canvas_items = canvas.find_all()
+            # Get all canvas items except the grid
+            canvas_items = self._document_items(canvas)
             elements = []
             
             print(f"Found {len(canvas_items)} items on canvas for page {current_page_index}")
@@ -526,6 +825,10 @@ class FileManager:
                 try:
                     item_type = canvas.type(item_id)
                     coords = canvas.coords(item_id)
+                    tags = canvas.gettags(item_id)
+                    stamp = time_from_tags(tags)
+                    layer = layer_from_tags(tags)
+                    elements_before = len(elements)
                     
                     if item_type == "line":
                         # Get line properties
@@ -535,10 +838,12 @@ class FileManager:
                         element = {
                             "type": "line",
                             "points": coords,
-                            "color": canvas.itemcget(item_id, "fill") or "black",
+                            "color": self._item_color(canvas, item_id, "fill") or "black",
                             "width": width,
                             "smooth": canvas.itemcget(item_id, "smooth") == "1"
                         }
+                        if canvas.itemcget(item_id, "arrow") not in ("", "none"):
+                            element["arrow"] = True
                         elements.append(element)
                         
                     elif item_type == "rectangle":
@@ -549,12 +854,20 @@ class FileManager:
                             "type": "rectangle",
                             "x1": coords[0], "y1": coords[1],
                             "x2": coords[2], "y2": coords[3],
-                            "outline": canvas.itemcget(item_id, "outline") or "black",
-                            "fill": canvas.itemcget(item_id, "fill") or "",
+                            "outline": self._item_color(canvas, item_id, "outline") or "black",
+                            "fill": self._item_color(canvas, item_id, "fill") or "",
                             "width": width
                         }
                         elements.append(element)
                         
+                    elif item_type == "polygon":
+                        element = {
+                            "type": "polygon",
+                            "points": coords,
+                            "color": self._item_color(canvas, item_id, "fill") or "black"
+                        }
+                        elements.append(element)
+                        
                     elif item_type == "oval":
                         width_str = canvas.itemcget(item_id, "width")
                         width = int(float(width_str)) if width_str else 2
@@ -563,8 +876,8 @@ class FileManager:
                             "type": "oval",
                             "x1": coords[0], "y1": coords[1],
                             "x2": coords[2], "y2": coords[3],
-                            "outline": canvas.itemcget(item_id, "outline") or "black",
-                            "fill": canvas.itemcget(item_id, "fill") or "",
+                            "outline": self._item_color(canvas, item_id, "outline") or "black",
+                            "fill": self._item_color(canvas, item_id, "fill") or "",
                             "width": width
                         }
                         elements.append(element)
@@ -584,18 +897,24 @@ class FileManager:
                             "type": "text",
                             "x": coords[0], "y": coords[1],
                             "text": canvas.itemcget(item_id, "text") or "",
-                            "color": canvas.itemcget(item_id, "fill") or "black",
+                            "color": self._item_color(canvas, item_id, "fill") or "black",
                             "font_family": font_family,
                             "font_size": font_size
                         }
                         elements.append(element)
+                    
+                    if len(elements) > elements_before:
+                        if stamp is not None:
+                            elements[-1]["t"] = stamp
+                        if layer != DEFAULT_LAYER:
+                            elements[-1]["layer"] = layer
                         
                 except Exception as e:
                     print(f"Error capturing canvas item {item_id}: {e}")
                     continue
             
             # Update the current page with captured elements
-            self.app.page_manager.pages[current_page_index]["elements"] = elements
+            self._writable_page(current_page_index)["elements"] = elements
             print(f"Successfully captured {len(elements)} elements to page {current_page_index}")
             
         except Exception as e:
@@ -630,7 +949,7 @@ class FileManager:
                         
                         # Clear canvas first to ensure we see only this page's content
                         if hasattr(self.app.canvas_manager, 'canvas'):
-                            self.app.canvas_manager.canvas.delete("all")
+                            self.app.canvas_manager.clear_canvas(maintain_history=False)
                         
                         # Try different methods to switch and load the page
                         switched = False
@@ -714,7 +1033,7 @@ class FileManager:
             try:
                 # Clear canvas first
                 if hasattr(self.app.canvas_manager, 'canvas'):
-                    self.app.canvas_manager.canvas.delete("all")
+                    self.app.canvas_manager.clear_canvas(maintain_history=False)
                 
                 # Switch back
                 if hasattr(self.app.page_manager, 'switch_to_page'):
@@ -761,207 +1080,10 @@ class FileManager:
             bg_color = page_data.get("background_color", "#FFFFFF")
             canvas.config(bg=bg_color)
             
-            # Render each element
-            for element in elements:
-                try:
-                    element_type = element.get("type")
-                    
-                    if element_type == "line":
-                        points = element.get("points", [])
-                        if len(points) >= 4:
-                            canvas.create_line(
-                                points,
-                                fill=element.get("color", "black"),
-                                width=element.get("width", 2),
-                                smooth=element.get("smooth", True),
-                                capstyle=tk.ROUND,
-                                joinstyle=tk.ROUND
-                            )
-                    
-                    elif element_type == "rectangle":
-                        x1, y1 = element.get("x1", 0), element.get("y1", 0)
-                        x2, y2 = element.get("x2", 0), element.get("y2", 0)
-                        canvas.create_rectangle(
-                            x1, y1, x2, y2,
-                            outline=element.get("outline", "black"),
-                            fill=element.get("fill", ""),
-                            width=element.get("width", 2)
-                        )
-                    
-                    elif element_type == "oval":
-                        x1, y1 = element.get("x1", 0), element.get("y1", 0)
-                        x2, y2 = element.get("x2", 0), element.get("y2", 0)
-                        canvas.create_oval(
-                            x1, y1, x2, y2,
-                            outline=element.get("outline", "black"),
-                            fill=element.get("fill", ""),
-                            width=element.get("width", 2)
-                        )
-                    
-                    elif element_type == "text":
-                        x, y = element.get("x", 0), element.get("y", 0)
-                        text = element.get("text", "")
-                        font_family = element.get("font_family", "Arial")
-                        font_size = element.get("font_size", 12)
-                        canvas.create_text(
-                            x, y, text=text,
-                            fill=element.get("color", "black"),
-                            font=(font_family, font_size),
-                            anchor="nw"
-                        )
-                        
-                except Exception as e:
-                    print(f"      Error rendering element: {e}")
-                    continue
-            
-            # Force canvas update
+            # Render all elements in a single batched Tcl call. This runs
+            # synchronously because callers capture the canvas right after.
+            self._get_renderer(canvas).render(elements)
             canvas.update_idletasks()
-            canvas.update()
             
         except Exception as e:
             print(f"Error in _render_page_content: {e}")
-    
-    def _comprehensive_content_recovery(self):
-        """Comprehensive approach to recover all page content"""
-        try:
-            print("Starting comprehensive content recovery...")
-            
-            # Step 1: Save current page content
-            current_page = self.app.page_manager.current_page_index
-            print(f"Current page: {current_page}")
-            self._capture_current_canvas_state()
-            
-            # Step 2: Try to find content in various places
-            self._search_for_page_content()
-            
-            # Step 3: If pages still empty, try to reconstruct from canvas manager
-            self._try_canvas_manager_recovery()
-            
-            # Step 4: Look for undo/redo history
-            self._try_history_recovery()
-            
-            print("Comprehensive content recovery completed")
-            
-        except Exception as e:
-            print(f"Error in comprehensive content recovery: {e}")
-            import traceback
-            traceback.print_exc()
-
-    def _search_for_page_content(self):
-        """Search for page content in various app attributes"""
-        try:
-            print("Searching for page content in app attributes...")
-            
-            # Check if page manager has additional storage
-            if hasattr(self.app.page_manager, '__dict__'):
-                for attr_name, attr_value in self.app.page_manager.__dict__.items():
-                    if 'page' in attr_name.lower() and isinstance(attr_value, (list, dict)):
-                        print(f"  Found potential page storage: {attr_name}")
-                        if isinstance(attr_value, list) and len(attr_value) > 0:
-                            # Try to merge this with our pages
-                            for i, potential_page in enumerate(attr_value):
-                                if i < len(self.app.page_manager.pages) and isinstance(potential_page, dict):
-                                    if potential_page.get("elements") and len(potential_page["elements"]) > 0:
-                                        print(f"    Recovering {len(potential_page['elements'])} elements for page {i}")
-                                        self.app.page_manager.pages[i] = potential_page
-            
-            # Check canvas manager for stored content
-            if hasattr(self.app, 'canvas_manager') and hasattr(self.app.canvas_manager, '__dict__'):
-                for attr_name, attr_value in self.app.canvas_manager.__dict__.items():
-                    if ('page' in attr_name.lower() or 'content' in attr_name.lower()) and isinstance(attr_value, (list, dict)):
-                        print(f"  Found potential canvas storage: {attr_name}")
-                        if isinstance(attr_value, list):
-                            for i, content in enumerate(attr_value):
-                                if i < len(self.app.page_manager.pages) and isinstance(content, dict):
-                                    if content.get("elements") and len(content["elements"]) > 0:
-                                        print(f"    Recovering from canvas manager for page {i}")
-                                        self.app.page_manager.pages[i] = content
-            
-            # Check if there's a drawing tool manager that might have content
-            if hasattr(self.app, 'drawing_tool') and hasattr(self.app.drawing_tool, '__dict__'):
-                for attr_name, attr_value in self.app.drawing_tool.__dict__.items():
-                    if 'page' in attr_name.lower() and isinstance(attr_value, (list, dict)):
-                        print(f"  Found potential drawing tool storage: {attr_name}")
-                        
-        except Exception as e:
-            print(f"Error searching for page content: {e}")
-
-    def _try_canvas_manager_recovery(self):
-        """Try to recover content from canvas manager"""
-        try:
-            print("Trying canvas manager recovery...")
-            
-            if not hasattr(self.app, 'canvas_manager'):
-                return
-                
-            # Look for any stored canvas states or drawing history
-            canvas_manager = self.app.canvas_manager
-            
-            # Check if canvas manager has methods to get page content
-            if hasattr(canvas_manager, 'get_all_pages'):
-                try:
-                    all_pages = canvas_manager.get_all_pages()
-                    if all_pages and len(all_pages) > 0:
-                        print(f"  Found {len(all_pages)} pages in canvas manager")
-                        for i, page in enumerate(all_pages):
-                            if i < len(self.app.page_manager.pages):
-                                self.app.page_manager.pages[i] = page
-                except Exception as e:
-                    print(f"  Error getting pages from canvas manager: {e}")
-            
-            # Check for drawing history or stroke history
-            if hasattr(canvas_manager, 'drawing_history'):
-                try:
-                    history = canvas_manager.drawing_history
-                    if isinstance(history, dict):
-                        for page_num, page_history in history.items():
-                            if isinstance(page_num, int) and page_num < len(self.app.page_manager.pages):
-                                if page_history and len(page_history) > 0:
-                                    print(f"  Recovering from drawing history for page {page_num}")
-                                    # Convert history to elements format
-                                    elements = self._convert_history_to_elements(page_history)
-                                    if elements:
-                                        self.app.page_manager.pages[page_num]["elements"] = elements
-                except Exception as e:
-                    print(f"  Error accessing drawing history: {e}")
-                    
-        except Exception as e:
-            print(f"Error in canvas manager recovery: {e}")
-
-    def _try_history_recovery(self):
-        """Try to recover from undo/redo history"""
-        try:
-            print("Trying history recovery...")
-            
-            # Look for undo/redo managers
-            for attr_name in dir(self.app):
-                if 'undo' in attr_name.lower() or 'history' in attr_name.lower():
-                    history_manager = getattr(self.app, attr_name)
-                    if hasattr(history_manager, 'history') or hasattr(history_manager, 'pages'):
-                        print(f"  Found potential history in: {attr_name}")
-                        try:
-                            if hasattr(history_manager, 'get_all_pages'):
-                                pages = history_manager.get_all_pages()
-                                if pages:
-                                    for i, page in enumerate(pages):
-                                        if i < len(self.app.page_manager.pages) and page.get("elements"):
-                                            print(f"    Recovering from history for page {i}")
-                                            self.app.page_manager.pages[i] = page
-                        except Exception as e:
-                            print(f"    Error accessing history: {e}")
-                            
-        except Exception as e:
-            print(f"Error in history recovery: {e}")
-
-    def _convert_history_to_elements(self, history):
-        """Convert drawing history to elements format"""
-        try:
-            elements = []
-            if isinstance(history, list):
-                for item in history:
-                    if isinstance(item, dict) and item.get("type"):
-                        elements.append(item)
-            return elements
-        except Exception as e:
-            print(f"Error converting history to elements: {e}")
-            return []
@@ -0,0 +1,77 @@
+"""
+Cached font metrics for laying out canvas text without asking Tk each time.
+
+tkinter.font.Font.measure() is a round trip into Tk per call, and text
+layout (bounding boxes of saved text elements, the frame around text
+being edited) would otherwise call it for every string on every
+keystroke or page render. Fonts are created once per (family, size), and
+each character's advance width is measured once per font; a line's width
+is the sum of its characters' widths, which is how Tk lays out text in
+fonts without kerning.
+"""
+import tkinter.font as tkfont
+
+DEFAULT_FAMILY = "Arial"
+DEFAULT_SIZE = 12
+
+
+class FontMetrics:
+    def __init__(self, widget):
+        self.widget = widget
+        self._fonts = {}        # (family, size) -> tkfont.Font
+        self._widths = {}       # (family, size) -> {character: width}
+        self._linespace = {}    # (family, size) -> line height
+
+    def parse(self, font):
+        """(family, size) of a font given as a tuple or as Tk's string form, e.g. "{Comic Sans MS} 14" """
+        if isinstance(font, (tuple, list)):
+            parts = list(font)
+        else:
+            parts = list(self.widget.tk.splitlist(font or ""))
+        family = str(parts[0]) if parts else DEFAULT_FAMILY
+        try:
+            size = int(float(parts[1])) if len(parts) > 1 else DEFAULT_SIZE
+        except ValueError:
+            size = DEFAULT_SIZE
+        return family, size
+
+    def font(self, family, size):
+        key = (family, size)
+        font = self._fonts.get(key)
+        if font is None:
+            font = tkfont.Font(root=self.widget, family=family, size=size)
+            self._fonts[key] = font
+            self._widths[key] = {}
+            self._linespace[key] = font.metrics("linespace")
+        return font
+
+    def linespace(self, family, size):
+        self.font(family, size)
+        return self._linespace[(family, size)]
+
+    def line_width(self, line, family, size):
+        """Width of one line of text in pixels"""
+        font = self.font(family, size)
+        widths = self._widths[(family, size)]
+        total = 0
+        for char in line:
+            width = widths.get(char)
+            if width is None:
+                width = widths[char] = font.measure(char)
+            total += width
+        return total
+
+    def text_size(self, text, family, size):
+        """(width, height) of possibly multi-line text"""
+        lines = (text or "").split("\n")
+        width = max(self.line_width(line, family, size) for line in lines)
+        return width, len(lines) * self.linespace(family, size)
+
+    def text_bbox(self, x, y, text, family, size, anchor="nw"):
+        """Bounding box of text placed at (x, y) with a Tk anchor"""
+        width, height = self.text_size(text, family, size)
+        # Compass anchors ("n", "se", ...); "center" centres on both axes
+        anchor = "" if anchor in (None, "", "center") else anchor
+        left = x if "w" in anchor else x - width if "e" in anchor else x - width / 2
+        top = y if "n" in anchor else y - height if "s" in anchor else y - height / 2
+        return left, top, left + width, top + height
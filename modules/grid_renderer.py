@@ -0,0 +1,111 @@
+import math
+import tkinter as tk
+
+
+class GridRenderer:
+    """
+    Background grid drawn from a small pool of reused canvas lines.
+
+    Only the lines covering the current viewport exist. On resize, scroll
+    or zoom the pool is re-laid out with one batched Tcl script instead of
+    deleting and recreating the grid. Grid item ids are tracked in a set,
+    so callers can exclude them from the document without a gettags call
+    per item.
+    """
+
+    TAG = "grid"
+    SPACING = 20        # Grid spacing in canvas units at zoom 1.0
+    MIN_SPACING = 8     # Never draw lines closer than this many pixels
+    COLOR = "gray90"
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.visible = False
+        self.zoom = 1.0
+        # Canvas position of the grid origin; moves when the content is scaled
+        self.origin_x = 0.0
+        self.origin_y = 0.0
+        self._pool = []
+        self._ids = set()
+        self._layout_job = None
+        # Items the grid stays just above when it is lowered (the page background)
+        self.floor_tag = None
+
+    def show(self):
+        self.visible = True
+        self.layout()
+
+    def hide(self):
+        self.visible = False
+        self._cancel_layout()
+        self.canvas.itemconfigure(self.TAG, state=tk.HIDDEN)
+
+    def is_grid_item(self, item_id):
+        return item_id in self._ids
+
+    @property
+    def item_ids(self):
+        return frozenset(self._ids)
+
+    def on_zoom(self, x, y, factor):
+        """Follow a canvas.scale(x, y, factor, factor) applied to the content"""
+        self.zoom *= factor
+        self.origin_x = x + (self.origin_x - x) * factor
+        self.origin_y = y + (self.origin_y - y) * factor
+        self.schedule_layout()
+
+    def schedule_layout(self, event=None):
+        """Coalesce bursts of resize/scroll events into one layout pass"""
+        if self.visible and self._layout_job is None:
+            self._layout_job = self.canvas.after_idle(self.layout)
+
+    def layout(self):
+        """Position pooled lines to cover the viewport, creating lines only if the pool is short"""
+        self._layout_job = None
+        if not self.visible:
+            return
+
+        spacing = self.SPACING * self.zoom
+        while spacing < self.MIN_SPACING:
+            spacing *= 2
+
+        x1 = self.canvas.canvasx(0)
+        y1 = self.canvas.canvasy(0)
+        x2 = x1 + max(self.canvas.winfo_width(), 1)
+        y2 = y1 + max(self.canvas.winfo_height(), 1)
+
+        first_x = self.origin_x + math.ceil((x1 - self.origin_x) / spacing) * spacing
+        first_y = self.origin_y + math.ceil((y1 - self.origin_y) / spacing) * spacing
+        xs = [first_x + i * spacing for i in range(int((x2 - first_x) / spacing) + 1)]
+        ys = [first_y + i * spacing for i in range(int((y2 - first_y) / spacing) + 1)]
+
+        needed = len(xs) + len(ys)
+        while len(self._pool) < needed:
+            line = self.canvas.create_line(0, 0, 0, 0, fill=self.COLOR, tags=self.TAG)
+            self._pool.append(line)
+            self._ids.add(line)
+
+        path = self.canvas._w
+        commands = []
+        lines = iter(self._pool)
+        for x in xs:
+            commands.append(f"{path} coords {next(lines)} {x} {y1} {x} {y2}")
+        for y in ys:
+            commands.append(f"{path} coords {next(lines)} {x1} {y} {x2} {y}")
+        # Grid lines never take events; spare lines are parked hidden instead of deleted
+        commands.append(f"{path} itemconfigure {self.TAG} -state disabled")
+        for line in lines:
+            commands.append(f"{path} itemconfigure {line} -state hidden")
+        commands.append(f"{path} lower {self.TAG}")
+        if self.floor_tag:
+            commands.append(f"if {{[llength [{path} find withtag {self.floor_tag}]]}} "
+                            f"{{{path} raise {self.TAG} {self.floor_tag}}}")
+        self.canvas.tk.eval("\n".join(commands))
+
+    def _cancel_layout(self):
+        if self._layout_job is not None:
+            try:
+                self.canvas.after_cancel(self._layout_job)
+            except tk.TclError:
+                pass
+            self._layout_job = None
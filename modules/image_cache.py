@@ -0,0 +1,185 @@
+"""
+Decoding of page background images and PDF pages, with a mip-level cache.
+
+A background source is a small dict saved with its page:
+    {"kind": "image" | "pdf", "hash": ..., "name": ..., "page": n, "size": [w, h]}
+"hash" is the SHA-256 of the file, which is kept in the board's
+AssetStore (see modules.asset_store). "size" is the full-resolution size
+(for PDFs: rendered at PDF_MAX_DPI), so the level needed for a display
+size is known without decoding anything.
+Level n is the source downscaled by 2**n. JPEGs are decoded straight at a
+reduced scale and PDF pages are rasterized at the matching resolution, so
+the full-size image is never decoded for a small display.
+
+PDF pages are rasterized with PyMuPDF when it is installed, otherwise
+with poppler's pdftoppm/pdfinfo tools when they are on the PATH.
+"""
+import io
+import math
+import os
+import re
+import shutil
+import subprocess
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+# Optional PDF rasterizer
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+PDF_MAX_DPI = 288           # Level 0 of a PDF page; level 2 is 72 dpi
+PDF_POINTS_PER_INCH = 72
+MAX_LEVEL = 8
+
+
+def mip_level(source_size, target_size):
+    """The coarsest level that still has at least target_size pixels"""
+    ratio = min(source_size[0] / max(1, target_size[0]), source_size[1] / max(1, target_size[1]))
+    if ratio <= 1:
+        return 0
+    return min(MAX_LEVEL, int(math.floor(math.log2(ratio))))
+
+
+def level_size(source_size, level):
+    scale = 2 ** level
+    return max(1, math.ceil(source_size[0] / scale)), max(1, math.ceil(source_size[1] / scale))
+
+
+def image_source(path, assets):
+    """Add an image file to assets and return its background source (only its header is decoded)"""
+    with Image.open(path) as image:
+        size = list(image.size)
+    return {"kind": "image", "hash": assets.add_file(path), "name": os.path.basename(path), "size": size}
+
+
+def pdf_sources(path, assets):
+    """Add a PDF to assets and return a background source for each of its pages"""
+    sizes = _pdf_page_sizes(path)
+    digest = assets.add_file(path)
+    name = os.path.basename(path)
+    return [{"kind": "pdf", "hash": digest, "name": name, "page": index, "size": size}
+            for index, size in enumerate(sizes)]
+
+
+def _pdf_page_sizes(path):
+    """Pixel size of each page at PDF_MAX_DPI"""
+    scale = PDF_MAX_DPI / PDF_POINTS_PER_INCH
+    if fitz is not None:
+        with fitz.open(path) as document:
+            return [[math.ceil(page.rect.width * scale), math.ceil(page.rect.height * scale)]
+                    for page in document]
+
+    pdfinfo = shutil.which("pdfinfo")
+    if pdfinfo is None:
+        raise RuntimeError("Importing PDFs needs PyMuPDF (pip install pymupdf) or poppler's pdfinfo/pdftoppm")
+    output = subprocess.run([pdfinfo, path], capture_output=True, text=True, check=True).stdout
+    match = re.search(r"^Pages:\s+(\d+)", output, re.MULTILINE)
+    count = int(match.group(1)) if match else 0
+    output = subprocess.run([pdfinfo, "-f", "1", "-l", str(count), path],
+                            capture_output=True, text=True, check=True).stdout
+    sizes = [[math.ceil(float(w) * scale), math.ceil(float(h) * scale)]
+             for w, h in re.findall(r"^Page\s+\d+ size:\s+([\d.]+) x ([\d.]+)", output, re.MULTILINE)]
+    return sizes or [[0, 0]] * count
+
+
+def decode(source, level, assets):
+    """Decode a source at a mip level into an RGB(A) image"""
+    size = level_size(source["size"], level)
+    digest = source["hash"]
+    if digest not in assets and source.get("path"):
+        # Boards saved before assets were embedded point at the original file
+        if assets.add_file(source["path"]) != digest:
+            raise ValueError(f"{source['path']} has changed since it was imported")
+    if source["kind"] == "pdf":
+        image = _rasterize_pdf_page(assets, digest, source.get("page", 0), PDF_MAX_DPI / 2 ** level)
+    else:
+        with assets.open(digest) as f:
+            image = Image.open(f)
+            # JPEG decoders scale by 1/2, 1/4 or 1/8 while decoding, which is much cheaper
+            image.draft("RGB", size)
+            image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+    if image.size != size:
+        image = image.resize(size, Image.BOX)
+    return image
+
+
+def _rasterize_pdf_page(assets, digest, page, dpi):
+    if fitz is not None:
+        with fitz.open(stream=assets.read(digest), filetype="pdf") as document:
+            zoom = dpi / PDF_POINTS_PER_INCH
+            pixmap = document[page].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+            return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+
+    pdftoppm = shutil.which("pdftoppm")
+    if pdftoppm is None:
+        raise RuntimeError("Rendering PDF pages needs PyMuPDF (pip install pymupdf) or poppler's pdftoppm")
+    number = str(page + 1)
+    result = subprocess.run([pdftoppm, "-f", number, "-l", number, "-r", f"{dpi:.2f}", "-png",
+                             assets.local_path(digest)],
+                            capture_output=True, check=True)
+    image = Image.open(io.BytesIO(result.stdout))
+    image.load()
+    return image
+
+
+class MipCache:
+    """
+    Decoded background images keyed by (file hash, page, level).
+
+    Holds at most budget bytes of pixels, dropping the least recently used
+    images first. A missing level is made by downscaling a finer cached
+    level when there is one, which is far cheaper than decoding the file.
+    Safe to use from worker threads.
+    """
+
+    def __init__(self, assets, budget=256 * 1024 * 1024):
+        self.assets = assets
+        self.budget = budget
+        self._images = OrderedDict()
+        self._used = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(source, level):
+        return source["hash"], source.get("page", 0), level
+
+    def get(self, source, level):
+        with self._lock:
+            image = self._images.get(self.key(source, level))
+            if image is not None:
+                self._images.move_to_end(self.key(source, level))
+            return image
+
+    def put(self, source, level, image):
+        key = self.key(source, level)
+        with self._lock:
+            if key in self._images:
+                return
+            self._images[key] = image
+            self._used += self._image_bytes(image)
+            while self._used > self.budget and len(self._images) > 1:
+                _, dropped = self._images.popitem(last=False)
+                self._used -= self._image_bytes(dropped)
+
+    def load(self, source, level):
+        """Return the image at a level, from the cache, a finer cached level or the file"""
+        image = self.get(source, level)
+        if image is not None:
+            return image
+        for finer in range(level - 1, -1, -1):
+            base = self.get(source, finer)
+            if base is not None:
+                image = base.resize(level_size(source["size"], level), Image.BOX)
+                break
+        else:
+            image = decode(source, level, self.assets)
+        self.put(source, level, image)
+        return image
+
+    @staticmethod
+    def _image_bytes(image):
+        return image.width * image.height * len(image.getbands())
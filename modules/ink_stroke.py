@@ -0,0 +1,79 @@
+"""
+Variable-width ink: per-point stroke widths and the filled outline polygon.
+
+Tk reports no stylus pressure on most platforms, so widths normally come
+from drawing speed (fast strokes get thinner, like a nib); when an event
+does carry a pressure value in [0, 1] it is used instead. The outline is
+the centre line offset by half the width along each point's normal on
+both sides, with round caps, and is drawn as one smoothed polygon.
+A stroke has at most a few hundred points, so this is plain Python, like
+shape_recognizer (numpy is not a dependency).
+"""
+import math
+
+MIN_FACTOR = 0.35           # Width factor at full speed (or no pressure)
+MAX_FACTOR = 1.15           # Width factor when moving slowly (or full pressure)
+FULL_SPEED = 2.5            # px/ms at which the stroke is thinnest
+SMOOTHING = 0.35            # Weight of the newest sample in the running width factor
+CAP_SEGMENTS = 4
+
+
+def width_factor(speed=None, pressure=None, previous=None):
+    """Width multiplier for the next point, eased from the previous one"""
+    if pressure is not None:
+        target = MIN_FACTOR + (MAX_FACTOR - MIN_FACTOR) * min(1.0, max(0.0, pressure))
+    else:
+        target = MAX_FACTOR - (MAX_FACTOR - MIN_FACTOR) * min(1.0, max(0.0, speed or 0.0) / FULL_SPEED)
+    if previous is None:
+        return target
+    return previous + (target - previous) * SMOOTHING
+
+
+def stroke_outline(points, widths):
+    """Flat polygon coordinates outlining a stroke of flat points with per-point widths"""
+    xs, ys, half = [], [], []
+    for i in range(len(points) // 2):
+        x, y = points[2 * i], points[2 * i + 1]
+        # Repeated points have no direction
+        if xs and x == xs[-1] and y == ys[-1]:
+            continue
+        xs.append(x)
+        ys.append(y)
+        half.append(max(0.5, widths[i] / 2))
+    if len(xs) < 2:
+        return _circle(xs[0], ys[0], half[0]) if xs else []
+
+    count = len(xs)
+    tx = [xs[min(i + 1, count - 1)] - xs[max(i - 1, 0)] for i in range(count)]
+    ty = [ys[min(i + 1, count - 1)] - ys[max(i - 1, 0)] for i in range(count)]
+    length = [math.hypot(a, b) or 1 for a, b in zip(tx, ty)]
+    nx = [-b / l for b, l in zip(ty, length)]
+    ny = [a / l for a, l in zip(tx, length)]
+    left, right = [], []
+    for x, y, a, b, h in zip(xs, ys, nx, ny, half):
+        left.extend((x + a * h, y + b * h))
+        right.extend((x - a * h, y - b * h))
+    right = [v for i in range(count - 1, -1, -1) for v in right[2 * i:2 * i + 2]]
+    normals = [[nx[0], ny[0]], [nx[-1], ny[-1]]]
+
+    end_cap = _cap(xs[-1], ys[-1], half[-1], normals[1], 0)
+    start_cap = _cap(xs[0], ys[0], half[0], normals[0], math.pi)
+    return left + end_cap + right + start_cap
+
+
+def _cap(x, y, radius, normal, start):
+    """Points of a half circle around (x, y), turning from the normal's side to the other"""
+    angle = math.atan2(normal[1], normal[0]) + start
+    points = []
+    for k in range(1, CAP_SEGMENTS):
+        a = angle - math.pi * k / CAP_SEGMENTS
+        points.extend((x + radius * math.cos(a), y + radius * math.sin(a)))
+    return points
+
+
+def _circle(x, y, radius, segments=8):
+    points = []
+    for k in range(segments):
+        a = 2 * math.pi * k / segments
+        points.extend((x + radius * math.cos(a), y + radius * math.sin(a)))
+    return points
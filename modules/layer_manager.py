@@ -0,0 +1,215 @@
+import tkinter as tk
+
+# Bottom to top
+LAYERS = ("background", "annotations", "ink")
+DEFAULT_LAYER = "ink"
+LAYER_TAG_PREFIX = "layer_"
+RASTER_TAG = "layer_raster"
+
+
+def layer_tag(name):
+    return LAYER_TAG_PREFIX + name
+
+
+def layer_from_tags(tags):
+    """Return the layer named in a tag list (or space separated string); untagged items are ink"""
+    if isinstance(tags, str):
+        tags = tags.split()
+    for tag in tags or ():
+        if tag.startswith(LAYER_TAG_PREFIX) and tag[len(LAYER_TAG_PREFIX):] in LAYERS:
+            return tag[len(LAYER_TAG_PREFIX):]
+    return DEFAULT_LAYER
+
+
+class LayerManager:
+    """
+    Background, annotation and ink layers on every page.
+
+    Each canvas item carries a "layer_<name>" tag (saved as the element's
+    "layer"), so a layer is shown or hidden with one itemconfigure on its
+    tag. New items are lowered below the layers above their own. Locked
+    layers are skipped by the eraser and cannot be drawn on. Because they
+    cannot change, a locked layer is also flattened into one cached image
+    and its vector items are hidden. Text, smoothed lines and other items
+    PIL would not draw the way Tk does stay vectors, above the image. The
+    cache is rebuilt after zooming, a theme switch or a page change.
+    """
+
+    FLATTEN_MIN_ITEMS = 200     # Smaller layers are cheap enough to leave as vectors
+
+    def __init__(self, app):
+        self.app = app
+        self.current = DEFAULT_LAYER
+        self.state = {name: {"visible": True, "locked": False} for name in LAYERS}
+        self.raster_items = {}      # layer -> (image item id, PhotoImage)
+        self.vector_items = {}      # layer -> items left out of its image
+        self._rebuild_job = None
+
+    @property
+    def canvas(self):
+        return self.app.canvas_manager.canvas
+
+    def tags(self, layer=None):
+        return (layer_tag(layer or self.current),)
+
+    def is_visible(self, name):
+        return self.state[name]["visible"]
+
+    def is_locked(self, name):
+        return self.state[name]["locked"]
+
+    def can_draw(self):
+        """True if new drawing is allowed on the current layer"""
+        return self.is_visible(self.current) and not self.is_locked(self.current)
+
+    def is_erasable(self, item):
+        if item in self.raster_ids():
+            return False
+        return not self.is_locked(layer_from_tags(self.canvas.gettags(item)))
+
+    def raster_ids(self):
+        return {item for item, _ in self.raster_items.values()}
+
+    def place(self, item, layer=None):
+        """Keep a new item below every item of the layers above its own"""
+        index = LAYERS.index(layer or self.current)
+        for above in LAYERS[index + 1:]:
+            try:
+                self.canvas.tag_lower(item, layer_tag(above))
+                return
+            except tk.TclError:
+                # No items on that layer
+                continue
+
+    def set_current(self, name):
+        if name in LAYERS:
+            self.current = name
+            self._sync_controls()
+            print(f"Drawing on the {name} layer")
+
+    def set_visible(self, name, visible):
+        self.state[name]["visible"] = bool(visible)
+        self._apply_visibility(name)
+        self._sync_controls()
+
+    def set_locked(self, name, locked):
+        self.state[name]["locked"] = bool(locked)
+        if locked:
+            self.flatten(name)
+        else:
+            self.unflatten(name)
+        self._sync_controls()
+
+    def get_state(self):
+        """Layer settings to save with the board"""
+        return {name: dict(settings) for name, settings in self.state.items()}
+
+    def set_state(self, state):
+        for name, settings in (state or {}).items():
+            if name in self.state and isinstance(settings, dict):
+                self.state[name]["visible"] = bool(settings.get("visible", True))
+                self.state[name]["locked"] = bool(settings.get("locked", False))
+        self.apply()
+
+    def apply(self):
+        """Re-apply visibility and rebuild the cached layers, e.g. after a page was drawn"""
+        self.drop_rasters()
+        for name in LAYERS:
+            self._apply_visibility(name)
+            if self.is_locked(name):
+                self.flatten(name)
+        self._sync_controls()
+
+    def invalidate(self):
+        """Cached images no longer match the items (zoom, theme); rebuild them when idle"""
+        if not self.raster_items:
+            return
+        self.drop_rasters()
+        for name in LAYERS:
+            self._apply_visibility(name)
+        if self._rebuild_job is None:
+            self._rebuild_job = self.app.root.after_idle(self._rebuild)
+
+    def _rebuild(self):
+        self._rebuild_job = None
+        for name in LAYERS:
+            if self.is_locked(name):
+                self.flatten(name)
+
+    def drop_rasters(self):
+        """Delete the cached layer images (the vector items are kept)"""
+        for item, _ in self.raster_items.values():
+            self.canvas.delete(item)
+        self.raster_items.clear()
+        self.vector_items.clear()
+
+    def _apply_visibility(self, name):
+        state = "normal" if self.is_visible(name) else "hidden"
+        if name in self.raster_items:
+            self.canvas.itemconfigure(layer_tag(name), state="hidden")
+            self.canvas.itemconfigure(self.raster_items[name][0], state=state)
+            for item in self.vector_items.get(name, ()):
+                self.canvas.itemconfigure(item, state=state)
+        else:
+            self.canvas.itemconfigure(layer_tag(name), state=state)
+
+    def flatten(self, name):
+        """Replace a layer's vector items with one image while it is locked"""
+        # Imported here: thumbnail_renderer imports this module through batch_renderer
+        from PIL import Image, ImageDraw, ImageTk
+        from modules.thumbnail_renderer import draw_items
+
+        if name in self.raster_items:
+            return
+        canvas = self.canvas
+        tag = layer_tag(name)
+        items = canvas.find_withtag(tag)
+        if len(items) < self.FLATTEN_MIN_ITEMS:
+            return
+
+        drawable, flat, kept = [], [], []
+        for item in items:
+            item_type = canvas.type(item)
+            # PIL has no Tk fonts or spline smoothing: those items stay vectors
+            if item_type not in ("line", "rectangle", "oval", "polygon") or \
+                    (item_type in ("line", "polygon") and canvas.itemcget(item, "smooth") not in ("", "0", "false")):
+                kept.append(item)
+                continue
+            options = {"width": canvas.itemcget(item, "width"), "fill": canvas.itemcget(item, "fill")}
+            if item_type != "line":
+                options["outline"] = canvas.itemcget(item, "outline")
+            drawable.append((item_type, canvas.coords(item), options))
+            flat.append(item)
+        if len(flat) < self.FLATTEN_MIN_ITEMS:
+            return
+        bbox = canvas.bbox(*flat)
+        if not bbox:
+            return
+        x0, y0, x1, y1 = bbox
+
+        image = Image.new("RGBA", (max(1, x1 - x0), max(1, y1 - y0)), (0, 0, 0, 0))
+        draw_items(ImageDraw.Draw(image), drawable, (1.0, -x0, -y0))
+        photo = ImageTk.PhotoImage(image)
+        raster = canvas.create_image(x0, y0, image=photo, anchor="nw", tags=(tag, RASTER_TAG))
+        canvas.tag_lower(raster, items[0])
+        self.raster_items[name] = (raster, photo)
+        self.vector_items[name] = kept
+        self._apply_visibility(name)
+        print(f"Flattened the {name} layer ({len(flat)} items) into one image, "
+              f"keeping {len(kept)} text and smoothed items as they are")
+
+    def unflatten(self, name):
+        entry = self.raster_items.pop(name, None)
+        self.vector_items.pop(name, None)
+        if entry is not None:
+            self.canvas.delete(entry[0])
+        self._apply_visibility(name)
+
+    def _sync_controls(self):
+        """Show the current layer's settings in the toolbar"""
+        toolbar = getattr(self.app, 'toolbar_manager', None)
+        if toolbar is None or not hasattr(toolbar, 'layer_choice'):
+            return
+        toolbar.layer_choice.set(self.current.title())
+        toolbar.layer_visible_var.set(self.is_visible(self.current))
+        toolbar.layer_locked_var.set(self.is_locked(self.current))
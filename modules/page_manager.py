@@ -1,10 +1,16 @@
 import tkinter as tk
+from modules.page_store import PageStore, PackedPage
+from modules.asset_store import AssetStore
 
 class PageManager:
     def __init__(self, app):
         self.app = app
         self.pages = []
         self.current_page_index = 0
+        # Inactive pages are kept compressed (and spilled to disk past the budget)
+        self.page_store = PageStore(memory_budget=getattr(app, 'page_memory_budget', 64 * 1024 * 1024))
+        # Images and PDFs used by the pages, stored once each by content hash
+        self.asset_store = AssetStore()
 
     def initialize_page(self):
         """Initialize the first page"""
@@ -26,8 +32,11 @@ class PageManager:
             self.pages.append(new_page)
             self.current_page_index = 0
         else:
+            self.pack_page(self.current_page_index)
             self.current_page_index += 1
             self.pages.insert(self.current_page_index, new_page)
+        if hasattr(self.app, 'collaboration_manager'):
+            self.app.collaboration_manager.page_added(self.current_page_index)
         
         # Update the canvas and UI
         if update_ui:
@@ -46,8 +55,13 @@ class PageManager:
             current_page = self.pages[self.current_page_index]
             
             # Properly check if page is empty by looking at canvas objects
+            # (a page still being rendered, or with an image or PDF background, is never empty)
             canvas_objects = self.app.canvas_manager.get_canvas_objects() if hasattr(self.app.canvas_manager, 'get_canvas_objects') else []
-            is_empty = len(canvas_objects) == 0
+            background = current_page.background if hasattr(current_page, 'unpack') else current_page.get("background")
+            is_empty = len(canvas_objects) == 0 and not self.app.canvas_manager.is_rendering() and not background
+            # In a shared session every client keeps the same pages
+            if hasattr(self.app, 'collaboration_manager') and self.app.collaboration_manager.is_connected:
+                is_empty = False
             
             if is_empty:
                 # Remove the empty page
@@ -57,6 +71,7 @@ class PageManager:
             else:
                 # Save current page state before navigating away
                 self.save_current_page()
+                self.pack_page(self.current_page_index)
                 self.current_page_index -= 1
 
             self.load_current_page()
@@ -67,6 +82,7 @@ class PageManager:
         if self.current_page_index < len(self.pages) - 1:
             # Save current page state
             self.save_current_page()
+            self.pack_page(self.current_page_index)
             
             # Move to next page
             self.current_page_index += 1
@@ -78,11 +94,21 @@ class PageManager:
     def save_current_page(self):
         """Save the current canvas state to the current page"""
         if self.pages and 0 <= self.current_page_index < len(self.pages):
+            current_page = self.hydrate_page(self.current_page_index)
+            
+            # If the page is still being drawn, the canvas only holds part of it.
+            # Draw the rest now, so strokes added during the render are kept too.
+            if self.app.canvas_manager.is_rendering():
+                self.app.canvas_manager.renderer.finish()
+                print(f"Page {self.current_page_index + 1} left before rendering finished; finished it first")
+            
             # Get the current canvas objects and history
-            current_page = self.pages[self.current_page_index]
             current_page["objects"] = self.app.canvas_manager.get_canvas_objects()
-            current_page["undo_stack"] = self.app.canvas_manager.undo_stack
-            current_page["redo_stack"] = self.app.canvas_manager.redo_stack
+            # Transforms act on the selection's group tag, which the saved objects do not keep
+            current_page["undo_stack"] = [action for action in self.app.canvas_manager.undo_stack
+                                          if action.get("type") != "transform"]
+            current_page["redo_stack"] = [action for action in self.app.canvas_manager.redo_stack
+                                          if action.get("type") != "transform"]
             
             print(f"Saved page {self.current_page_index + 1} with {len(current_page['objects'])} objects")
     
@@ -92,17 +118,30 @@ class PageManager:
             # Clear the canvas without adding to history
             self.app.canvas_manager.clear_canvas(maintain_history=False)
             
-            # Get the current page data
-            current_page = self.pages[self.current_page_index]
+            # Get the current page data, unpacking it if it was stored compactly
+            current_page = self.hydrate_page(self.current_page_index)
             
-            # Restore canvas objects
-            self.app.canvas_manager.restore_canvas_objects(current_page.get("objects", []))
+            # Restore canvas objects progressively; pages loaded from a file
+            # only carry the FileManager "elements" list
+            objects = current_page.get("objects") or current_page.get("elements", [])
+            self.app.canvas_manager.render_page(objects)
             
             # Restore undo/redo stacks
             self.app.canvas_manager.undo_stack = current_page.get("undo_stack", [])
             self.app.canvas_manager.redo_stack = current_page.get("redo_stack", [])
             
-            print(f"Loaded page {self.current_page_index + 1} with {len(current_page.get('objects', []))} objects")
+            print(f"Loaded page {self.current_page_index + 1} with {len(objects)} objects")
+    
+    def go_to_page(self, index):
+        """Jump straight to a page (used by the thumbnail strip)"""
+        if not 0 <= index < len(self.pages) or index == self.current_page_index:
+            return
+        self.save_current_page()
+        self.pack_page(self.current_page_index)
+        self.current_page_index = index
+        self.load_current_page()
+        self.update_page_info()
+        print(f"Jumped to page: {self.current_page_index + 1}/{len(self.pages)}")
     
     def update_page_info(self):
         """Update the page info label in the toolbar"""
@@ -110,13 +149,51 @@ class PageManager:
             page_text = f"Page {self.current_page_index + 1}/{len(self.pages)}"
             self.app.toolbar_manager.page_info.config(text=page_text)
             print(f"Updated page info: {page_text}")
+        if hasattr(self.app, 'background_manager'):
+            self.app.background_manager.show_page()
+        if hasattr(self.app, 'diff_manager'):
+            self.app.diff_manager.show_page()
+        if hasattr(self.app, 'thumbnail_manager'):
+            self.app.thumbnail_manager.refresh()
+    
+    def update_page_display(self):
+        """Refresh the page label and thumbnails after the page list was replaced"""
+        self.update_page_info()
             
     def get_current_page_data(self):
         """Get the data for the current page"""
         if self.pages and 0 <= self.current_page_index < len(self.pages):
-            return self.pages[self.current_page_index]
+            return self.hydrate_page(self.current_page_index)
         return None
 
+    def pack_page(self, index):
+        """Replace an inactive page with its compact form to bound memory use"""
+        if 0 <= index < len(self.pages) and isinstance(self.pages[index], dict):
+            page = self.pages[index]
+            self.pages[index] = self.page_store.pack(page)
+            # A page's content only changes while it is shown, so it is (re)indexed here
+            if hasattr(self.app, 'search_manager'):
+                self.app.search_manager.index_page(page, self.pages[index].digest)
+
+    def hydrate_page(self, index):
+        """Make sure the page at index is a plain dict again and return it"""
+        page = self.pages[index]
+        if isinstance(page, PackedPage):
+            unpacked = page.unpack()
+            page.release()
+            if page.page_id is not None:
+                unpacked["id"] = page.page_id
+            self.pages[index] = unpacked
+            return unpacked
+        return page
+
+    def pack_inactive_pages(self):
+        """Pack every page except the current one, e.g. after loading a file"""
+        for index in range(len(self.pages)):
+            if index != self.current_page_index:
+                self.pack_page(index)
+        print(f"Page store: {self.page_store.memory_used} bytes of packed pages in memory")
+
     def get_canvas_objects(self):
         """Helper method to safely get canvas objects"""
         if hasattr(self.app.canvas_manager, 'get_canvas_objects'):
@@ -0,0 +1,212 @@
+import bisect
+import hashlib
+import json
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from modules.timeline import page_start
+
+
+def content_digest(items):
+    """Hash of a page's drawable entries (its "objects" or "elements" list)"""
+    data = json.dumps(items, separators=(",", ":"), default=list).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class PackedPage(Mapping):
+    """
+    Read-only stand-in for an inactive page.
+
+    Behaves like the page dict for readers (get, [], keys, items), but the
+    data lives compressed in a PageStore and is only unpacked on access.
+    PageManager swaps it back for a real dict when the page is shown.
+    The content digest and background reference are kept unpacked so caches
+    can be checked cheaply, and so are the page's id (see CollaborationManager)
+    and the time of its first entry (start, see timeline.page_start; None
+    when unknown, or when the page is empty).
+    Every lookup gets its own copy of the data, so
+    readers may modify what they get without affecting later reads.
+    """
+
+    __slots__ = ("_store", "key", "object_count", "digest", "background", "start", "page_id")
+
+    def __init__(self, store, key, object_count, digest=None, background=None, start=None, page_id=None):
+        self._store = store
+        self.key = key
+        self.object_count = object_count
+        self.digest = digest
+        self.background = background
+        self.start = start
+        self.page_id = page_id
+
+    def unpack(self):
+        """Return a fresh, mutable copy of the page dict"""
+        return self._store.load(self.key)
+
+    def release(self):
+        """Free the stored data once the page has been unpacked for good"""
+        self._store.discard(self.key)
+
+    @property
+    def store(self):
+        """The PageStore (or other store with load and discard) holding the data"""
+        return self._store
+
+    def __getitem__(self, name):
+        if name in ("background", "id"):
+            value = self.background if name == "background" else self.page_id
+            if value is None:
+                raise KeyError(name)
+            return value
+        return self._read()[name]
+
+    def __iter__(self):
+        return iter(self._read())
+
+    def __len__(self):
+        return len(self._read())
+
+    def _read(self):
+        """The page for a single lookup (PageStore keeps the last page read
+        decompressed, so reading several keys of one page in a row is cheap)"""
+        return self.unpack()
+
+    def __repr__(self):
+        return f"<PackedPage {self.key}: {self.object_count} objects>"
+
+
+class PageStore:
+    """
+    Compact storage for pages that are not on screen.
+
+    Pages are serialized to compact JSON and zlib-compressed. Once the
+    compressed blobs held in memory exceed memory_budget bytes, the least
+    recently packed ones are spilled to an anonymous temp file and read
+    back from there when needed. The space of discarded pages in the spill
+    file is reused for later spills. load() may be called from worker threads.
+    """
+
+    def __init__(self, memory_budget=64 * 1024 * 1024, compress_level=1):
+        self.memory_budget = memory_budget
+        self.compress_level = compress_level
+        self._blobs = OrderedDict()     # key -> compressed bytes held in memory
+        self._spilled = {}              # key -> (offset, length) in the spill file
+        self._spill_file = None
+        self._free = []                 # (offset, length) of unused extents in the spill file, by offset
+        self._recent = None             # (key, text) of the last page loaded
+        self._memory_used = 0
+        self._next_key = 0
+        self._lock = threading.Lock()   # Guards the spill file and moves between _blobs and _spilled
+
+    @property
+    def memory_used(self):
+        return self._memory_used
+
+    def pack(self, page):
+        """Compress a page dict and return a PackedPage that refers to it"""
+        data = json.dumps(page, separators=(",", ":"), default=list).encode("utf-8")
+        blob = zlib.compress(data, self.compress_level)
+        items = page.get("objects") or page.get("elements") or []
+        return self.add_blob(blob, len(items), content_digest(items), page.get("background"),
+                             page_start(items), page.get("id"))
+
+    def add_blob(self, blob, object_count, digest, background=None, start=None, page_id=None):
+        """Store a page compressed elsewhere (e.g. by a worker process) the way pack() does"""
+        key = self._next_key
+        self._next_key += 1
+        with self._lock:
+            self._blobs[key] = blob
+            self._memory_used += len(blob)
+        self._enforce_budget()
+        return PackedPage(self, key, object_count, digest, background, start, page_id)
+
+    def load(self, key):
+        """Decompress and return a fresh copy of the page stored under key"""
+        with self._lock:
+            recent = self._recent
+            if recent is not None and recent[0] == key:
+                return json.loads(recent[1])
+            blob = self._blobs.get(key)
+            if blob is None:
+                if key not in self._spilled:
+                    raise KeyError(f"Page {key} is not in the page store")
+                offset, length = self._spilled[key]
+                self._spill_file.seek(offset)
+                blob = self._spill_file.read(length)
+        text = zlib.decompress(blob).decode("utf-8")
+        with self._lock:
+            # The page may have been discarded while it was decompressed
+            if key in self._blobs or key in self._spilled:
+                self._recent = (key, text)
+        return json.loads(text)
+
+    def discard(self, key):
+        """Forget a stored page and free its spill file space for reuse"""
+        with self._lock:
+            if self._recent is not None and self._recent[0] == key:
+                self._recent = None
+            blob = self._blobs.pop(key, None)
+            if blob is not None:
+                self._memory_used -= len(blob)
+            extent = self._spilled.pop(key, None)
+            if extent is not None:
+                self._free_extent(*extent)
+
+    def close(self):
+        """Drop everything and delete the spill file"""
+        with self._lock:
+            self._blobs.clear()
+            self._spilled.clear()
+            self._free.clear()
+            self._recent = None
+            self._memory_used = 0
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+
+    def _enforce_budget(self):
+        if self.memory_budget is None:
+            return
+        while self._memory_used > self.memory_budget and self._blobs:
+            # A page is in one of the two at every moment a worker's load() can see
+            with self._lock:
+                key, blob = self._blobs.popitem(last=False)
+                self._memory_used -= len(blob)
+                if self._spill_file is None:
+                    self._spill_file = tempfile.TemporaryFile(prefix="whiteboard_pages_")
+                offset = self._take_extent(len(blob))
+                self._spill_file.seek(offset)
+                self._spill_file.write(blob)
+                self._spilled[key] = (offset, len(blob))
+            print(f"Spilled inactive page blob {key} ({len(blob)} bytes) to disk")
+
+    def _take_extent(self, length):
+        """Offset to write length bytes at: the smallest free extent that fits, or the end of the file"""
+        fits = [index for index, extent in enumerate(self._free) if extent[1] >= length]
+        if not fits:
+            self._spill_file.seek(0, 2)
+            return self._spill_file.tell()
+        index = min(fits, key=lambda index: self._free[index][1])
+        offset, free = self._free[index]
+        if free == length:
+            del self._free[index]
+        else:
+            self._free[index] = (offset + length, free - length)
+        return offset
+
+    def _free_extent(self, offset, length):
+        """Mark a spill file extent unused, merging it with free neighbours"""
+        index = bisect.bisect(self._free, (offset, length))
+        if index < len(self._free) and offset + length == self._free[index][0]:
+            length += self._free.pop(index)[1]
+        if index and self._free[index - 1][0] + self._free[index - 1][1] == offset:
+            index -= 1
+            offset, length = self._free[index][0], self._free.pop(index)[1] + length
+        if offset + length == self._spill_file.seek(0, 2):
+            # The end of the file is unused, so shrink it instead
+            self._spill_file.truncate(offset)
+            return
+        self._free.insert(index, (offset, length))
@@ -0,0 +1,195 @@
+"""
+Export a board's replay as a video or an animation, without a display.
+
+Frames are drawn with Pillow: each frame only composites the elements
+that became due since the previous one onto that page's image, and idle
+stretches longer than max_idle_ms are shortened. MP4 is encoded by a
+local ffmpeg binary fed raw frames through a pipe; GIF and WebP are
+written by Pillow, with unchanged frames merged into longer ones.
+
+The app runs export_session() in a worker thread, which loads the pages
+as the replay reaches them rather than holding the whole session. It can
+also be run from the command line:
+    python -m modules.replay_export board.wb replay.mp4 --fps 15 --speed 4
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+
+from PIL import Image, ImageDraw
+
+from modules.thumbnail_renderer import to_items, content_bounds, fit_transform, draw_items
+from modules.timeline import UNTIMED, iter_session, page_start
+
+DEFAULT_SIZE = (1280, 960)
+DEFAULT_FPS = 15
+MAX_IDLE_MS = 2000
+FORMATS = (".mp4", ".gif", ".webp")
+
+
+def replay_frames(entries, size=DEFAULT_SIZE, fps=DEFAULT_FPS, speed=1.0,
+                  max_idle_ms=MAX_IDLE_MS, bounds=None):
+    """
+    Yield (frame, changed) for every output frame of a replay.
+
+    entries are (time, page, element) tuples in recording order (see
+    modules.timeline). The same Image object is yielded again while
+    nothing changes, so callers that keep frames must copy them. Without
+    bounds, entries are read in full first to find them.
+    """
+    if bounds is None:
+        entries = list(entries)
+        bounds = content_bounds(to_items(element for _, _, element in entries))
+    transform = fit_transform(bounds, size)
+    step_ms = 1000.0 * speed / fps      # Recording time covered by one frame
+
+    pages = {}                          # page -> its image so far
+    colors = {}
+    frame = None
+    frame_end = step_ms
+    idle_shift = 0                      # Recording time cut from long pauses
+    last_time = None
+    changed = True
+
+    for stamp, page, element in entries:
+        if stamp == UNTIMED:
+            stamp = 0
+        if last_time is not None and stamp - last_time > max_idle_ms:
+            idle_shift += stamp - last_time - max_idle_ms
+        last_time = max(stamp, last_time or 0)
+        due = stamp - idle_shift
+
+        # Emit the frames that end before this element appears
+        while frame is not None and due > frame_end:
+            yield frame, changed
+            changed = False
+            frame_end += step_ms
+
+        if page not in pages:
+            pages[page] = Image.new("RGB", size, "white")
+        if pages[page] is not frame:
+            frame = pages[page]
+            changed = True
+        draw_items(ImageDraw.Draw(frame), to_items([element]), transform, colors)
+        changed = True
+
+    if frame is not None:
+        yield frame, changed
+
+
+def encode_mp4(frames, path, size, fps, ffmpeg):
+    """Pipe raw RGB frames into ffmpeg; returns the number of frames written"""
+    width, height = size
+    command = [
+        ffmpeg, "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}", "-r", str(fps),
+        "-i", "-",
+        "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", path
+    ]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    count = 0
+    data = None
+    try:
+        for frame, changed in frames:
+            if changed or data is None:
+                data = frame.tobytes()
+            process.stdin.write(data)
+            count += 1
+    finally:
+        process.stdin.close()
+        if process.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with status {process.returncode}")
+    return count
+
+
+def encode_animation(frames, path, fps):
+    """Write an animated GIF or WebP with Pillow; returns the number of frames written"""
+    frame_ms = 1000.0 / fps
+    is_gif = path.lower().endswith(".gif")
+    images = []
+    durations = []
+    for frame, changed in frames:
+        if changed or not images:
+            # GIF frames are palettized right away, which keeps memory use down
+            images.append(frame.convert("P", palette=Image.ADAPTIVE) if is_gif else frame.copy())
+            durations.append(frame_ms)
+        else:
+            durations[-1] += frame_ms
+    if not images:
+        raise ValueError("Nothing to export")
+    images[0].save(path, save_all=True, append_images=images[1:],
+                   duration=[round(d) for d in durations], loop=0)
+    return len(images)
+
+
+def export_replay(entries, path, size=DEFAULT_SIZE, fps=DEFAULT_FPS, speed=1.0,
+                  max_idle_ms=MAX_IDLE_MS, bounds=None):
+    """Render a replay to path (.mp4, .gif or .webp); returns the number of frames written"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported export format: {extension or path}")
+    # yuv420p needs even dimensions
+    size = (size[0] - size[0] % 2, size[1] - size[1] % 2)
+    frames = replay_frames(entries, size, fps, speed, max_idle_ms, bounds)
+
+    if extension == ".mp4":
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("ffmpeg was not found; export as .gif or .webp instead")
+        count = encode_mp4(frames, path, size, fps, ffmpeg)
+    else:
+        count = encode_animation(frames, path, fps)
+    print(f"Exported {count} frames to {path}")
+    return count
+
+
+def session_bounds(page_sources):
+    """Bounds of the elements of every page of iter_session() sources, loading one page at a time"""
+    x0, y0, x1, y1 = content_bounds(())
+    for _, start, load in page_sources:
+        if start is not None:
+            left, top, right, bottom = content_bounds(to_items(load()))
+            x0, y0, x1, y1 = min(x0, left), min(y0, top), max(x1, right), max(y1, bottom)
+    return x0, y0, x1, y1
+
+
+def export_session(page_sources, path, **options):
+    """
+    export_replay() for the pages of iter_session() sources (a list, as it
+    is read twice). The bounds are found first, a page at a time, so the
+    session is streamed to the encoder instead of being held in memory.
+    """
+    return export_replay(iter_session(page_sources), path, bounds=session_bounds(page_sources), **options)
+
+
+def board_sources(pages):
+    """iter_session() sources for a board's page dicts"""
+    sources = []
+    for index, page in enumerate(pages):
+        elements = page.get("objects") or page.get("elements") or []
+        sources.append((index, page_start(elements), lambda elements=elements: elements))
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export a whiteboard replay as MP4, GIF or WebP")
+    parser.add_argument("board", help="Saved .wb file")
+    parser.add_argument("output", help="Output file (.mp4, .gif or .webp)")
+    parser.add_argument("--fps", type=int, default=DEFAULT_FPS)
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed multiplier")
+    parser.add_argument("--size", default=f"{DEFAULT_SIZE[0]}x{DEFAULT_SIZE[1]}", help="WIDTHxHEIGHT")
+    parser.add_argument("--max-idle", type=int, default=MAX_IDLE_MS, help="Longest pause kept, in ms")
+    args = parser.parse_args()
+
+    with open(args.board, "r") as f:
+        data = json.load(f)
+    width, _, height = args.size.partition("x")
+    export_session(board_sources(data.get("pages", [])), args.output,
+                   size=(int(width), int(height)), fps=args.fps, speed=args.speed,
+                   max_idle_ms=args.max_idle)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+import bisect
+import time
+import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk
+
+from modules.batch_renderer import BatchRenderer
+from modules.page_store import PackedPage
+from modules.replay_export import export_session, FORMATS
+from modules.timeline import element_time, iter_page, iter_session, page_start
+
+
+class ReplayManager:
+    """
+    Plays back how a page, or the whole board, was drawn.
+
+    Entries come from a (time, page, element) stream in recording order
+    and are only pulled from it as the playhead reaches them; a packed
+    page is only unpacked when the stream reaches its first stroke (its
+    start time is stored with it, see PackedPage). Each tick
+    draws just the entries that became due, in one batched call, so the
+    page is never redrawn while playing forward. Seeking backwards (or
+    onto another page) redraws the shown page once from the entries
+    already read.
+    """
+
+    TICK_MS = 30
+    SPEEDS = ("0.5x", "1x", "2x", "4x", "8x", "16x")
+    EXPORT_POLL_MS = 250
+
+    def __init__(self, app):
+        self.app = app
+        self.window = None
+        self.canvas = None
+        self.renderer = None
+        self._stream = None
+        self._played = []           # (time, page, element) read from the stream so far
+        self._times = []            # Times of _played, for seeking
+        self._cursor = 0            # Entries of _played that are on screen (or on other pages)
+        self._shown_page = None
+        self._duration_ms = 0
+        self._position_ms = 0
+        self._speed = 1.0
+        self._playing = False
+        self._last_tick = None
+        self._job = None
+        self._updating_scale = False
+        self.play_button = self.scale = self.time_label = self.page_label = None
+        self._export = None         # (future, executor, path) of a running export
+
+    def replay_page(self):
+        """Replay the current page"""
+        index = self.app.page_manager.current_page_index
+        elements = self._page_elements(index)
+        self.start(iter_page(elements, index), self._last_time(elements), f"Page {index + 1}")
+
+    def replay_board(self):
+        """Replay every page in recording order"""
+        page_count = len(self.app.page_manager.pages)
+        sources = [self._page_source(index) for index in range(page_count)]
+        self.start(iter_session(sources), self.app.canvas_manager.timeline.now(), "Whole Board")
+
+    def export_video(self):
+        """Render the whole board's replay to a video or animation in a worker thread"""
+        from tkinter import filedialog, messagebox
+        if self._export is not None:
+            messagebox.showinfo("Export Replay", "A replay export is already running")
+            return
+        path = filedialog.asksaveasfilename(
+            defaultextension=".mp4",
+            filetypes=[("MP4 video (needs ffmpeg)", "*.mp4"), ("Animated GIF", "*.gif"),
+                       ("Animated WebP", "*.webp")]
+        )
+        if not path:
+            return
+        if not path.lower().endswith(FORMATS):
+            messagebox.showerror("Export Replay", "Choose a .mp4, .gif or .webp file")
+            return
+
+        page_count = len(self.app.page_manager.pages)
+        # The worker streams the session, unpacking each page when the replay reaches it;
+        # a worker process would need the whole session copied to it up front
+        sources = [self._page_source(index) for index in range(page_count)]
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(export_session, sources, path)
+        self._export = (future, executor, path)
+        print(f"Exporting replay of {page_count} pages to {path}")
+        self.app.root.after(self.EXPORT_POLL_MS, self._check_export)
+
+    def _check_export(self):
+        future, executor, path = self._export
+        if not future.done():
+            self.app.root.after(self.EXPORT_POLL_MS, self._check_export)
+            return
+        self._export = None
+        executor.shutdown(wait=False)
+        from tkinter import messagebox
+        try:
+            frames = future.result()
+            messagebox.showinfo("Export Replay", f"Replay saved to {path} ({frames} frames)")
+        except Exception as e:
+            print(f"Error exporting replay: {e}")
+            messagebox.showerror("Export Replay", f"Could not export replay: {e}")
+
+    def start(self, stream, duration_ms, title):
+        """Open the replay window for a stream of (time, page, element) entries"""
+        self.stop()
+        self._stream = iter(stream)
+        self._duration_ms = max(0, duration_ms)
+        self._create_window(title)
+        self.seek(0)
+        self.play()
+
+    def stop(self):
+        if self._job is not None:
+            self.app.root.after_cancel(self._job)
+            self._job = None
+        if self.window is not None:
+            self.window.destroy()
+        self.window = self.canvas = self.renderer = None
+        self.play_button = self.scale = self.time_label = self.page_label = None
+        self._stream = None
+        self._played, self._times = [], []
+        self._cursor = 0
+        self._shown_page = None
+        self._position_ms = 0
+        self._playing = False
+
+    def play(self):
+        if self._position_ms >= self._duration_ms:
+            self.seek(0)
+        self._playing = True
+        self._last_tick = time.monotonic()
+        self.play_button.config(text="Pause")
+        if self._job is None:
+            self._job = self.app.root.after(self.TICK_MS, self._tick)
+
+    def pause(self):
+        self._playing = False
+        if self.play_button is not None:
+            self.play_button.config(text="Play")
+
+    def toggle_play(self):
+        if self._playing:
+            self.pause()
+        else:
+            self.play()
+
+    def seek(self, position_ms):
+        """Move the playhead; forward seeks draw incrementally, backward ones redraw the page"""
+        position_ms = max(0, min(float(position_ms), self._duration_ms))
+        if position_ms < self._position_ms or self._shown_page is None:
+            self._cursor = bisect.bisect_right(self._times, position_ms)
+            page = self._played[self._cursor - 1][1] if self._cursor else None
+            self._show_page(page)
+        self._position_ms = position_ms
+        self._advance_to(position_ms)
+        self._update_controls()
+
+    # Stream
+
+    def _page_elements(self, index):
+        """Entries of one page; the page on screen is read from the canvas"""
+        page_manager = self.app.page_manager
+        if index == page_manager.current_page_index:
+            canvas_manager = self.app.canvas_manager
+            if canvas_manager.is_rendering():
+                canvas_manager.renderer.finish()
+            return canvas_manager.get_canvas_objects()
+        page = page_manager.pages[index]
+        if isinstance(page, PackedPage):
+            page = page.unpack()
+        return page.get("objects") or page.get("elements") or []
+
+    def _page_source(self, index):
+        """
+        (index, start, load) of a page for iter_session. The page on screen
+        is read now; a packed page keeps its start, so it is only unpacked
+        when load() is called, which may be on the export thread.
+        """
+        page_manager = self.app.page_manager
+        if index == page_manager.current_page_index:
+            elements = self._page_elements(index)
+            return index, page_start(elements), lambda: elements
+        page = page_manager.pages[index]
+        if not isinstance(page, PackedPage):
+            elements = page.get("objects") or page.get("elements") or []
+            return index, page_start(elements), lambda: elements
+        if page.start is None and page.object_count:
+            # Packed by a version that did not keep start times
+            page.start = page_start(self._unpacked_elements(page, index))
+        return index, page.start, lambda: self._unpacked_elements(page, index)
+
+    def _unpacked_elements(self, page, index):
+        try:
+            unpacked = page.unpack()
+        except KeyError:
+            # The page has been shown since, which unpacked it for good
+            unpacked = self.app.page_manager.pages[index]
+        return unpacked.get("objects") or unpacked.get("elements") or []
+
+    def _last_time(self, elements):
+        return max((element_time(element) for element in elements), default=0)
+
+    def _next_entry(self):
+        """The first entry not yet drawn, reading more of the stream if needed"""
+        if self._cursor < len(self._played):
+            return self._played[self._cursor]
+        if self._stream is None:
+            return None
+        try:
+            entry = next(self._stream)
+        except StopIteration:
+            self._stream = None
+            return None
+        self._played.append(entry)
+        self._times.append(entry[0])
+        return entry
+
+    # Drawing
+
+    def _advance_to(self, position_ms):
+        """Draw every entry due by position_ms in one batch"""
+        batch = []
+        while True:
+            entry = self._next_entry()
+            if entry is None or entry[0] > position_ms:
+                break
+            self._cursor += 1
+            stamp, page, element = entry
+            if page != self._shown_page:
+                self._draw(batch)
+                batch = []
+                self._show_page(page)
+            else:
+                batch.append(element)
+        self._draw(batch)
+
+    def _show_page(self, page):
+        """Clear the replay canvas and draw what was on a page at the cursor"""
+        self.canvas.delete("all")
+        self._shown_page = page
+        self._draw([element for _, entry_page, element in self._played[:self._cursor]
+                    if entry_page == page])
+        if self.page_label is not None:
+            self.page_label.config(text=f"Page {page + 1}" if page is not None else "")
+
+    def _draw(self, elements):
+        if elements:
+            self.renderer.render(elements)
+
+    def _tick(self):
+        self._job = None
+        if self.window is None:
+            return
+        if self._playing:
+            now = time.monotonic()
+            position = self._position_ms + (now - self._last_tick) * 1000 * self._speed
+            self._last_tick = now
+            if position >= self._duration_ms:
+                position = self._duration_ms
+                self.pause()
+            self._position_ms = position
+            self._advance_to(position)
+            self._update_controls()
+        self._job = self.app.root.after(self.TICK_MS, self._tick)
+
+    # Window
+
+    def _create_window(self, title):
+        self.window = tk.Toplevel(self.app.root)
+        self.window.title(f"Replay - {title}")
+        self.window.geometry("900x700")
+        self.window.protocol("WM_DELETE_WINDOW", self.stop)
+
+        controls = ttk.Frame(self.window)
+        controls.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=5)
+
+        self.play_button = ttk.Button(controls, text="Pause", width=6, command=self.toggle_play)
+        self.play_button.pack(side=tk.LEFT, padx=2)
+
+        speed = ttk.Combobox(controls, values=self.SPEEDS, width=5, state="readonly")
+        speed.set(f"{self._speed:g}x")
+        speed.bind("<<ComboboxSelected>>", lambda e: self._set_speed(speed.get()))
+        speed.pack(side=tk.LEFT, padx=2)
+
+        self.scale = ttk.Scale(controls, from_=0, to=max(1, self._duration_ms),
+                               orient=tk.HORIZONTAL, command=self._on_scale)
+        self.scale.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+
+        self.time_label = ttk.Label(controls, width=14)
+        self.time_label.pack(side=tk.LEFT, padx=2)
+        self.page_label = ttk.Label(controls, width=9)
+        self.page_label.pack(side=tk.LEFT, padx=2)
+
+        self.canvas = tk.Canvas(self.window, bg="white", scrollregion=(0, 0, 1600, 1200))
+        self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.renderer = BatchRenderer(self.canvas)
+
+    def _set_speed(self, text):
+        try:
+            self._speed = float(text.rstrip("x"))
+        except ValueError:
+            self._speed = 1.0
+
+    def _on_scale(self, value):
+        if not self._updating_scale:
+            self.seek(value)
+
+    def _update_controls(self):
+        if self.window is None:
+            return
+        self._updating_scale = True
+        try:
+            self.scale.set(self._position_ms)
+        finally:
+            self._updating_scale = False
+        self.time_label.config(text=f"{self._format(self._position_ms)} / {self._format(self._duration_ms)}")
+
+    def _format(self, ms):
+        seconds = int(ms // 1000)
+        return f"{seconds // 60}:{seconds % 60:02d}"
@@ -0,0 +1,164 @@
+from modules.page_store import PackedPage, content_digest
+from modules.text_index import TextIndex, match_entries, text_entries, tokenize
+
+
+class SearchManager:
+    """
+    Finds text across every page of the board.
+
+    Inactive pages are looked up in a TextIndex keyed by content digest:
+    a page is indexed when it is packed (i.e. when it stops being the page
+    on screen), which is the only time its content can have changed, and
+    the index is saved with the board. The page on screen is read straight
+    from the canvas, so searching never unpacks or renders other pages
+    unless they were never indexed.
+    """
+
+    HIGHLIGHT_TAG = "search_highlight"
+    HIGHLIGHT_MS = 1500
+    HIGHLIGHT_RETRY_MS = 50
+    HIGHLIGHT_RETRIES = 20
+
+    def __init__(self, app):
+        self.app = app
+        self.index = TextIndex()
+        self._query = None
+        self._last = None               # Match shown last, where find_next continues from
+        self._highlight = None
+        self._highlight_job = None
+
+    def index_page(self, page, digest=None):
+        """Index a page dict's text (a no-op when its content was indexed before)"""
+        items = page.get("objects") or page.get("elements") or []
+        self.index.add_page(digest or content_digest(items), items)
+
+    def search(self, query):
+        """Return (page index, text, x, y) of every text element matching query, in page order"""
+        if not tokenize(query):
+            return []
+        page_manager = self.app.page_manager
+        digests = {}
+        for index, page in enumerate(page_manager.pages):
+            if index == page_manager.current_page_index:
+                continue
+            if isinstance(page, PackedPage) and page.digest:
+                digest = page.digest
+                if digest not in self.index:
+                    self.index_page(page.unpack(), digest)
+            else:
+                items = page.get("objects") or page.get("elements") or []
+                digest = content_digest(items)
+                self.index.add_page(digest, items)
+            digests[index] = digest
+
+        results = []
+        hits = self.index.search(query)
+        words = tokenize(query)
+        for index in range(len(page_manager.pages)):
+            if index == page_manager.current_page_index:
+                if self.app.canvas_manager.is_rendering():
+                    # Only part of the page is on the canvas yet
+                    entries = text_entries(page_manager.pages[index].get("objects")
+                                           or page_manager.pages[index].get("elements"))
+                else:
+                    entries = self._canvas_entries()
+                matches = match_entries(entries, words[:-1], words[-1])
+            else:
+                entries = self.index.pages[digests[index]]
+                matches = hits.get(digests[index], [])
+            page_results = [(index,) + tuple(entries[i]) for i in matches]
+            results.extend(sorted(page_results, key=self._order))
+        return results
+
+    def find_next(self, query, backwards=False):
+        """Jump to the next (or previous) match of query; returns (position, count)"""
+        query = query.strip()
+        results = self.search(query)
+        if query != self._query or self._last is None:
+            # A new query starts from the page on screen rather than the first page
+            anchor = (self.app.page_manager.current_page_index, float("-inf"), float("-inf"))
+        else:
+            anchor = self._order(self._last)
+        self._query = query
+        if not results:
+            self._last = None
+            return 0, 0
+        keys = [self._order(result) for result in results]
+        if backwards:
+            before = [i for i, key in enumerate(keys) if key < anchor]
+            position = before[-1] if before else len(results) - 1
+        else:
+            after = [i for i, key in enumerate(keys) if key > anchor]
+            position = after[0] if after else 0
+        self._last = results[position]
+        self.show_result(self._last)
+        return position + 1, len(results)
+
+    @staticmethod
+    def _order(result):
+        """Sort key of a match: page, then top to bottom, then left to right"""
+        return result[0], result[3], result[2]
+
+    def reset(self):
+        """Forget the last match, e.g. after another board was opened"""
+        self._query = None
+        self._last = None
+
+    def show_result(self, result):
+        """Go to a match's page, scroll it into view and flash a highlight around it"""
+        index, text, x, y = result
+        canvas_manager = self.app.canvas_manager
+        # Scroll first, so a page being switched to renders the match's region first
+        canvas_manager.scroll_to(x, y)
+        if index != self.app.page_manager.current_page_index:
+            self.app.page_manager.go_to_page(index)
+        self._schedule_highlight(x, y, self.HIGHLIGHT_RETRIES)
+
+    def _canvas_entries(self):
+        """(text, x, y) of the text items on the page on screen, read in one Tcl call"""
+        canvas_manager = self.app.canvas_manager
+        canvas = canvas_manager.canvas
+        ids = " ".join(str(item) for item in canvas_manager.document_items())
+        result = canvas.tk.eval(
+            "set ::wb_texts {}\n"
+            f"foreach id {{{ids}}} {{if {{[{canvas._w} type $id] eq \"text\"}} {{"
+            f"lappend ::wb_texts [{canvas._w} itemcget $id -text] [{canvas._w} coords $id]}}}}\n"
+            "set ::wb_texts"
+        )
+        values = canvas.tk.splitlist(result)
+        entries = []
+        for i in range(0, len(values), 2):
+            coords = canvas.tk.splitlist(values[i + 1])
+            if values[i] and len(coords) >= 2:
+                entries.append((values[i], float(coords[0]), float(coords[1])))
+        return entries
+
+    def _schedule_highlight(self, x, y, retries):
+        if self._highlight_job is not None:
+            self.app.root.after_cancel(self._highlight_job)
+        self._highlight_job = self.app.root.after(self.HIGHLIGHT_RETRY_MS,
+                                                  lambda: self._draw_highlight(x, y, retries))
+
+    def _draw_highlight(self, x, y, retries):
+        """Outline the text item at (x, y), waiting for the page to render it if needed"""
+        self._highlight_job = None
+        canvas_manager = self.app.canvas_manager
+        canvas = canvas_manager.canvas
+        self._clear_highlight()
+        items = [item for item in canvas.find_overlapping(x - 1, y - 1, x + 1, y + 1)
+                 if canvas.type(item) == "text" and item not in canvas_manager.overlay_ids]
+        if not items:
+            if retries > 0 and canvas_manager.is_rendering():
+                self._schedule_highlight(x, y, retries - 1)
+            return
+        x1, y1, x2, y2 = canvas.bbox(items[-1])
+        self._highlight = canvas.create_rectangle(x1 - 3, y1 - 3, x2 + 3, y2 + 3, outline="#f5a623",
+                                                  width=2, tags=(self.HIGHLIGHT_TAG,))
+        canvas_manager.overlay_ids.add(self._highlight)
+        self._highlight_job = self.app.root.after(self.HIGHLIGHT_MS, self._clear_highlight)
+
+    def _clear_highlight(self):
+        if self._highlight is not None:
+            self.app.canvas_manager.canvas.delete(self._highlight)
+            self.app.canvas_manager.overlay_ids.discard(self._highlight)
+            self._highlight = None
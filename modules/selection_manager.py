@@ -0,0 +1,360 @@
+import itertools
+import math
+
+from modules.layer_manager import layer_from_tags
+from modules.spatial_index import SpatialIndex
+
+
+def rotate_points(flat, cx, cy, angle):
+    """Rotate a flat [x0, y0, x1, y1, ...] list around (cx, cy) in one pass"""
+    cos, sin = math.cos(angle), math.sin(angle)
+    xs, ys = flat[0::2], flat[1::2]
+    result = [0.0] * len(flat)
+    result[0::2] = [cx + (x - cx) * cos - (y - cy) * sin for x, y in zip(xs, ys)]
+    result[1::2] = [cy + (x - cx) * sin + (y - cy) * cos for x, y in zip(xs, ys)]
+    return result
+
+
+def inverse_transform(transform):
+    """The transform that undoes a recorded ("move"|"scale"|"rotate", ...) transform"""
+    kind = transform[0]
+    if kind == "move":
+        return ("move", -transform[1], -transform[2])
+    if kind == "scale":
+        return ("scale", transform[1], transform[2], 1 / transform[3])
+    return ("rotate", transform[1], transform[2], -transform[3])
+
+
+def point_in_polygon(x, y, polygon):
+    """Ray casting test against a flat [x0, y0, x1, y1, ...] polygon"""
+    inside = False
+    count = len(polygon) // 2
+    j = count - 1
+    for i in range(count):
+        xi, yi = polygon[2 * i], polygon[2 * i + 1]
+        xj, yj = polygon[2 * j], polygon[2 * j + 1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+class SelectionManager:
+    """
+    Rectangle and lasso selection, and moving, scaling and rotating the selection.
+
+    Candidates come from a SpatialIndex of item bounding boxes. Local
+    drawing keeps the index up to date; anything else that redraws the
+    canvas bumps CanvasManager.content_version and the index is rebuilt
+    with one Tcl call at the next selection. Selected items share a group
+    tag, so moving and scaling is a single canvas call whatever the size
+    of the selection. Rotation rewrites all coordinates in one script. Each
+    gesture is one undo action holding the transform, not the items'
+    coordinates.
+    """
+
+    UI_TAG = "selection_ui"
+    HANDLE_SIZE = 5
+    ROTATE_HANDLE_OFFSET = 24
+    MIN_SCALE = 0.05
+
+    def __init__(self, app):
+        self.app = app
+        self.index = SpatialIndex()
+        self._index_version = None
+        self.group_tag = None
+        self.selected = ()
+        self._group_counter = itertools.count(1)
+        self._mode = None
+        self._start = None
+        self._last = None
+        self._anchor = None
+        self._scale_total = 1.0
+        self._rotate_origin = None
+        self._ui_items = []
+        self._path = []
+        app.canvas_manager.add_listener(self._on_canvas_event)
+
+    @property
+    def canvas(self):
+        return self.app.canvas_manager.canvas
+
+    # Spatial index
+
+    def _on_canvas_event(self, event, data):
+        if self._index_version is None:
+            return
+        if event in ("stroke_segment", "shape", "text"):
+            bbox = self.canvas.bbox(data["item"])
+            if bbox:
+                self.index.insert(data["item"], bbox)
+        elif event == "paste":
+            for item in data["items"]:
+                bbox = self.canvas.bbox(item)
+                if bbox:
+                    self.index.insert(item, bbox)
+        elif event == "erase":
+            self.index.remove(data["item"])
+        elif event == "clear":
+            self._index_version = None
+
+    def _ensure_index(self):
+        canvas_manager = self.app.canvas_manager
+        if self._index_version == canvas_manager.content_version:
+            return
+        self.index.clear()
+        page_items = set(canvas_manager.document_items())
+        # One round trip for every item's box and tags; hidden items have no box
+        result = self.canvas.tk.eval(
+            "set ::wb_boxes {}\n"
+            f"foreach id [{self.canvas._w} find all] {{"
+            f"lappend ::wb_boxes $id [{self.canvas._w} bbox $id] [{self.canvas._w} gettags $id]}}\n"
+            "set ::wb_boxes"
+        )
+        values = self.canvas.tk.splitlist(result)
+        for i in range(0, len(values) - 2, 3):
+            item = int(values[i])
+            box = self.canvas.tk.splitlist(values[i + 1])
+            if item not in page_items or len(box) != 4:
+                continue
+            if self.app.layer_manager.is_locked(layer_from_tags(self.canvas.tk.splitlist(values[i + 2]))):
+                continue
+            self.index.insert(item, tuple(int(v) for v in box))
+        self._index_version = canvas_manager.content_version
+        print(f"Indexed {len(self.index)} items for selection")
+
+    # Gestures (called by CanvasManager for the select and lasso tools)
+
+    def press(self, x, y):
+        self._start = self._last = (x, y)
+        handle = self._handle_at(x, y)
+        if handle:
+            self._begin_transform(handle)
+        elif self.selected and self._inside_selection(x, y):
+            self._mode = "move"
+        else:
+            self.clear()
+            self._mode = "pick"
+            self._path = [x, y]
+
+    def drag(self, x, y):
+        if self._mode == "pick":
+            self._path.extend((x, y))
+            self.canvas.delete("selection_band")
+            if self.app.current_tool == "lasso":
+                if len(self._path) >= 4:
+                    self._overlay(self.canvas.create_line(*self._path, dash=(4, 2), fill="#1E90FF",
+                                                          tags=("selection_band",)))
+            else:
+                self._overlay(self.canvas.create_rectangle(*self._start, x, y, dash=(4, 2), outline="#1E90FF",
+                                                           tags=("selection_band",)))
+        elif self._mode == "move":
+            dx, dy = x - self._last[0], y - self._last[1]
+            self.canvas.move(self.group_tag, dx, dy)
+            self.canvas.move(self.UI_TAG, dx, dy)
+        elif self._mode == "scale":
+            ax, ay = self._anchor
+            factor = max(self.MIN_SCALE, math.hypot(x - ax, y - ay) / self._scale_base)
+            step = factor / self._scale_total
+            self.canvas.scale(self.group_tag, ax, ay, step, step)
+            self._scale_total = factor
+            self._draw_ui()
+        elif self._mode == "rotate":
+            cx, cy = self._anchor
+            angle = math.atan2(y - cy, x - cx) - math.atan2(self._start[1] - cy, self._start[0] - cx)
+            self._write_rotation(self._rotate_origin, cx, cy, angle)
+            self._rotation = angle
+            self._draw_ui()
+        self._last = (x, y)
+
+    def release(self, x, y):
+        mode, self._mode = self._mode, None
+        if mode == "pick":
+            self.canvas.delete("selection_band")
+            self._select_path(self._path if self.app.current_tool == "lasso"
+                              else [self._start[0], self._start[1], x, self._start[1],
+                                    x, y, self._start[0], y])
+        elif mode == "move":
+            dx, dy = x - self._start[0], y - self._start[1]
+            if dx or dy:
+                self._record(("move", dx, dy))
+        elif mode == "scale":
+            if self._scale_total != 1.0:
+                self._record(("scale", self._anchor[0], self._anchor[1], self._scale_total))
+        elif mode == "rotate":
+            self._rotate_origin = None
+            if getattr(self, "_rotation", 0):
+                self._record(("rotate", self._anchor[0], self._anchor[1], self._rotation))
+
+    def clear(self):
+        """Drop the selection (the items keep their group tag for undo)"""
+        self.selected = ()
+        self.group_tag = None
+        self._clear_ui()
+
+    # Selecting
+
+    def _select_path(self, polygon):
+        self._ensure_index()
+        xs, ys = polygon[0::2], polygon[1::2]
+        bounds = (min(xs), min(ys), max(xs), max(ys))
+        candidates = self.index.enclosed(bounds)
+        if self.app.current_tool == "lasso" and candidates and len(polygon) >= 6:
+            coords = self._fetch_coords(candidates)
+            candidates = [item for item, (item_type, points) in coords.items()
+                          if all(point_in_polygon(points[i], points[i + 1], polygon)
+                                 for i in range(0, len(points) - 1, 2))]
+        self.select_items(candidates)
+
+    def select_items(self, items):
+        """Make items the selection, tagging them as one group"""
+        self.clear()
+        if not items:
+            return
+        # Keep stacking order so the group behaves like the page
+        self.selected = tuple(sorted(items))
+        self.group_tag = f"group_{next(self._group_counter)}"
+        ids = " ".join(str(item) for item in self.selected)
+        self.canvas.tk.eval(f"foreach id {{{ids}}} {{{self.canvas._w} addtag {self.group_tag} withtag $id}}")
+        self._draw_ui()
+        print(f"Selected {len(self.selected)} items")
+
+    def _fetch_coords(self, items):
+        """Return {item: (type, flat coords)} for many items in one round trip"""
+        ids = " ".join(str(item) for item in items)
+        result = self.canvas.tk.eval(
+            "set ::wb_coords {}\n"
+            f"foreach id {{{ids}}} {{lappend ::wb_coords $id [{self.canvas._w} type $id] "
+            f"[{self.canvas._w} coords $id]}}\n"
+            "set ::wb_coords"
+        )
+        values = self.canvas.tk.splitlist(result)
+        coords = {}
+        for i in range(0, len(values) - 2, 3):
+            coords[int(values[i])] = (values[i + 1], [float(v) for v in self.canvas.tk.splitlist(values[i + 2])])
+        return coords
+
+    # Transforms
+
+    def _begin_transform(self, handle):
+        x0, y0, x1, y1 = self.canvas.bbox(self.group_tag)
+        self._mode = handle
+        if handle == "scale":
+            self._anchor = (x0, y0)
+            self._scale_base = max(1.0, math.hypot(x1 - x0, y1 - y0))
+            self._scale_total = 1.0
+        else:
+            self._anchor = ((x0 + x1) / 2, (y0 + y1) / 2)
+            self._rotation = 0
+            self._rotate_origin = self._fetch_coords(self.canvas.find_withtag(self.group_tag))
+
+    def _write_rotation(self, originals, cx, cy, angle):
+        """Rotate every item from its original coordinates with one array pass and one Tcl script"""
+        flat = []
+        spans = []
+        for item, (item_type, points) in originals.items():
+            if item_type in ("rectangle", "oval"):
+                # Tk boxes stay axis-aligned: only their centre turns around the group
+                points = [(points[0] + points[2]) / 2, (points[1] + points[3]) / 2]
+            spans.append((item, item_type, len(flat), len(points)))
+            flat.extend(points)
+        if not flat:
+            return
+        rotated = rotate_points(flat, cx, cy, angle)
+
+        commands = []
+        for item, item_type, start, length in spans:
+            points = rotated[start:start + length]
+            if item_type in ("rectangle", "oval"):
+                box = originals[item][1]
+                half_w, half_h = (box[2] - box[0]) / 2, (box[3] - box[1]) / 2
+                points = [points[0] - half_w, points[1] - half_h, points[0] + half_w, points[1] + half_h]
+            commands.append(f"{self.canvas._w} coords {item} " + " ".join(f"{v:.2f}" for v in points))
+        self.canvas.tk.eval("\n".join(commands))
+
+    def apply_transform(self, tag, transform, inverse=False):
+        """Apply (or undo) a recorded transform to every item with tag"""
+        kind = transform[0]
+        if kind == "move":
+            _, dx, dy = transform
+            sign = -1 if inverse else 1
+            self.canvas.move(tag, sign * dx, sign * dy)
+        elif kind == "scale":
+            _, ax, ay, factor = transform
+            factor = 1 / factor if inverse else factor
+            self.canvas.scale(tag, ax, ay, factor, factor)
+        elif kind == "rotate":
+            _, cx, cy, angle = transform
+            self._write_rotation(self._fetch_coords(self.canvas.find_withtag(tag)), cx, cy,
+                                 -angle if inverse else angle)
+        self._reindex(tag)
+        if tag == self.group_tag:
+            self._draw_ui()
+        self.app.canvas_manager._notify("transform", tag=tag,
+                                        transform=inverse_transform(transform) if inverse else transform)
+
+    def _record(self, transform):
+        canvas_manager = self.app.canvas_manager
+        canvas_manager.undo_stack.append({
+            "type": "transform",
+            "id": None,
+            "tag": self.group_tag,
+            "transform": transform
+        })
+        canvas_manager.redo_stack.clear()
+        self._reindex(self.group_tag)
+        canvas_manager._notify("transform", tag=self.group_tag, transform=transform)
+
+    def _reindex(self, tag):
+        """Refresh the index entries of transformed items"""
+        if self._index_version is None:
+            return
+        for item in self.canvas.find_withtag(tag):
+            bbox = self.canvas.bbox(item)
+            if bbox:
+                self.index.insert(item, bbox)
+
+    # Selection outline and handles
+
+    def _overlay(self, item):
+        self.app.canvas_manager.overlay_ids.add(item)
+        return item
+
+    def _clear_ui(self):
+        overlay_ids = self.app.canvas_manager.overlay_ids
+        for item in self.canvas.find_withtag(self.UI_TAG) + self.canvas.find_withtag("selection_band"):
+            overlay_ids.discard(item)
+        self.canvas.delete(self.UI_TAG, "selection_band")
+
+    def _draw_ui(self):
+        self._clear_ui()
+        bbox = self.canvas.bbox(self.group_tag) if self.group_tag else None
+        if not bbox:
+            return
+        x0, y0, x1, y1 = bbox
+        size = self.HANDLE_SIZE
+        cx = (x0 + x1) / 2
+        self._overlay(self.canvas.create_rectangle(x0, y0, x1, y1, dash=(4, 2), outline="#1E90FF",
+                                                   tags=(self.UI_TAG,)))
+        self._overlay(self.canvas.create_rectangle(x1 - size, y1 - size, x1 + size, y1 + size,
+                                                   fill="#1E90FF", outline="", tags=(self.UI_TAG, "scale_handle")))
+        top = y0 - self.ROTATE_HANDLE_OFFSET
+        self._overlay(self.canvas.create_line(cx, y0, cx, top, fill="#1E90FF", tags=(self.UI_TAG,)))
+        self._overlay(self.canvas.create_oval(cx - size, top - size, cx + size, top + size,
+                                              fill="white", outline="#1E90FF", tags=(self.UI_TAG, "rotate_handle")))
+
+    def _handle_at(self, x, y):
+        if not self.selected:
+            return None
+        size = self.HANDLE_SIZE + 2
+        for item in self.canvas.find_overlapping(x - size, y - size, x + size, y + size):
+            tags = self.canvas.gettags(item)
+            if "scale_handle" in tags:
+                return "scale"
+            if "rotate_handle" in tags:
+                return "rotate"
+        return None
+
+    def _inside_selection(self, x, y):
+        bbox = self.canvas.bbox(self.group_tag)
+        return bool(bbox) and bbox[0] <= x <= bbox[2] and bbox[1] <= y <= bbox[3]
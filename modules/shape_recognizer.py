@@ -0,0 +1,122 @@
+"""
+Recognize freehand brush strokes as lines, arrows, rectangles and ovals.
+
+A stroke is first resampled to a fixed number of evenly spaced points, so
+every feature below costs the same whatever the stroke's length, and the
+whole classification stays well inside one frame. Features are computed
+over the resampled coordinate arrays in single passes:
+
+- straightness (chord / path length) finds lines;
+- a straight run from the start followed by a short hook around its end
+  finds arrows;
+- for closed strokes, the mean distance to the bounding box edges and the
+  mean radial error against the inscribed ellipse decide between a
+  rectangle and an oval, if either fits well enough.
+"""
+import math
+import time
+
+RESAMPLE_POINTS = 64
+MIN_SIZE = 12               # Strokes smaller than this (px) are left alone, e.g. dots
+LINE_STRAIGHTNESS = 0.94
+CLOSED_GAP = 0.2            # End gap relative to the stroke's larger side
+FIT_TOLERANCE = 0.1         # Mean error relative to the shape's size
+ARROW_HEAD_MAX = 0.6        # Head path length relative to the shaft
+ARROW_HEAD_RADIUS = 0.35    # Head points stay this close to the tip, relative to the shaft
+ARROW_HEAD_MIN = 0.1
+TIME_BUDGET_MS = 8
+
+
+def resample(xs, ys, count=RESAMPLE_POINTS):
+    """Return count points evenly spaced along the polyline (xs, ys)"""
+    steps = [math.hypot(x1 - x0, y1 - y0) for x0, y0, x1, y1 in zip(xs, ys, xs[1:], ys[1:])]
+    length = sum(steps)
+    if length == 0:
+        return [xs[0]] * count, [ys[0]] * count
+    interval = length / (count - 1)
+    out_x, out_y = [xs[0]], [ys[0]]
+    travelled = 0.0
+    target = interval
+    for i, step in enumerate(steps):
+        while step > 0 and travelled + step >= target and len(out_x) < count - 1:
+            t = (target - travelled) / step
+            out_x.append(xs[i] + (xs[i + 1] - xs[i]) * t)
+            out_y.append(ys[i] + (ys[i + 1] - ys[i]) * t)
+            target += interval
+        travelled += step
+    out_x.append(xs[-1])
+    out_y.append(ys[-1])
+    return out_x, out_y
+
+
+def path_length(xs, ys):
+    return sum(math.hypot(x1 - x0, y1 - y0) for x0, y0, x1, y1 in zip(xs, ys, xs[1:], ys[1:]))
+
+
+def recognize(points, budget_ms=TIME_BUDGET_MS):
+    """
+    Classify a stroke given as flat [x0, y0, x1, y1, ...] points.
+
+    Returns (kind, [x1, y1, x2, y2]) with kind "line" or "arrow" (start to
+    tip) or "rectangle" or "oval" (bounding box), or None if the stroke is
+    not a clean shape or could not be classified within budget_ms.
+    """
+    deadline = time.perf_counter() + budget_ms / 1000
+    xs, ys = list(points[0::2]), list(points[1::2])
+    if len(xs) < 3:
+        return None
+    x0, y0, x1, y1 = min(xs), min(ys), max(xs), max(ys)
+    width, height = x1 - x0, y1 - y0
+    if max(width, height) < MIN_SIZE:
+        return None
+
+    xs, ys = resample(xs, ys)
+    length = path_length(xs, ys)
+    chord = math.hypot(xs[-1] - xs[0], ys[-1] - ys[0])
+    if chord / length >= LINE_STRAIGHTNESS:
+        return "line", [xs[0], ys[0], xs[-1], ys[-1]]
+
+    arrow = _arrow(xs, ys)
+    if arrow is not None:
+        return arrow
+    if time.perf_counter() > deadline:
+        return None
+
+    if chord > CLOSED_GAP * max(width, height) or min(width, height) < MIN_SIZE:
+        return None
+    box = [x0, y0, x1, y1]
+    half_w, half_h = width / 2, height / 2
+    cx, cy = x0 + half_w, y0 + half_h
+    # Mean distance to the nearest bounding box edge
+    rect_error = sum(min(x - x0, x1 - x, y - y0, y1 - y) for x, y in zip(xs, ys)) / len(xs) / min(width, height)
+    # Mean radial error against the ellipse inscribed in the bounding box
+    oval_error = sum(abs(math.hypot((x - cx) / half_w, (y - cy) / half_h) - 1) for x, y in zip(xs, ys)) / len(xs)
+    if time.perf_counter() > deadline:
+        return None
+    if rect_error <= oval_error and rect_error < FIT_TOLERANCE:
+        return "rectangle", box
+    if oval_error < rect_error and oval_error < FIT_TOLERANCE:
+        return "oval", box
+    return None
+
+
+def _arrow(xs, ys):
+    """A straight shaft from the start, then a short head drawn around its tip"""
+    # The tip is the end of the longest straight run from the start
+    tip = 0
+    travelled = 0.0
+    for i in range(1, len(xs)):
+        travelled += math.hypot(xs[i] - xs[i - 1], ys[i] - ys[i - 1])
+        if math.hypot(xs[i] - xs[0], ys[i] - ys[0]) >= LINE_STRAIGHTNESS * travelled:
+            tip = i
+    if tip < 2 or tip >= len(xs) - 2:
+        return None
+    shaft = math.hypot(xs[tip] - xs[0], ys[tip] - ys[0])
+    head_x, head_y = xs[tip:], ys[tip:]
+    head = path_length(head_x, head_y)
+    if not ARROW_HEAD_MIN * shaft <= head <= ARROW_HEAD_MAX * shaft:
+        return None
+    reach = max(math.hypot(x - xs[tip], y - ys[tip]) for x, y in zip(head_x, head_y))
+    if reach > ARROW_HEAD_RADIUS * shaft:
+        return None
+    return "arrow", [xs[0], ys[0], xs[tip], ys[tip]]
@@ -0,0 +1,75 @@
+from collections import defaultdict
+
+
+class SpatialIndex:
+    """
+    Uniform grid over item bounding boxes.
+
+    Each item is filed under every cell its box touches, so a region
+    query only looks at the items near it instead of the whole page.
+    """
+
+    CELL_SIZE = 128
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = defaultdict(set)      # (column, row) -> item ids
+        self._boxes = {}                    # item id -> (x1, y1, x2, y2)
+
+    def __len__(self):
+        return len(self._boxes)
+
+    def __contains__(self, item):
+        return item in self._boxes
+
+    def clear(self):
+        self._cells.clear()
+        self._boxes.clear()
+
+    def bbox(self, item):
+        return self._boxes.get(item)
+
+    def insert(self, item, bbox):
+        if item in self._boxes:
+            self.remove(item)
+        self._boxes[item] = bbox
+        for cell in self._cells_for(bbox):
+            self._cells[cell].add(item)
+
+    def remove(self, item):
+        bbox = self._boxes.pop(item, None)
+        if bbox is None:
+            return
+        for cell in self._cells_for(bbox):
+            items = self._cells.get(cell)
+            if items is not None:
+                items.discard(item)
+                if not items:
+                    del self._cells[cell]
+
+    def query(self, bbox):
+        """Items whose bounding box intersects bbox"""
+        x1, y1, x2, y2 = bbox
+        found = set()
+        for cell in self._cells_for(bbox):
+            for item in self._cells.get(cell, ()):
+                if item in found:
+                    continue
+                ix1, iy1, ix2, iy2 = self._boxes[item]
+                if ix1 <= x2 and ix2 >= x1 and iy1 <= y2 and iy2 >= y1:
+                    found.add(item)
+        return found
+
+    def enclosed(self, bbox):
+        """Items whose bounding box lies completely inside bbox"""
+        x1, y1, x2, y2 = bbox
+        return {item for item in self.query(bbox)
+                if self._boxes[item][0] >= x1 and self._boxes[item][1] >= y1
+                and self._boxes[item][2] <= x2 and self._boxes[item][3] <= y2}
+
+    def _cells_for(self, bbox):
+        size = self.cell_size
+        x1, y1, x2, y2 = bbox
+        for column in range(int(x1 // size), int(x2 // size) + 1):
+            for row in range(int(y1 // size), int(y2 // size) + 1):
+                yield column, row
@@ -0,0 +1,97 @@
+# Boards saved before colors were stored by style kept what was on screen,
+# so the ink of a board saved in dark mode was saved white
+LEGACY_INK_COLORS = ("white", "#ffffff", "#fff")
+_BOX_TYPES = ("rectangle", "oval")
+
+
+class StyleTable:
+    """
+    Logical colors whose displayed value depends on the theme.
+
+    Items drawn in a styled color (e.g. the default black "ink") carry a
+    tag per style and attribute, such as "style_ink_fill". Switching theme
+    then reconfigures each tag once with itemconfigure instead of reading
+    and rewriting the color of every item on the canvas.
+    """
+
+    ATTRIBUTES = ("fill", "outline")
+
+    def __init__(self):
+        # name -> {"light": color, "dark": color, "aliases": colors matching this style}
+        self.styles = {
+            "ink": {
+                "light": "black",
+                "dark": "white",
+                "aliases": ("black", "#000000", "#000")
+            }
+        }
+
+    def style_for_color(self, color):
+        """Return the style name a light-theme color belongs to, or None"""
+        if not color:
+            return None
+        color = str(color).lower()
+        for name, style in self.styles.items():
+            if color in style["aliases"]:
+                return name
+        return None
+
+    def tag(self, name, attribute):
+        """Canvas tag marking items whose attribute uses the given style"""
+        return f"style_{name}_{attribute}"
+
+    def color(self, name, dark_mode):
+        """Actual color of a style in the given theme"""
+        style = self.styles[name]
+        return style["dark"] if dark_mode else style["light"]
+
+    def resolve(self, color, attribute, dark_mode):
+        """
+        Map a logical color to (display color, tags).
+        Colors that are not part of a style are returned unchanged with no tags.
+        """
+        name = self.style_for_color(color)
+        if name is None:
+            return color, ()
+        return self.color(name, dark_mode), (self.tag(name, attribute),)
+
+    def logical_color(self, tags, attribute, displayed):
+        """Return the color to save for an item, undoing the theme mapping"""
+        for name in self.styles:
+            if self.tag(name, attribute) in tags:
+                return self.styles[name]["light"]
+        return displayed
+
+    def apply(self, canvas, dark_mode):
+        """Recolor every styled item for the theme: one itemconfigure per style and attribute"""
+        for name in self.styles:
+            color = self.color(name, dark_mode)
+            for attribute in self.ATTRIBUTES:
+                canvas.itemconfigure(self.tag(name, attribute), **{attribute: color})
+
+
+def upgrade_legacy_page(page):
+    """
+    Map the white ink of a page from an older board saved in dark mode back
+    to the "ink" style.
+
+    Only the colors items are drawn with change (a line's or text's color, a
+    box's outline); white fills were white on screen too. page is in a saved
+    form ("elements", or "objects" with Tk options) and is changed in place;
+    it is returned for convenience.
+    """
+    if not isinstance(page, dict):
+        return page
+    ink = StyleTable().styles["ink"]["light"]
+    for entry in page.get("elements") or []:
+        if isinstance(entry, dict):
+            _upgrade_color(entry, "outline" if entry.get("type") in _BOX_TYPES else "color", ink)
+    for entry in page.get("objects") or []:
+        if isinstance(entry, dict) and isinstance(entry.get("options"), dict):
+            _upgrade_color(entry["options"], "outline" if entry.get("type") in _BOX_TYPES else "fill", ink)
+    return page
+
+
+def _upgrade_color(values, key, ink):
+    if isinstance(values.get(key), str) and values[key].lower() in LEGACY_INK_COLORS:
+        values[key] = ink
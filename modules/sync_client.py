@@ -0,0 +1,134 @@
+import asyncio
+import itertools
+import queue
+import threading
+import uuid
+
+from modules.sync_server import DEFAULT_HOST, DEFAULT_PORT, FRAME_LIMIT, encode_frames, encode_message, decode_message
+
+
+class SyncClient:
+    """
+    Connection to a SyncServer, running its own asyncio loop on a thread.
+
+    send() may be called from the Tk thread. Outgoing ops are batched and
+    flushed every FLUSH_INTERVAL seconds; consecutive "pts" ops for the
+    same stroke are coalesced into one. Incoming ops are queued and picked
+    up with poll(), so the client works the same with or without a GUI.
+    """
+
+    FLUSH_INTERVAL = 0.03
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, client_id=None, role=None):
+        self.host = host
+        self.port = port
+        self.client_id = client_id or uuid.uuid4().hex[:8]
+        # Optional role announced to the server (e.g. "presenter" or "viewer")
+        self.role = role
+        self.incoming = queue.Queue()
+        self.connected = threading.Event()
+        self.error = None
+        self._counter = itertools.count(1)
+        self._loop = None
+        self._thread = None
+        self._writer = None
+        self._pending = []
+        self._flush_handle = None
+
+    def new_element_id(self):
+        return f"{self.client_id}:{next(self._counter)}"
+
+    def start(self, timeout=5):
+        """Connect on a background thread; raises ConnectionError if that fails"""
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="whiteboard-sync-client", daemon=True)
+        self._thread.start()
+        if not self.connected.wait(timeout) or self.error:
+            raise ConnectionError(f"Could not connect to {self.host}:{self.port}: {self.error}")
+
+    def stop(self):
+        if self._loop is None:
+            return
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._shutdown)
+        if self._thread is not None:
+            self._thread.join(2)
+        self.connected.clear()
+
+    def send(self, op):
+        """Queue an op for the server (thread-safe)"""
+        if self._loop is not None and self.connected.is_set():
+            self._loop.call_soon_threadsafe(self._queue_op, op)
+
+    def poll(self):
+        """Return all messages received since the last call"""
+        messages = []
+        while True:
+            try:
+                messages.append(self.incoming.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._receive())
+        except Exception as e:
+            self.error = e
+        finally:
+            if self.error:
+                # Unblock start() so it can report the failure
+                self.connected.set()
+            self._loop.close()
+
+    async def _receive(self):
+        try:
+            reader, self._writer = await asyncio.open_connection(self.host, self.port, limit=FRAME_LIMIT)
+        except OSError as e:
+            self.error = e
+            self.connected.set()
+            return
+        if self.role:
+            self._writer.write(encode_message({"type": "hello", "client": self.client_id, "role": self.role}))
+        self.connected.set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    self.incoming.put(decode_message(line))
+                except ValueError as e:
+                    print(f"Ignoring malformed frame from server: {e}")
+        except (ConnectionError, asyncio.LimitOverrunError, ValueError) as e:
+            # ValueError: a line longer than FRAME_LIMIT
+            print(f"Sync connection lost: {e}")
+            self.error = e
+        finally:
+            self.incoming.put({"type": "disconnected"})
+
+    def _queue_op(self, op):
+        last = self._pending[-1] if self._pending else None
+        if (op.get("op") == "pts" and last is not None and last.get("op") == "pts"
+                and last.get("id") == op.get("id")):
+            last["pts"].extend(op.get("pts", []))
+        else:
+            op = dict(op)
+            if "pts" in op:
+                op["pts"] = list(op["pts"])
+            self._pending.append(op)
+        if self._flush_handle is None:
+            self._flush_handle = self._loop.call_later(self.FLUSH_INTERVAL, self._flush)
+
+    def _flush(self):
+        self._flush_handle = None
+        if not self._pending or self._writer is None:
+            return
+        ops, self._pending = self._pending, []
+        for frame in encode_frames({"type": "ops", "client": self.client_id, "ops": ops}, "ops"):
+            self._writer.write(frame)
+
+    def _shutdown(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
@@ -0,0 +1,230 @@
+import copy
+import math
+
+
+def transform_coords(coords, transform, box=False):
+    """
+    Apply a SelectionManager transform ("move", dx, dy), ("scale", ax, ay,
+    factor) or ("rotate", cx, cy, radians) to flat coordinates. Boxes
+    (rectangle/oval corners) stay axis-aligned, as on a Tk canvas: only their
+    centre turns. Returns None for an unknown transform.
+    """
+    kind = transform[0] if transform else None
+    if kind == "move":
+        _, dx, dy = transform
+        return [value + (dy if index % 2 else dx) for index, value in enumerate(coords)]
+    if kind == "scale":
+        _, ax, ay, factor = transform
+        return [(value - ay if index % 2 else value - ax) * factor + (ay if index % 2 else ax)
+                for index, value in enumerate(coords)]
+    if kind == "rotate":
+        _, cx, cy, angle = transform
+        if box and len(coords) == 4:
+            half_w, half_h = (coords[2] - coords[0]) / 2, (coords[3] - coords[1]) / 2
+            x, y = transform_coords([coords[0] + half_w, coords[1] + half_h], transform)
+            return [x - half_w, y - half_h, x + half_w, y + half_h]
+        cos, sin = math.cos(angle), math.sin(angle)
+        rotated = []
+        for x, y in zip(coords[0::2], coords[1::2]):
+            rotated += [cx + (x - cx) * cos - (y - cy) * sin, cy + (x - cx) * sin + (y - cy) * cos]
+        return rotated
+    return None
+
+
+class SyncDocument:
+    """
+    Deterministic model of a shared board, built from sequenced operations.
+
+    Every client applies the same ops in the sync server's sequence order,
+    so all of them end up with the same elements in the same stacking
+    order. Element ids are "<client>:<counter>" and therefore never
+    collide. An erased id is tombstoned: later points or a late "begin"
+    for it are rejected, so an erase always wins over a concurrent edit.
+    Pages are keyed by a stable page id rather than their position, so
+    inserting a page does not move the elements of the pages after it.
+
+    Operations (compact dicts, all carry "page"):
+        begin     {id, color, width, pts}   start a freehand stroke
+        pts       {id, pts}                 append points to a stroke
+        end       {id}                      stroke finished
+        shape     {id, kind, coords, color, width}   rectangle/circle/line
+        text      {id, x, y, text, color, font_family, font_size}   add or edit a label
+        transform {id, transform}           move/scale/rotate one element (see transform_coords)
+        erase     {id}                      remove one element
+        clear     {}                        remove every element on the page
+        add_page  {after}                   insert page "page" after page "after" (None: at the end)
+    """
+
+    SHAPE_KINDS = ("rectangle", "circle", "line")
+
+    def __init__(self):
+        self.pages = {}          # page id -> {element id: element}, in sequence order
+        self.page_order = []     # page ids known from add_page ops, in board order
+        self.tombstones = set()
+        self.last_seq = 0
+
+    def apply(self, op):
+        """Apply one op; returns False when it was rejected as stale or invalid"""
+        kind = op.get("op")
+        element_id = op.get("id")
+        elements = self.pages.setdefault(op.get("page", 0), {})
+        if op.get("seq"):
+            self.last_seq = max(self.last_seq, op["seq"])
+
+        if kind == "add_page":
+            page, after = op.get("page"), op.get("after")
+            if page is None or page in self.page_order:
+                return False
+            if after is not None and after not in self.page_order:
+                # A page every client had before it was shared
+                self.page_order.append(after)
+                self.pages.setdefault(after, {})
+            position = self.page_order.index(after) + 1 if after is not None else len(self.page_order)
+            self.page_order.insert(position, page)
+            return True
+
+        if kind == "begin":
+            if element_id in self.tombstones or element_id in elements:
+                return False
+            elements[element_id] = {
+                "kind": "stroke",
+                "color": op.get("color", "black"),
+                "width": op.get("width", 2),
+                "pts": list(op.get("pts", [])),
+                "done": False
+            }
+            return True
+
+        if kind == "pts":
+            element = elements.get(element_id)
+            if element is None or element["kind"] != "stroke" or element["done"]:
+                return False
+            element["pts"].extend(op.get("pts", []))
+            return True
+
+        if kind == "end":
+            element = elements.get(element_id)
+            if element is None:
+                return False
+            element["done"] = True
+            return True
+
+        if kind == "shape":
+            if op.get("kind") not in self.SHAPE_KINDS:
+                return False
+            if element_id in self.tombstones or element_id in elements:
+                return False
+            elements[element_id] = {
+                "kind": op["kind"],
+                "color": op.get("color", "black"),
+                "width": op.get("width", 2),
+                "coords": list(op.get("coords", [])),
+                "done": True
+            }
+            return True
+
+        if kind == "text":
+            if element_id in self.tombstones:
+                return False
+            element = elements.get(element_id)
+            if element is not None and element["kind"] != "text":
+                return False
+            if element is None:
+                element = elements[element_id] = {"kind": "text", "coords": [op.get("x", 0), op.get("y", 0)],
+                                                  "text": "", "color": "black", "font_family": "Arial",
+                                                  "font_size": 12, "done": True}
+            # An edit only carries what changed
+            element.update((key, op[key]) for key in ("text", "color", "font_family", "font_size") if key in op)
+            return True
+
+        if kind == "transform":
+            element = elements.get(element_id)
+            if element is None:
+                return False
+            key = "pts" if element["kind"] == "stroke" else "coords"
+            coords = transform_coords(element[key], op.get("transform"),
+                                      box=element["kind"] in ("rectangle", "circle"))
+            if coords is None:
+                return False
+            element[key] = coords
+            return True
+
+        if kind == "erase":
+            if element_id in self.tombstones:
+                return False
+            self.tombstones.add(element_id)
+            elements.pop(element_id, None)
+            return True
+
+        if kind == "clear":
+            self.tombstones.update(elements)
+            elements.clear()
+            return True
+
+        return False
+
+    def snapshot(self, page=None):
+        """Return ops that rebuild the current state (all pages, or one page)"""
+        ops = []
+        if page is None:
+            for index, page_id in enumerate(self.page_order):
+                ops.append({"op": "add_page", "page": page_id,
+                            "after": self.page_order[index - 1] if index else None})
+        pages = [page] if page is not None else list(self.pages)
+        for page_index in pages:
+            for element_id, element in self.pages.get(page_index, {}).items():
+                if element["kind"] == "text":
+                    ops.append({
+                        "op": "text", "page": page_index, "id": element_id,
+                        "x": element["coords"][0], "y": element["coords"][1], "text": element["text"],
+                        "color": element["color"], "font_family": element["font_family"],
+                        "font_size": element["font_size"]
+                    })
+                elif element["kind"] == "stroke":
+                    ops.append({
+                        "op": "begin", "page": page_index, "id": element_id,
+                        "color": element["color"], "width": element["width"],
+                        "pts": list(element["pts"])
+                    })
+                    if element["done"]:
+                        ops.append({"op": "end", "page": page_index, "id": element_id})
+                else:
+                    ops.append({
+                        "op": "shape", "page": page_index, "id": element_id,
+                        "kind": element["kind"], "coords": list(element["coords"]),
+                        "color": element["color"], "width": element["width"]
+                    })
+        return ops
+
+    def to_page_objects(self, page):
+        """Return a page's elements in the PageManager "objects" format"""
+        objects = []
+        for element_id, element in self.pages.get(page, {}).items():
+            if element["kind"] == "stroke":
+                if len(element["pts"]) < 4:
+                    continue
+                objects.append({
+                    "type": "line",
+                    "coords": list(element["pts"]),
+                    "options": {"fill": element["color"], "width": element["width"],
+                                "capstyle": "round", "smooth": 1}
+                })
+            elif element["kind"] == "text":
+                objects.append({
+                    "type": "text",
+                    "coords": list(element["coords"]),
+                    "options": {"text": element["text"], "fill": element["color"],
+                                "font": f"{{{element['font_family']}}} {element['font_size']}", "anchor": "nw"}
+                })
+            else:
+                objects.append({
+                    "type": "oval" if element["kind"] == "circle" else element["kind"],
+                    "coords": list(element["coords"]),
+                    "options": ({"fill": element["color"], "width": element["width"]}
+                                if element["kind"] == "line" else
+                                {"outline": element["color"], "width": element["width"]})
+                })
+        return objects
+
+    def copy(self):
+        return copy.deepcopy(self)
@@ -0,0 +1,216 @@
+"""
+Sync server for shared whiteboard sessions.
+
+Clients connect over TCP and exchange newline-delimited compact JSON
+frames. The server is the single sequencer: it stamps every incoming op
+with a global sequence number, applies it to its own SyncDocument and
+broadcasts it to every client (the sender treats its own echo as an
+acknowledgement). New clients receive a snapshot of the document first.
+
+Long lists of ops are split over several frames of about FRAME_BYTES each
+(see encode_frames), so a big board's snapshot or a big batch never makes
+one huge line; a snapshot continues in "snapshot" frames after the
+"welcome". Readers still accept lines up to FRAME_LIMIT, for single ops
+larger than a frame.
+
+Run a standalone server with:
+    python -m modules.sync_server --host 0.0.0.0 --port 8765
+"""
+import argparse
+import asyncio
+import json
+import threading
+
+from modules.sync_document import SyncDocument
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+FRAME_BYTES = 60 * 1024             # Size lists of ops are split at
+FRAME_LIMIT = 16 * 1024 * 1024      # Longest line read (asyncio's default is 64 KiB)
+_COMPACT = (",", ":")
+
+
+def encode_message(message):
+    """Serialize one frame as a line of compact JSON"""
+    return (json.dumps(message, separators=_COMPACT) + "\n").encode("utf-8")
+
+
+def encode_frames(message, key, next_type=None, max_bytes=FRAME_BYTES):
+    """
+    Serialize a message whose list message[key] may be long as one or more
+    frames of about max_bytes each. Every frame carries the message's other
+    fields and a run of the list; with next_type, the frames after the first
+    have that type instead.
+    """
+    fields = {name: value for name, value in message.items() if name != key}
+    frames, batch, size = [], [], 0
+
+    def emit():
+        head = fields if not frames or next_type is None else dict(fields, type=next_type)
+        text = json.dumps(head, separators=_COMPACT)[:-1]
+        frames.append(f'{text}{"," if head else ""}{json.dumps(key)}:[{",".join(batch)}]}}\n'.encode("utf-8"))
+
+    for item in message.get(key) or []:
+        item_text = json.dumps(item, separators=_COMPACT)
+        if batch and size + len(item_text) > max_bytes:
+            emit()
+            batch, size = [], 0
+        batch.append(item_text)
+        size += len(item_text) + 1
+    if batch or not frames:
+        emit()
+    return frames
+
+
+def decode_message(line):
+    return json.loads(line.decode("utf-8"))
+
+
+class SyncServer:
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.document = SyncDocument()
+        self.seq = 0
+        self.clients = set()
+        self._server = None
+
+    async def start(self):
+        """Start listening; with port 0 the OS picks a free port, stored in self.port"""
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port, limit=FRAME_LIMIT)
+        self.port = self._server.sockets[0].getsockname()[1]
+        print(f"Sync server listening on {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writer in list(self.clients):
+            writer.close()
+        self.clients.clear()
+
+    def run_in_thread(self):
+        """Run the server on a daemon thread (used to host a session from the app)"""
+        started = threading.Event()
+        loop = asyncio.new_event_loop()
+
+        async def main():
+            await self.start()
+            started.set()
+            await self.serve_forever()
+
+        def run():
+            asyncio.set_event_loop(loop)
+            try:
+                loop.run_until_complete(main())
+            except Exception as e:
+                print(f"Sync server stopped: {e}")
+            finally:
+                started.set()
+
+        thread = threading.Thread(target=run, name="whiteboard-sync-server", daemon=True)
+        thread.start()
+        started.wait(5)
+        return thread
+
+    async def _handle_client(self, reader, writer):
+        self.clients.add(writer)
+        peer = writer.get_extra_info("peername")
+        print(f"Sync client connected: {peer}")
+        try:
+            await self.on_connect(writer)
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = decode_message(line)
+                except ValueError as e:
+                    print(f"Ignoring malformed frame from {peer}: {e}")
+                    continue
+                await self.handle_message(message, writer)
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError) as e:
+            # ValueError: a line longer than FRAME_LIMIT
+            print(f"Sync client {peer} dropped: {e}")
+        finally:
+            self.clients.discard(writer)
+            self.on_disconnect(writer)
+            writer.close()
+            print(f"Sync client disconnected: {peer}")
+
+    async def on_connect(self, writer):
+        """Send a new client the current document"""
+        self.send_welcome(writer, self.document.snapshot())
+        await writer.drain()
+
+    def on_disconnect(self, writer):
+        pass
+
+    def send_welcome(self, writer, snapshot):
+        """Queue the frames of a welcome carrying snapshot (continued in "snapshot" frames)"""
+        for frame in encode_frames({"type": "welcome", "seq": self.seq, "snapshot": snapshot},
+                                   "snapshot", next_type="snapshot"):
+            writer.write(frame)
+
+    async def handle_message(self, message, writer):
+        """Sequence a batch of ops from one client and fan it out"""
+        if message.get("type") != "ops":
+            return
+        client = message.get("client")
+        accepted = []
+        rejected = []
+        for op in message.get("ops", []):
+            if not isinstance(op, dict):
+                continue
+            self.seq += 1
+            op = dict(op, seq=self.seq, client=client)
+            if self.document.apply(op):
+                accepted.append(op)
+            elif (op.get("id") in self.document.tombstones
+                  and op.get("op") in ("begin", "pts", "end", "shape", "text", "transform")):
+                # The element was erased concurrently; tell the sender to drop its local copy
+                rejected.append({"op": "erase", "page": op.get("page", 0), "id": op["id"],
+                                 "seq": self.seq, "client": None})
+
+        if accepted:
+            await self.broadcast({"type": "ops", "ops": accepted})
+        if rejected:
+            for frame in encode_frames({"type": "ops", "ops": rejected}, "ops"):
+                writer.write(frame)
+            await self._drain(writer)
+
+    async def broadcast(self, message):
+        frames = encode_frames(message, "ops")
+        clients = list(self.clients)
+        for client in clients:
+            for frame in frames:
+                client.write(frame)
+        await asyncio.gather(*(self._drain(client) for client in clients))
+
+    async def _drain(self, writer):
+        try:
+            await writer.drain()
+        except ConnectionError:
+            self.clients.discard(writer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Digital Whiteboard sync server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args()
+    try:
+        asyncio.run(SyncServer(args.host, args.port).serve_forever())
+    except KeyboardInterrupt:
+        print("Sync server stopped")
+
+
+if __name__ == "__main__":
+    main()
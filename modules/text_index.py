@@ -0,0 +1,147 @@
+"""
+Inverted index over the text elements of a board's pages.
+
+Pages are indexed by their content digest (see page_store.content_digest)
+rather than by position, so inserting, deleting or reordering pages never
+invalidates the index, and a page is only (re)indexed when its content
+changed. The index is saved with the board, so opening a board does not
+read every page's text again.
+"""
+import bisect
+import re
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return [word.lower() for word in _WORD.findall(text or "")]
+
+
+def text_entries(items):
+    """(text, x, y) of every text element in a page's "objects" or "elements" list"""
+    entries = []
+    for item in items or []:
+        if not isinstance(item, dict) or item.get("type") != "text":
+            continue
+        if "coords" in item:
+            coords = item.get("coords") or [0, 0]
+            text = (item.get("options") or {}).get("text", "")
+            x, y = coords[0], coords[1]
+        else:
+            text, x, y = item.get("text", ""), item.get("x", 0), item.get("y", 0)
+        if text:
+            entries.append((text, float(x), float(y)))
+    return entries
+
+
+def match_entries(entries, terms, prefix):
+    """Entries (indexes) containing every term, the last one possibly as a prefix"""
+    matches = []
+    for i, (text, _, _) in enumerate(entries):
+        words = tokenize(text)
+        if all(term in words for term in terms) and \
+                (not prefix or any(word.startswith(prefix) for word in words)):
+            matches.append(i)
+    return matches
+
+
+class TextIndex:
+    """Maps words to the (page digest, entry) pairs whose text contains them"""
+
+    def __init__(self):
+        self.pages = {}         # digest -> [(text, x, y), ...]
+        self.postings = {}      # word -> {digest: {entry index, ...}}
+        self._terms = None      # Sorted words, for prefix search
+
+    def __contains__(self, digest):
+        return digest in self.pages
+
+    def add_page(self, digest, items):
+        """Index the text of a page's items under its digest (no-op if already indexed)"""
+        if digest in self.pages:
+            return
+        entries = text_entries(items)
+        self.pages[digest] = entries
+        for index, (text, _, _) in enumerate(entries):
+            for word in set(tokenize(text)):
+                self.postings.setdefault(word, {}).setdefault(digest, set()).add(index)
+                self._terms = None
+
+    def remove_page(self, digest):
+        entries = self.pages.pop(digest, None)
+        for text, _, _ in entries or ():
+            for word in set(tokenize(text)):
+                pages = self.postings.get(word)
+                if pages is not None:
+                    pages.pop(digest, None)
+                    if not pages:
+                        del self.postings[word]
+                        self._terms = None
+
+    def prune(self, live_digests):
+        """Drop pages that are no longer part of the board"""
+        for digest in set(self.pages) - set(live_digests):
+            self.remove_page(digest)
+
+    def search(self, query):
+        """
+        Return {digest: [entry index, ...]} of entries containing every word
+        of query; the last word also matches as a prefix (search as you type)
+        """
+        words = tokenize(query)
+        if not words:
+            return {}
+        *whole, last = words
+        candidates = None
+        for word in whole:
+            pages = self.postings.get(word, {})
+            candidates = self._intersect(candidates, pages)
+        candidates = self._intersect(candidates, self._prefix_postings(last))
+        return {digest: sorted(entries) for digest, entries in candidates.items() if entries}
+
+    def _prefix_postings(self, prefix):
+        if self._terms is None:
+            self._terms = sorted(self.postings)
+        merged = {}
+        start = bisect.bisect_left(self._terms, prefix)
+        for word in self._terms[start:]:
+            if not word.startswith(prefix):
+                break
+            for digest, entries in self.postings[word].items():
+                merged.setdefault(digest, set()).update(entries)
+        return merged
+
+    @staticmethod
+    def _intersect(candidates, pages):
+        if candidates is None:
+            return {digest: set(entries) for digest, entries in pages.items()}
+        return {digest: entries & pages[digest] for digest, entries in candidates.items() if digest in pages}
+
+    def to_json(self, live_digests=None):
+        """The board file's "text_index" section"""
+        digests = self.pages if live_digests is None else [d for d in live_digests if d in self.pages]
+        pages = {digest: [list(entry) for entry in self.pages[digest]] for digest in digests}
+        terms = {}
+        for word, postings in self.postings.items():
+            kept = {digest: sorted(entries) for digest, entries in postings.items() if digest in pages}
+            if kept:
+                terms[word] = kept
+        return {"pages": pages, "terms": terms}
+
+    def load_json(self, data):
+        """Restore a saved index (pages already indexed are kept)"""
+        if not isinstance(data, dict):
+            return
+        for digest, entries in (data.get("pages") or {}).items():
+            if digest not in self.pages:
+                self.pages[digest] = [(text, float(x), float(y)) for text, x, y in entries]
+        for word, postings in (data.get("terms") or {}).items():
+            for digest, entries in postings.items():
+                if digest in self.pages:
+                    self.postings.setdefault(word, {}).setdefault(digest, set()).update(entries)
+        self._terms = None
+
+    def clear(self):
+        self.pages.clear()
+        self.postings.clear()
+        self._terms = None
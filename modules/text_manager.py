@@ -0,0 +1,205 @@
+from modules.layer_manager import layer_from_tags
+from modules.timeline import time_tag
+
+
+class TextManager:
+    """
+    The text tool: click to type a new label, or click a label to edit it in place.
+
+    Editing uses the canvas's own text item editing (insert cursor, insert
+    and dchars), so every keystroke is one canvas call and nothing is
+    redrawn. A frame around the label being edited is laid out with the
+    cached FontMetrics rather than measured by Tk. Finished labels are
+    ordinary text items, saved in the same "text" element format as
+    FileManager uses. A new label is one undo step, and so is each editing
+    session of an existing one.
+    """
+
+    FRAME_TAG = "text_edit_frame"
+    FRAME_PADDING = 3
+
+    def __init__(self, app):
+        self.app = app
+        self.item = None            # Text item being edited
+        self._before = None         # Its text when editing started (None for a new label)
+        self._frame = None
+        self._keys_bound = False
+
+    @property
+    def canvas(self):
+        return self.app.canvas_manager.canvas
+
+    # Creating and editing (called by CanvasManager for the text tool)
+
+    def press(self, x, y):
+        """Place the cursor in the label under (x, y), or start a new label there"""
+        if self.item is not None and self._contains(self.item, x, y):
+            self.canvas.icursor(self.item, f"@{x},{y}")
+            self.canvas.select_clear()
+            return
+        self.finish()
+        item = self._text_at(x, y)
+        if item is not None:
+            self._begin(item, self.canvas.itemcget(item, "text"))
+            self.canvas.icursor(item, f"@{x},{y}")
+        elif self.app.layer_manager.can_draw():
+            element = {"type": "text", "x": x, "y": y, "text": "", "color": self.app.brush_color,
+                       "font_family": self.app.text_font_family, "font_size": self.app.text_font_size}
+            self._begin(self.create(element), None)
+
+    def create(self, element, layer=None):
+        """Create a text item from a FileManager "text" element on a layer (the current one by default)"""
+        canvas_manager = self.app.canvas_manager
+        fill, style_tags = canvas_manager.resolve_style(element.get("color", "black"), "fill")
+        layer_tags = self.app.layer_manager.tags(layer or element.get("layer"))
+        item = self.canvas.create_text(
+            element["x"], element["y"],
+            text=element.get("text", ""),
+            fill=fill,
+            font=(element.get("font_family", self.app.text_font_family),
+                  element.get("font_size", self.app.text_font_size)),
+            anchor="nw",
+            tags=style_tags + (time_tag(canvas_manager.timeline.now()),) + layer_tags
+        )
+        self.app.layer_manager.place(item, layer or element.get("layer"))
+        return item
+
+    def set_text(self, item, text):
+        """Replace a label's text (used by undo and redo)"""
+        if self.canvas.type(item) == "text":
+            self.canvas.itemconfigure(item, text=text)
+            self.app.canvas_manager._notify("text", item=item)
+
+    def finish(self):
+        """Stop editing, recording the new or changed label for undo"""
+        item, before = self.item, self._before
+        if item is None:
+            return
+        self.item = self._before = None
+        self._delete_frame()
+        self.canvas.focus("")
+
+        canvas_manager = self.app.canvas_manager
+        text = self.canvas.itemcget(item, "text")
+        if before is None:
+            if not text.strip():
+                # A label that was never typed into is dropped
+                self.canvas.delete(item)
+                return
+            element = self.app.file_manager.canvas_element(self.canvas, item)
+            element.pop("t", None)
+            canvas_manager.undo_stack.append({"type": "text", "id": item, "element": element})
+        elif text != before:
+            canvas_manager.undo_stack.append({"type": "text_edit", "id": item, "before": before, "after": text})
+        else:
+            return
+        canvas_manager.redo_stack.clear()
+        canvas_manager._notify("text", item=item)
+
+    def _begin(self, item, before):
+        self.item = item
+        self._before = before
+        self.canvas.focus_set()
+        self.canvas.focus(item)
+        self.canvas.configure(insertbackground=self.canvas.itemcget(item, "fill"))
+        if not self._keys_bound:
+            self.canvas.bind("<Key>", self._on_key, add="+")
+            self._keys_bound = True
+        self._draw_frame()
+
+    def _text_at(self, x, y):
+        """Topmost label under (x, y) on a layer that can be edited"""
+        canvas_manager = self.app.canvas_manager
+        for item in reversed(self.canvas.find_overlapping(x - 2, y - 2, x + 2, y + 2)):
+            if self.canvas.type(item) != "text" or item in canvas_manager.overlay_ids:
+                continue
+            if self.app.layer_manager.is_locked(layer_from_tags(self.canvas.gettags(item))):
+                continue
+            return item
+        return None
+
+    def _on_key(self, event):
+        item = self.item
+        if item is None:
+            return None
+        canvas = self.canvas
+        if event.state & 0x4:
+            if event.keysym.lower() == "v":
+                try:
+                    text = self.app.root.clipboard_get()
+                except Exception:
+                    text = ""
+                self._delete_selection()
+                canvas.insert(item, "insert", text)
+                self._draw_frame()
+                return "break"
+            # Other shortcuts (undo, copy...) act on the finished label
+            self.finish()
+            return None
+
+        if event.keysym == "Escape":
+            self.finish()
+        elif event.keysym == "BackSpace":
+            if not self._delete_selection():
+                index = canvas.index(item, "insert")
+                if index > 0:
+                    canvas.dchars(item, index - 1)
+        elif event.keysym == "Delete":
+            if not self._delete_selection():
+                canvas.dchars(item, "insert")
+        elif event.keysym in ("Left", "Right"):
+            index = canvas.index(item, "insert") + (1 if event.keysym == "Right" else -1)
+            canvas.icursor(item, max(0, index))
+        elif event.keysym == "Home":
+            canvas.icursor(item, 0)
+        elif event.keysym == "End":
+            canvas.icursor(item, "end")
+        elif event.keysym in ("Return", "KP_Enter"):
+            self._delete_selection()
+            canvas.insert(item, "insert", "\n")
+        elif event.char and event.char.isprintable():
+            self._delete_selection()
+            canvas.insert(item, "insert", event.char)
+        else:
+            return None
+        if self.item is not None:
+            self._draw_frame()
+        return "break"
+
+    def _delete_selection(self):
+        """Delete the selected characters of the label being edited; True if there were any"""
+        if self.canvas.select_item() and int(self.canvas.select_item()) == self.item:
+            self.canvas.dchars(self.item, "sel.first", "sel.last")
+            self.canvas.select_clear()
+            return True
+        return False
+
+    def _contains(self, item, x, y):
+        x1, y1, x2, y2 = self._layout(item)
+        return x1 <= x <= x2 and y1 <= y <= y2
+
+    def _layout(self, item):
+        """Bounding box of a label from its text and font, without asking Tk to measure it"""
+        metrics = self.app.canvas_manager.font_metrics
+        x, y = self.canvas.coords(item)[:2]
+        family, size = metrics.parse(self.canvas.itemcget(item, "font"))
+        # An empty label still gets the height of one line and a cursor's width
+        return metrics.text_bbox(x, y, self.canvas.itemcget(item, "text") or " ", family, size,
+                                 self.canvas.itemcget(item, "anchor"))
+
+    def _draw_frame(self):
+        x1, y1, x2, y2 = self._layout(self.item)
+        pad = self.FRAME_PADDING
+        if self._frame is None:
+            self._frame = self.canvas.create_rectangle(x1 - pad, y1 - pad, x2 + pad, y2 + pad,
+                                                       outline="#7aa7d8", dash=(3, 2), tags=(self.FRAME_TAG,))
+            # Part of the editing UI, not of the page
+            self.app.canvas_manager.overlay_ids.add(self._frame)
+        else:
+            self.canvas.coords(self._frame, x1 - pad, y1 - pad, x2 + pad, y2 + pad)
+
+    def _delete_frame(self):
+        if self._frame is not None:
+            self.canvas.delete(self._frame)
+            self.app.canvas_manager.overlay_ids.discard(self._frame)
+            self._frame = None
@@ -0,0 +1,206 @@
+import queue
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import ttk
+
+from PIL import ImageTk
+
+from modules.page_store import PackedPage, content_digest
+from modules.thumbnail_renderer import render_thumbnail
+
+
+class ThumbnailManager:
+    """
+    Sidebar strip with a thumbnail per page; clicking one jumps to it.
+
+    Thumbnails are rasterized from page data with Pillow on worker threads
+    and cached by page content digest, so a page is only re-rendered after
+    its content changed. Packed pages already carry their digest and are
+    unpacked on the worker. The page on screen is re-captured a moment
+    after the last edit.
+    """
+
+    WIDTH = 120
+    HEIGHT = 90
+    PADDING = 8
+    LABEL_HEIGHT = 14
+    MAX_WORKERS = 2
+    CACHE_SIZE = 256            # Thumbnails kept (at least one per page)
+    REFRESH_DELAY_MS = 500      # Wait after the last edit before re-capturing the page on screen
+    POLL_INTERVAL_MS = 50
+
+    def __init__(self, app):
+        self.app = app
+        self.canvas = None
+        self._executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS,
+                                            thread_name_prefix="whiteboard-thumbnails")
+        self._cache = OrderedDict()     # digest -> PhotoImage
+        self._pending = {}              # digest -> Future
+        self._results = queue.Queue()
+        self._slots = []                # digest shown for each page
+        self._current_digest = None     # (page index, digest) of the page on screen
+        self._refresh_job = None
+        self._poll_job = None
+
+    def create_sidebar(self, parent):
+        """Build the strip on the left side of parent"""
+        frame = ttk.Frame(parent)
+        frame.pack(side=tk.LEFT, fill=tk.Y, padx=(5, 0), pady=5)
+
+        self.canvas = tk.Canvas(frame, width=self.WIDTH + 2 * self.PADDING,
+                                bg="gray95", highlightthickness=0)
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=self.canvas.yview)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.Y)
+
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.canvas.yview_scroll(-1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self.canvas.yview_scroll(1, "units"))
+
+        self.app.canvas_manager.add_listener(self._on_canvas_event)
+
+    def refresh(self):
+        """Lay out one slot per page and render the thumbnails that are out of date"""
+        if self.canvas is None:
+            return
+        page_manager = self.app.page_manager
+        slots = []
+        jobs = []
+        for index, page in enumerate(page_manager.pages):
+            if index == page_manager.current_page_index:
+                digest, source = self._current_page_source(page)
+            elif isinstance(page, PackedPage):
+                digest, source = page.digest, page
+            else:
+                items = page.get("objects") or page.get("elements") or []
+                digest, source = content_digest(items), list(items)
+            slots.append(digest)
+            if digest not in self._cache and digest not in self._pending:
+                jobs.append((index, digest, source))
+
+        self._slots = slots
+        # Pages near the current one are rendered first
+        current = page_manager.current_page_index
+        for _, digest, source in sorted(jobs, key=lambda job: abs(job[0] - current)):
+            self._submit(digest, source)
+        self._layout()
+
+    def schedule_refresh(self):
+        if self.canvas is None:
+            return
+        if self._refresh_job is not None:
+            self.app.root.after_cancel(self._refresh_job)
+        self._refresh_job = self.app.root.after(self.REFRESH_DELAY_MS, self._run_refresh)
+
+    def _run_refresh(self):
+        self._refresh_job = None
+        self.refresh()
+
+    def _on_canvas_event(self, event, data):
+        if event in ("stroke_end", "shape", "erase", "clear", "transform", "paste", "text"):
+            self._current_digest = None
+            self.schedule_refresh()
+
+    def _current_page_source(self, page):
+        """Digest and drawable entries of the page on screen"""
+        canvas_manager = self.app.canvas_manager
+        index = self.app.page_manager.current_page_index
+        if canvas_manager.is_rendering():
+            # Only part of the page is on the canvas; the stored data is complete
+            items = page.get("objects") or page.get("elements") or []
+            return content_digest(items), list(items)
+        if self._current_digest is not None and self._current_digest[0] == index:
+            digest = self._current_digest[1]
+            # Captured already, unless its thumbnail has since left the cache
+            if digest in self._cache or digest in self._pending:
+                return digest, None
+        objects = canvas_manager.get_canvas_objects()
+        digest = content_digest(objects)
+        self._current_digest = (index, digest)
+        return digest, objects
+
+    def _submit(self, digest, source):
+        if source is None:
+            return
+        future = self._executor.submit(self._render, source)
+        self._pending[digest] = future
+        future.add_done_callback(lambda f, d=digest: self._results.put((d, f)))
+        if self._poll_job is None:
+            self._poll_job = self.app.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def _render(self, source):
+        # Worker thread: no Tk calls here
+        if isinstance(source, PackedPage):
+            page = source.unpack()
+            source = page.get("objects") or page.get("elements") or []
+        return render_thumbnail(source, (self.WIDTH, self.HEIGHT))
+
+    def _poll(self):
+        self._poll_job = None
+        finished = False
+        while True:
+            try:
+                digest, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending.pop(digest, None)
+            try:
+                image = future.result()
+            except Exception as e:
+                print(f"Could not render thumbnail: {e}")
+                continue
+            # PhotoImages must be created on the Tk thread
+            self._cache[digest] = ImageTk.PhotoImage(image)
+            finished = True
+
+        if finished:
+            limit = max(self.CACHE_SIZE, len(self._slots))
+            while len(self._cache) > limit:
+                self._cache.popitem(last=False)
+            self._layout()
+        if self._pending:
+            self._poll_job = self.app.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def _slot_height(self):
+        return self.HEIGHT + self.LABEL_HEIGHT + self.PADDING
+
+    def _layout(self):
+        canvas = self.canvas
+        canvas.delete("all")
+        current = self.app.page_manager.current_page_index
+        x = self.PADDING
+        for index, digest in enumerate(self._slots):
+            y = self.PADDING + index * self._slot_height()
+            image = self._cache.get(digest)
+            if image is not None:
+                self._cache.move_to_end(digest)
+                canvas.create_image(x, y, image=image, anchor="nw")
+            else:
+                canvas.create_rectangle(x, y, x + self.WIDTH, y + self.HEIGHT, fill="white", outline="")
+            canvas.create_rectangle(x - 1, y - 1, x + self.WIDTH + 1, y + self.HEIGHT + 1,
+                                    outline="#1E90FF" if index == current else "gray70",
+                                    width=3 if index == current else 1)
+            canvas.create_text(x + self.WIDTH / 2, y + self.HEIGHT + 2, text=str(index + 1),
+                               anchor="n", fill="gray30")
+
+        total = self.PADDING + len(self._slots) * self._slot_height()
+        canvas.configure(scrollregion=(0, 0, self.WIDTH + 2 * self.PADDING, total))
+        self._show_slot(current, total)
+
+    def _show_slot(self, index, total):
+        """Scroll the strip so the current page's thumbnail is visible"""
+        top = index * self._slot_height() / total
+        bottom = (index + 1) * self._slot_height() / total
+        first, last = self.canvas.yview()
+        if top < first or bottom > last:
+            self.canvas.yview_moveto(top)
+
+    def _on_click(self, event):
+        if self.app.read_only:
+            return
+        index = int((self.canvas.canvasy(event.y) - self.PADDING) // self._slot_height())
+        if 0 <= index < len(self._slots):
+            self.app.page_manager.go_to_page(index)
@@ -0,0 +1,111 @@
+import re
+
+from PIL import Image, ImageColor, ImageDraw
+
+from modules.batch_renderer import element_to_item
+
+# Area of the board always shown in a thumbnail, so sparse pages keep their scale
+PAGE_WIDTH = 1000
+PAGE_HEIGHT = 750
+
+_TK_GRAY = re.compile(r"^gr[ae]y(\d{1,3})$")
+
+
+def _color(value, cache):
+    """Translate a Tk color name to RGB; unknown names fall back to black"""
+    if not value:
+        return None
+    rgb = cache.get(value)
+    if rgb is None:
+        try:
+            rgb = ImageColor.getrgb(value)
+        except ValueError:
+            # Tk's numbered grays ("gray90") are not CSS names
+            match = _TK_GRAY.match(value.lower())
+            level = round(int(match.group(1)) * 2.55) if match else 0
+            rgb = (level, level, level)
+        cache[value] = rgb
+    return rgb
+
+
+def _width(options, scale):
+    try:
+        width = float(options.get("width", 1))
+    except (TypeError, ValueError):
+        width = 1
+    return max(1, round(width * scale))
+
+
+def to_items(elements):
+    """Convert saved page entries to drawable (type, coords, options) items"""
+    return [item for item in map(element_to_item, elements) if item is not None]
+
+
+def content_bounds(items):
+    """Bounding box of the items, never smaller than the default board area"""
+    x0, y0, x1, y1 = 0, 0, PAGE_WIDTH, PAGE_HEIGHT
+    for _, coords, _ in items:
+        try:
+            xs = [float(x) for x in coords[0::2]]
+            ys = [float(y) for y in coords[1::2]]
+        except (TypeError, ValueError):
+            continue
+        x0, y0 = min(x0, min(xs)), min(y0, min(ys))
+        x1, y1 = max(x1, max(xs)), max(y1, max(ys))
+    return x0, y0, x1, y1
+
+
+def fit_transform(bounds, size):
+    """Return (scale, offset_x, offset_y) that centers bounds inside an image of size"""
+    x0, y0, x1, y1 = bounds
+    width, height = size
+    scale = min(width / (x1 - x0), height / (y1 - y0))
+    offset_x = (width - (x1 - x0) * scale) / 2 - x0 * scale
+    offset_y = (height - (y1 - y0) * scale) / 2 - y0 * scale
+    return scale, offset_x, offset_y
+
+
+def draw_items(draw, items, transform, colors=None):
+    """Draw items onto a PIL ImageDraw with a fit_transform() transform"""
+    scale, offset_x, offset_y = transform
+    colors = {} if colors is None else colors
+
+    for kind, coords, options in items:
+        try:
+            points = [(float(coords[i]) * scale + offset_x, float(coords[i + 1]) * scale + offset_y)
+                      for i in range(0, len(coords) - 1, 2)]
+        except (TypeError, ValueError):
+            continue
+
+        if kind == "line":
+            fill = _color(options.get("fill", "black"), colors)
+            if fill and len(points) >= 2:
+                line_width = _width(options, scale)
+                draw.line(points, fill=fill, width=line_width, joint="curve" if line_width > 2 else None)
+
+        elif kind in ("rectangle", "oval") and len(points) >= 2:
+            (ax, ay), (bx, by) = points[0], points[1]
+            box = [min(ax, bx), min(ay, by), max(ax, bx), max(ay, by)]
+            shape = draw.rectangle if kind == "rectangle" else draw.ellipse
+            shape(box, fill=_color(options.get("fill"), colors),
+                  outline=_color(options.get("outline", "black"), colors),
+                  width=_width(options, scale))
+
+        elif kind == "polygon" and len(points) >= 3:
+            draw.polygon(points, fill=_color(options.get("fill"), colors),
+                         outline=_color(options.get("outline"), colors))
+
+        elif kind == "text" and options.get("text"):
+            draw.text(points[0], str(options["text"]), fill=_color(options.get("fill", "black"), colors))
+
+
+def render_thumbnail(elements, size=(120, 90), background="white"):
+    """
+    Rasterize saved page entries (either saved format) into a PIL image.
+
+    Runs without Tk, so it can be called from a worker thread.
+    """
+    items = to_items(elements)
+    image = Image.new("RGB", size, background)
+    draw_items(ImageDraw.Draw(image), items, fit_transform(content_bounds(items), size))
+    return image
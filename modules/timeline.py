@@ -0,0 +1,106 @@
+import heapq
+import time
+
+# Canvas tag carrying an item's timestamp, e.g. "t_15320"
+TIME_TAG_PREFIX = "t_"
+# Entries saved before timestamps existed replay as already on the board
+UNTIMED = -1
+
+
+class Timeline:
+    """
+    Recording clock for replay.
+
+    Times are whole milliseconds since the board was started, so they
+    stay compact in the file. Loading a board resumes its clock, so new
+    strokes continue after the ones already recorded.
+    """
+
+    def __init__(self):
+        self.origin = time.monotonic()
+
+    def now(self):
+        return int((time.monotonic() - self.origin) * 1000)
+
+    def resume(self, elapsed_ms):
+        """Continue the clock from a board recorded for elapsed_ms"""
+        self.origin = min(self.origin, time.monotonic() - elapsed_ms / 1000)
+
+
+def time_tag(ms):
+    return f"{TIME_TAG_PREFIX}{int(ms)}"
+
+
+def time_from_tags(tags):
+    """Return the timestamp held in a tag list (or space separated string), or None"""
+    if isinstance(tags, str):
+        tags = tags.split()
+    for tag in tags or ():
+        if tag.startswith(TIME_TAG_PREFIX) and tag[len(TIME_TAG_PREFIX):].isdigit():
+            return int(tag[len(TIME_TAG_PREFIX):])
+    return None
+
+
+def element_time(element):
+    """Timestamp of a saved page entry in either format"""
+    if "t" in element:
+        try:
+            return int(element["t"])
+        except (TypeError, ValueError):
+            return UNTIMED
+    options = element.get("options")
+    if options:
+        stamp = time_from_tags(options.get("tags"))
+        if stamp is not None:
+            return stamp
+    return UNTIMED
+
+
+def iter_page(elements, page=0):
+    """Yield (time, page, element) for one page in recording order"""
+    timed = [(element_time(element), index, element) for index, element in enumerate(elements)]
+    # The index keeps equal times (and untimed entries) in stacking order
+    timed.sort(key=lambda entry: (entry[0], entry[1]))
+    for stamp, _, element in timed:
+        yield stamp, page, element
+
+
+def page_start(elements):
+    """Time of a page's first entry in recording order, or None for an empty page"""
+    return min((element_time(element) for element in elements), default=None)
+
+
+def iter_session(page_sources):
+    """
+    Merge several pages into one stream in recording order.
+
+    page_sources yields (page index, start, load) for each page: start is
+    the time of its first entry (see page_start; None for an empty page)
+    and load() returns its elements. A page is only loaded and sorted when
+    the stream reaches its start, and is let go once it has been played
+    out, so only the pages drawn on at overlapping times are held at once.
+    """
+    pending = sorted(((start, page, load) for page, start, load in page_sources if start is not None),
+                     key=lambda source: (source[0], source[1]))
+    pending.reverse()
+    active = []     # (time, page, order, entry, stream) of the next entry of each loaded page
+    order = 0
+    while pending or active:
+        # Load every page that starts before the next entry of the pages loaded so far
+        while pending and (not active or pending[-1][0] <= active[0][0]):
+            start, page, load = pending.pop()
+            stream = iter_page(load(), page)
+            entry = next(stream, None)
+            if entry is not None:
+                order += 1
+                heapq.heappush(active, (entry[0], page, order, entry, stream))
+        if not active:
+            continue
+        _, page, _, entry, stream = active[0]
+        yield entry
+        following = next(stream, None)
+        if following is None:
+            heapq.heappop(active)
+        else:
+            order += 1
+            heapq.heapreplace(active, (following[0], page, order, following, stream))
@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinter import ttk
 from modules.tooltip import ToolTip
+from modules.layer_manager import LAYERS
 
 class ToolbarManager:
     def __init__(self, app):
@@ -49,6 +50,39 @@ class ToolbarManager:
         # Add shape dropdown menu
         self.create_shape_dropdown(tools_frame, button_width, button_padding)
         
+        # Selection tools share one button with a dropdown, like the shapes
+        self.select_button = ttk.Button(tools_frame, text="Select", width=6)
+        self.select_button.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
+        ToolTip(self.select_button, "Select, Move, Scale and Rotate")
+        
+        self.select_menu = tk.Menu(self.select_button, tearoff=0)
+        self.select_menu.add_command(label="Rectangle Select", command=lambda: self.app.set_tool("select"))
+        self.select_menu.add_command(label="Lasso Select", command=lambda: self.app.set_tool("lasso"))
+        self.select_menu.add_separator()
+        self.select_menu.add_command(label="Copy", accelerator="Ctrl+C", command=self.app.clipboard_manager.copy)
+        self.select_menu.add_command(label="Paste", accelerator="Ctrl+V", command=self.app.clipboard_manager.paste)
+        self.select_menu.add_command(label="Duplicate", accelerator="Ctrl+D",
+                                     command=self.app.clipboard_manager.duplicate)
+        self.select_button.configure(command=self.show_select_menu)
+        
+        # Text tool, with the size of new labels in its dropdown
+        self.text_button = ttk.Button(tools_frame, text="Text", width=5)
+        self.text_button.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
+        ToolTip(self.text_button, "Add or Edit Text Labels")
+        
+        self.text_size_var = tk.IntVar(value=self.app.text_font_size)
+        self.text_menu = tk.Menu(self.text_button, tearoff=0)
+        self.text_menu.add_command(label="Text Tool", command=lambda: self.app.set_tool("text"))
+        self.text_menu.add_separator()
+        for label, size in (("Small", 12), ("Medium", 16), ("Large", 24), ("Huge", 36)):
+            self.text_menu.add_radiobutton(
+                label=label,
+                value=size,
+                variable=self.text_size_var,
+                command=lambda: setattr(self.app, 'text_font_size', self.text_size_var.get())
+            )
+        self.text_button.configure(command=self.show_text_menu)
+        
         # Fix the clear button with proper error handling and lambda
         clear_btn = ttk.Button(
             tools_frame, 
@@ -128,6 +162,26 @@ class ToolbarManager:
         self.grid_button.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
         ToolTip(self.grid_button, "Toggle Grid Lines")
         
+        self.recognize_shapes_var = tk.BooleanVar(value=self.app.recognize_shapes)
+        recognize_btn = ttk.Checkbutton(
+            options_frame,
+            text="Snap Shapes",
+            variable=self.recognize_shapes_var,
+            command=lambda: setattr(self.app, 'recognize_shapes', self.recognize_shapes_var.get())
+        )
+        recognize_btn.pack(side=tk.LEFT, padx=button_padding)
+        
+        self.variable_width_var = tk.BooleanVar(value=self.app.variable_width)
+        variable_width_btn = ttk.Checkbutton(
+            options_frame,
+            text="Ink",
+            variable=self.variable_width_var,
+            command=lambda: setattr(self.app, 'variable_width', self.variable_width_var.get())
+        )
+        variable_width_btn.pack(side=tk.LEFT, padx=button_padding)
+        ToolTip(variable_width_btn, "Variable-Width Ink: Strokes Thin Out when Drawn Fast")
+        ToolTip(recognize_btn, "Turn Freehand Lines, Arrows, Boxes and Circles into Shapes")
+        
         # File operations frame
         file_frame = ttk.LabelFrame(self.toolbar, text="File")
         file_frame.pack(side=tk.LEFT, padx=5, pady=5)
@@ -162,6 +216,24 @@ class ToolbarManager:
         load_btn.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
         ToolTip(load_btn, "Load Whiteboard")
         
+        merge_btn = ttk.Button(
+            file_frame,
+            text="Merge",
+            command=self.app.file_manager.merge_whiteboards,
+            width=6
+        )
+        merge_btn.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
+        ToolTip(merge_btn, "Append the Pages of other Saved Boards")
+        
+        self.compare_button = ttk.Button(file_frame, text="Compare", width=8)
+        self.compare_button.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
+        ToolTip(self.compare_button, "Show what Differs from a Saved Board")
+        
+        self.compare_menu = tk.Menu(self.compare_button, tearoff=0)
+        self.compare_menu.add_command(label="Compare with File...", command=self.app.diff_manager.compare_with_file)
+        self.compare_menu.add_command(label="Stop Comparing", command=self.app.diff_manager.stop)
+        self.compare_button.configure(command=self.show_compare_menu)
+        
         # Page controls with tooltips
         page_frame = ttk.LabelFrame(self.toolbar, text="Pages")
         page_frame.pack(side=tk.LEFT, padx=5, pady=5)
@@ -197,6 +269,132 @@ class ToolbarManager:
         )
         new_page_btn.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
         ToolTip(new_page_btn, "Add New Page")
+        
+        self.background_button = ttk.Button(page_frame, text="Background", width=11)
+        self.background_button.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
+        ToolTip(self.background_button, "Show an Image or PDF Slides behind the Page")
+        
+        self.background_menu = tk.Menu(self.background_button, tearoff=0)
+        self.background_menu.add_command(label="Image...", command=self.app.background_manager.import_image)
+        self.background_menu.add_command(label="PDF Slides...", command=self.app.background_manager.import_pdf)
+        self.background_menu.add_separator()
+        self.background_menu.add_command(label="Remove Background",
+                                         command=self.app.background_manager.remove_background)
+        self.background_button.configure(command=self.show_background_menu)
+        
+        self.replay_button = ttk.Button(page_frame, text="Replay", width=7)
+        self.replay_button.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
+        ToolTip(self.replay_button, "Replay how the Board was Drawn")
+        
+        self.replay_menu = tk.Menu(self.replay_button, tearoff=0)
+        self.replay_menu.add_command(label="Replay This Page", command=self.app.replay_manager.replay_page)
+        self.replay_menu.add_command(label="Replay Whole Board", command=self.app.replay_manager.replay_board)
+        self.replay_menu.add_separator()
+        self.replay_menu.add_command(label="Export Replay Video...", command=self.app.replay_manager.export_video)
+        self.replay_button.configure(command=self.show_replay_menu)
+        
+        # Text search across all pages: Enter jumps to the next match, Shift+Enter to the previous
+        search_frame = ttk.LabelFrame(self.toolbar, text="Search")
+        search_frame.pack(side=tk.LEFT, padx=5, pady=5)
+        
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=16)
+        self.search_entry.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
+        self.search_entry.bind("<Return>", lambda e: self._find_text())
+        self.search_entry.bind("<Shift-Return>", lambda e: self._find_text(backwards=True))
+        ToolTip(self.search_entry, "Find Text on any Page (Enter: Next, Shift+Enter: Previous)")
+        
+        self.search_info = ttk.Label(search_frame, text="", width=7)
+        self.search_info.pack(side=tk.LEFT, padx=button_padding)
+        
+        # Layer controls: the layer drawn on, and whether it is shown or locked
+        layer_frame = ttk.LabelFrame(self.toolbar, text="Layers")
+        layer_frame.pack(side=tk.LEFT, padx=5, pady=5)
+        
+        self.layer_choice = ttk.Combobox(
+            layer_frame,
+            values=[name.title() for name in LAYERS],
+            width=11,
+            state="readonly"
+        )
+        self.layer_choice.bind(
+            "<<ComboboxSelected>>",
+            lambda e: self.app.layer_manager.set_current(self.layer_choice.get().lower())
+        )
+        self.layer_choice.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
+        ToolTip(self.layer_choice, "Layer to Draw on")
+        
+        self.layer_visible_var = tk.BooleanVar(value=True)
+        layer_visible_btn = ttk.Checkbutton(
+            layer_frame,
+            text="Show",
+            variable=self.layer_visible_var,
+            command=lambda: self.app.layer_manager.set_visible(
+                self.app.layer_manager.current, self.layer_visible_var.get())
+        )
+        layer_visible_btn.pack(side=tk.LEFT, padx=button_padding)
+        ToolTip(layer_visible_btn, "Show or Hide this Layer")
+        
+        self.layer_locked_var = tk.BooleanVar(value=False)
+        layer_locked_btn = ttk.Checkbutton(
+            layer_frame,
+            text="Lock",
+            variable=self.layer_locked_var,
+            command=lambda: self.app.layer_manager.set_locked(
+                self.app.layer_manager.current, self.layer_locked_var.get())
+        )
+        layer_locked_btn.pack(side=tk.LEFT, padx=button_padding)
+        ToolTip(layer_locked_btn, "Lock this Layer against Drawing and Erasing")
+        self.app.layer_manager._sync_controls()
+        
+        # Shared session controls
+        session_frame = ttk.LabelFrame(self.toolbar, text="Session")
+        session_frame.pack(side=tk.LEFT, padx=5, pady=5)
+        
+        host_btn = ttk.Button(
+            session_frame,
+            text="Host",
+            command=self.app.collaboration_manager.prompt_host,
+            width=6
+        )
+        host_btn.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
+        ToolTip(host_btn, "Host a Shared Board")
+        
+        join_btn = ttk.Button(
+            session_frame,
+            text="Join",
+            command=self.app.collaboration_manager.prompt_connect,
+            width=6
+        )
+        join_btn.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
+        ToolTip(join_btn, "Join a Shared Board")
+        
+        leave_btn = ttk.Button(
+            session_frame,
+            text="Leave",
+            command=self._leave_sessions,
+            width=6
+        )
+        leave_btn.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
+        ToolTip(leave_btn, "Leave the Shared Board or Broadcast")
+        
+        present_btn = ttk.Button(
+            session_frame,
+            text="Present",
+            command=self.app.broadcast_manager.prompt_present,
+            width=7
+        )
+        present_btn.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
+        ToolTip(present_btn, "Broadcast this Board to Viewers")
+        
+        watch_btn = ttk.Button(
+            session_frame,
+            text="Watch",
+            command=self.app.broadcast_manager.prompt_watch,
+            width=6
+        )
+        watch_btn.pack(side=tk.LEFT, padx=button_padding, pady=button_padding)
+        ToolTip(watch_btn, "Watch a Broadcast (read-only)")
     
     def update_page_label(self, page_number):
         self.page_label.config(text=f"Page {page_number + 1}")
@@ -231,6 +429,27 @@ class ToolbarManager:
             import traceback
             traceback.print_exc()
     
+    def focus_search(self):
+        if hasattr(self, 'search_entry'):
+            self.search_entry.focus_set()
+            self.search_entry.select_range(0, tk.END)
+    
+    def _find_text(self, backwards=False):
+        """Jump to the next match of the search box's text and show which match it is"""
+        try:
+            position, count = self.app.search_manager.find_next(self.search_var.get(), backwards)
+            self.search_info.config(text=f"{position}/{count}" if count else "None")
+        except Exception as e:
+            print(f"Error searching: {e}")
+    
+    def _leave_sessions(self):
+        """Disconnect from any shared session or broadcast"""
+        try:
+            self.app.collaboration_manager.disconnect()
+            self.app.broadcast_manager.disconnect()
+        except Exception as e:
+            print(f"Error leaving session: {e}")
+    
     def _safe_clear_canvas(self):
         """Safely call the clear_canvas method with proper error handling"""
         try:
@@ -296,6 +515,51 @@ class ToolbarManager:
         except Exception as e:
             print(f"Error showing shape menu: {e}")
     
+    def show_select_menu(self):
+        """Show the selection tools dropdown menu"""
+        try:
+            x = self.select_button.winfo_rootx()
+            y = self.select_button.winfo_rooty() + self.select_button.winfo_height()
+            self.select_menu.post(x, y)
+        except Exception as e:
+            print(f"Error showing select menu: {e}")
+    
+    def show_text_menu(self):
+        """Show the text tool dropdown menu"""
+        try:
+            x = self.text_button.winfo_rootx()
+            y = self.text_button.winfo_rooty() + self.text_button.winfo_height()
+            self.text_menu.post(x, y)
+        except Exception as e:
+            print(f"Error showing text menu: {e}")
+    
+    def show_compare_menu(self):
+        """Show the board comparison dropdown menu"""
+        try:
+            x = self.compare_button.winfo_rootx()
+            y = self.compare_button.winfo_rooty() + self.compare_button.winfo_height()
+            self.compare_menu.post(x, y)
+        except Exception as e:
+            print(f"Error showing compare menu: {e}")
+    
+    def show_background_menu(self):
+        """Show the page background dropdown menu"""
+        try:
+            x = self.background_button.winfo_rootx()
+            y = self.background_button.winfo_rooty() + self.background_button.winfo_height()
+            self.background_menu.post(x, y)
+        except Exception as e:
+            print(f"Error showing background menu: {e}")
+    
+    def show_replay_menu(self):
+        """Show the replay dropdown menu"""
+        try:
+            x = self.replay_button.winfo_rootx()
+            y = self.replay_button.winfo_rooty() + self.replay_button.winfo_height()
+            self.replay_menu.post(x, y)
+        except Exception as e:
+            print(f"Error showing replay menu: {e}")
+    
     def toggle_grid(self):
         """Toggle grid visibility on the canvas"""
         try:
@@ -16,6 +16,17 @@ from modules.canvas_manager import CanvasManager
 from modules.toolbar_manager import ToolbarManager
 from modules.page_manager import PageManager
 from modules.file_manager import FileManager
+from modules.collaboration_manager import CollaborationManager
+from modules.broadcast_manager import BroadcastManager
+from modules.thumbnail_manager import ThumbnailManager
+from modules.replay_manager import ReplayManager
+from modules.layer_manager import LayerManager
+from modules.selection_manager import SelectionManager
+from modules.clipboard_manager import ClipboardManager
+from modules.background_manager import BackgroundManager
+from modules.search_manager import SearchManager
+from modules.text_manager import TextManager
+from modules.diff_manager import DiffManager
 from modules.tooltip import ToolTip  # Import the new ToolTip class
 
 class DigitalWhiteboard:
@@ -31,6 +42,12 @@ class DigitalWhiteboard:
         self.is_dark_mode = False
         self.grid_visible = False
         self.zoom_level = 1.0
+        self.read_only = False  # Set while watching a broadcast
+        self.recognize_shapes = False  # Turn freehand strokes into shapes when they look like one
+        self.variable_width = False  # Brush strokes thin out when drawn fast, as one filled outline (replays whole)
+        self.text_font_family = "Arial"  # Font of new labels made with the text tool
+        self.text_font_size = 16
+        self.page_memory_budget = 64 * 1024 * 1024  # Bytes of packed inactive pages kept in RAM
 
         # Create main container
         self.main_container = ttk.Frame(self.root)
@@ -45,13 +62,27 @@ class DigitalWhiteboard:
 
         # Initialize managers in order of dependency
         self.canvas_manager = CanvasManager(self)
+        self.layer_manager = LayerManager(self)
+        self.selection_manager = SelectionManager(self)
+        self.clipboard_manager = ClipboardManager(self)
+        self.text_manager = TextManager(self)
         self.file_manager = FileManager(self)
         self.page_manager = PageManager(self)  # Page manager needs the canvas manager
+        self.background_manager = BackgroundManager(self)  # Uses the page manager's asset store
+        self.search_manager = SearchManager(self)
+        self.diff_manager = DiffManager(self)
+        self.collaboration_manager = CollaborationManager(self)
+        self.broadcast_manager = BroadcastManager(self)
+        self.thumbnail_manager = ThumbnailManager(self)
+        self.replay_manager = ReplayManager(self)
         self.toolbar_manager = ToolbarManager(self)  # Toolbar manager needs the page manager
 
         # Now create the toolbar once all managers are available
         self.toolbar_manager.create_toolbar(self.toolbar_container)
 
+        # Page thumbnails on the left of the canvas
+        self.thumbnail_manager.create_sidebar(self.main_container)
+
         # Create canvas
         self.canvas_frame = ttk.Frame(self.main_container)
         self.canvas_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
@@ -68,6 +99,19 @@ class DigitalWhiteboard:
         self.canvas_manager.setup_bindings()
         self.root.bind("<Control-z>", lambda e: self.canvas_manager.undo())
         self.root.bind("<Control-y>", lambda e: self.canvas_manager.redo())
+        self.root.bind("<Control-c>", self._outside_entries(self.clipboard_manager.copy))
+        self.root.bind("<Control-v>", self._outside_entries(self.clipboard_manager.paste))
+        self.root.bind("<Control-d>", self._outside_entries(self.clipboard_manager.duplicate))
+        self.root.bind("<Control-f>", lambda e: self.toolbar_manager.focus_search())
+
+    @staticmethod
+    def _outside_entries(action):
+        """Key handler for action that leaves the keys to text fields (search box, combo boxes) with focus"""
+        def handler(event):
+            # ttk.Entry and ttk.Combobox are tk.Entry subclasses
+            if not isinstance(event.widget, tk.Entry):
+                action()
+        return handler
 
     def load_icons(self):
         """Load tool icons from the Images folder"""
@@ -125,8 +169,16 @@ class DigitalWhiteboard:
     def set_tool(self, tool):
         """Change the current drawing tool"""
         self.current_tool = tool
+        if tool not in ("select", "lasso"):
+            self.selection_manager.clear()
+        if tool != "text":
+            self.text_manager.finish()
         if tool == "eraser":
             self.canvas_manager.canvas.config(cursor="circle")
+        elif tool in ("select", "lasso"):
+            self.canvas_manager.canvas.config(cursor="arrow")
+        elif tool == "text":
+            self.canvas_manager.canvas.config(cursor="xterm")
         else:
             self.canvas_manager.canvas.config(cursor="crosshair")
 
@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from modules.asset_store import AssetStore, sha256_bytes
+
+
+@pytest.fixture
+def store():
+    store = AssetStore()
+    yield store
+    store.clear()
+
+
+def test_imported_file_is_copied(tmp_path, store):
+    source = tmp_path / "slide.png"
+    source.write_bytes(b"original")
+    digest = store.add_file(source)
+    assert digest == sha256_bytes(b"original")
+    # Editing or deleting the original does not change the board
+    source.write_bytes(b"edited")
+    assert store.read(digest) == b"original"
+    os.remove(source)
+    assert store.read(digest) == b"original"
+    with store.open(digest) as f:
+        assert f.read() == b"original"
+    assert store.to_json([digest])[digest]["data"]
+
+
+def test_same_content_is_stored_once(tmp_path, store):
+    for name in ("a.png", "b.png"):
+        (tmp_path / name).write_bytes(b"same")
+    assert store.add_file(tmp_path / "a.png") == store.add_file(tmp_path / "b.png")
+    assert len(store) == 1
+    assert len(os.listdir(os.path.dirname(store.local_path(sha256_bytes(b"same"))))) == 1
+
+
+def test_read_checks_the_hash(tmp_path, store):
+    source = tmp_path / "slide.png"
+    source.write_bytes(b"original")
+    digest = store.add_file(source)
+    with open(store.local_path(digest), "wb") as f:
+        f.write(b"tampered")
+    with pytest.raises(ValueError):
+        store.read(digest)
+
+
+def test_round_trip_through_json(store):
+    digest = store.add_bytes(b"\x00pdf bytes")
+    loaded = AssetStore()
+    loaded.load_json(store.to_json([digest]))
+    assert digest in loaded
+    path = loaded.local_path(digest)
+    assert path == loaded.local_path(digest)
+    with open(path, "rb") as f:
+        assert f.read() == b"\x00pdf bytes"
+    loaded.clear()
+    assert not os.path.exists(path)
+    assert digest not in loaded
+
+
+def test_corrupt_embedded_blob(store):
+    store.load_json({"0" * 64: {"encoding": "base64", "data": "aGVsbG8="}})
+    with pytest.raises(ValueError):
+        store.read("0" * 64)
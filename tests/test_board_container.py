@@ -0,0 +1,112 @@
+import json
+import sys
+import zlib
+
+import pytest
+
+from modules.board_container import (BoardContainer, MappedPages, available_codecs, decode_binary_page,
+                                     encode_binary_page, main, sniff, write_container)
+from modules.board_stream import write_board
+from modules.page_store import content_digest
+from modules.timeline import page_start
+
+SETTINGS = {"version": "1.1", "current_page_index": 0}
+TRAILER = {"timeline_ms": 1234}
+
+
+def page(number, size=30):
+    return {"background_color": "#FFFFFF", "elements": [
+        {"type": "line", "points": [number + i * 0.5, i, i, number], "color": "red", "t": i} for i in range(size)]}
+
+
+def write(tmp_path, pages, codec, name="board.wbz"):
+    path = tmp_path / name
+    with open(path, "wb") as f:
+        assert write_container(f, SETTINGS, iter(pages), TRAILER, codec=codec) == len(pages)
+    return str(path)
+
+
+@pytest.mark.parametrize("codec", available_codecs())
+def test_round_trip(tmp_path, codec):
+    pages = [page(number) for number in range(5)]
+    path = write(tmp_path, pages, codec)
+    assert sniff(path) == "container"
+    with BoardContainer(path) as board:
+        assert board.codec == codec and not board.recovered
+        assert board.settings == SETTINGS and board.trailer == TRAILER
+        assert len(board) == 5
+        assert [board.read_page(number) for number in (3, 0)] == [pages[3], pages[0]]
+        blob, count, digest, background, start = board.packed_page(2)
+        unpacked = json.loads(zlib.decompress(blob))
+        # zlib pages are handed over as stored, checksum included
+        unpacked.pop("checksum", None)
+        assert unpacked == pages[2]
+        assert (count, digest, background) == (30, content_digest(pages[2]["elements"]), None)
+        assert start == page_start(pages[2]["elements"])
+
+
+def test_binary_pages_come_back_exactly():
+    shown = {"objects": [
+        {"type": "line", "coords": [1.5, 2.0, 3.25, 4.0], "options": {"fill": "black"}},
+        {"type": "text", "coords": [1, 2], "options": {"text": "ints stay ints"}},
+        {"type": "polygon", "coords": [1, 2.5, "3"], "options": {}},
+    ], "background": {"hash": "a" * 64}}
+    decoded = decode_binary_page(encode_binary_page(shown))
+    assert decoded == shown
+    assert [type(value) for value in decoded["objects"][1]["coords"]] == [int, int]
+    assert json.dumps(decoded) == json.dumps(shown)
+
+
+def test_mapped_pages(tmp_path):
+    pages = [page(number) for number in range(3)]
+    with BoardContainer(write(tmp_path, pages, "none")) as board:
+        mapped = MappedPages(board).pages()
+        assert [packed.object_count for packed in mapped] == [30, 30, 30]
+        assert [packed.start for packed in mapped] == [0, 0, 0]
+        assert mapped[1]["elements"] == pages[1]["elements"]
+        assert mapped[2].unpack() == pages[2]
+
+
+@pytest.mark.parametrize("codec", ["zlib", "none"])
+def test_cut_off_file_keeps_its_complete_pages(tmp_path, codec):
+    path = write(tmp_path, [page(number) for number in range(4)], codec)
+    with open(path, "rb") as f:
+        data = f.read()
+    with BoardContainer(path) as board:
+        # Cut part way through the last page, so the trailer and index are lost
+        cut = board.entries[3]["at"] + board.entries[3]["size"] // 2
+    truncated = tmp_path / "cut.wbz"
+    truncated.write_bytes(data[:cut])
+    with BoardContainer(str(truncated)) as board:
+        assert board.recovered
+        assert len(board) == 3
+        assert board.settings == SETTINGS and board.trailer == {}
+        assert board.read_page(2) == page(2)
+
+
+def test_damaged_page_fails_its_checksum(tmp_path):
+    path = write(tmp_path, [page(0), page(1)], "zlib")
+    with BoardContainer(path) as board:
+        at = board.entries[1]["at"]
+    with open(path, "r+b") as f:
+        f.seek(at + 5)
+        byte = f.read(1)
+        f.seek(at + 5)
+        f.write(bytes([byte[0] ^ 0xFF]))
+    with BoardContainer(path) as board:
+        assert board.read_page(0) == page(0)
+        with pytest.raises(ValueError):
+            board.read_page(1)
+        assert MappedPages(board).load(1) == {"elements": [], "background_color": "#FFFFFF"}
+
+
+def test_pack_skips_pages_that_fail_their_checksum(tmp_path, monkeypatch):
+    source = tmp_path / "board.wb"
+    with open(source, "w", encoding="utf-8") as f:
+        write_board(f, SETTINGS, [page(0), page(1), page(2)])
+    source.write_text(source.read_text(encoding="utf-8").replace("[1.0,0,0,1]", "[1.0,0,0,2]"), encoding="utf-8")
+    output = tmp_path / "board.wbz"
+    monkeypatch.setattr(sys, "argv", ["board_container", "pack", str(source), str(output), "--codec", "zlib"])
+    assert main() == 0
+    with BoardContainer(str(output)) as board:
+        assert [board.read_page(number) for number in range(len(board))] == [page(0), page(2)]
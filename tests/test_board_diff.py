@@ -0,0 +1,56 @@
+from modules.board_diff import diff_boards, diff_items, element_key, merge_boards, merge_items
+
+
+def line(x, color="black"):
+    return {"type": "line", "points": [x, 0, x, 10], "color": color, "width": 2, "t": x}
+
+
+def test_element_key_ignores_time_and_page_format():
+    saved = line(1)
+    shown = {"type": "line", "coords": [1.0, 0.0, 1.0, 10.0],
+             "options": {"fill": "black", "width": "2.0", "tags": "layer_ink t_99"}}
+    assert element_key(saved) == element_key(dict(saved, t=5)) == element_key(shown)
+    assert element_key(saved) != element_key(line(1, "red"))
+    assert element_key(saved) != element_key(dict(saved, layer="background"))
+
+
+def test_diff_items_counts_duplicates():
+    old = [line(1), line(2), line(2)]
+    new = [line(2), line(3), line(1)]
+    assert diff_items(old, new) == ([2], [1])
+
+
+def test_diff_boards_reports_changed_and_extra_pages():
+    old = [{"elements": [line(1)]}, {"elements": [line(2)]}]
+    new = [{"elements": [line(1)]}, {"elements": []}, {"elements": [line(3)]}]
+    assert diff_boards(old, new) == [
+        {"page": 1, "removed": [0], "added": [], "unchanged": 0},
+        {"page": 2, "removed": [], "added": [0], "unchanged": 0},
+    ]
+
+
+def test_merge_items_keeps_both_sides_changes():
+    base = [line(1), line(2)]
+    ours = [line(1), line(2), line(3)]         # added 3
+    theirs = [line(2), line(4)]                # erased 1, added 4
+    assert merge_items(base, ours, theirs) == [line(2), line(3), line(4)]
+
+
+def test_merge_boards():
+    background = {"hash": "b" * 64, "kind": "image"}
+    base = {"current_page_index": 1, "pages": [{"elements": [line(1)]}, {"elements": [line(2)]}]}
+    ours = {"current_page_index": 1, "pages": [{"elements": [line(1), line(5)], "background": background},
+                                               {"elements": [line(2)]}]}
+    theirs = {"current_page_index": 0, "pages": [{"elements": []}]}
+    merged, conflicts = merge_boards(base, ours, theirs)
+    # Theirs erased the first stroke and deleted page 2, which ours left as it was
+    assert [page["elements"] for page in merged["pages"]] == [[line(5)]]
+    assert merged["pages"][0]["background"] == background
+    assert merged["current_page_index"] == 0
+    assert conflicts == []
+
+    theirs = {"pages": [{"elements": [line(1)], "background": dict(background, hash="c" * 64)},
+                        {"elements": [line(2)]}]}
+    merged, conflicts = merge_boards(base, ours, theirs)
+    assert merged["pages"][0]["background"] == background
+    assert conflicts == ["Page 1: both sides changed the background; kept ours"]
@@ -0,0 +1,83 @@
+import json
+import zlib
+
+from modules.board_container import write_container
+from modules.board_reader import BOARD_VERSION, load_board, stream_board
+from modules.board_stream import write_board
+
+
+def page(number):
+    return {"elements": [{"type": "line", "points": [number, 0, number, 10], "color": "red"}],
+            "background_color": "#FFFFFF"}
+
+
+def damaged_board(tmp_path, current):
+    """A four page board saved on page current, whose first page no longer matches its checksum"""
+    path = tmp_path / "board.wb"
+    with open(path, "w", encoding="utf-8") as f:
+        write_board(f, {"current_page_index": current}, [page(number) for number in range(4)])
+    text = path.read_text(encoding="utf-8")
+    path.write_text(text.replace('"points":[0,0,0,10]', '"points":[0,0,0,11]'), encoding="utf-8")
+    return str(path)
+
+
+def test_load_board_moves_the_current_page_past_skipped_pages(tmp_path):
+    data, problems = load_board(damaged_board(tmp_path, current=2))
+    assert data["pages"] == [page(1), page(2), page(3)]
+    assert data["current_page_index"] == 1
+    assert problems == ["Pages that failed their checksum were skipped: 1"]
+
+
+def test_stream_board_reports_skipped_pages(tmp_path):
+    messages = list(stream_board(damaged_board(tmp_path, current=2)))
+    assert ("skipped", 0) in messages
+    shown = [message[1] for message in messages if message[0] == "page" and message[1] is not None]
+    assert shown == [page(2)]
+    assert messages[-1] == ("end", ["Page 1 failed its checksum and was skipped"])
+
+
+def white_board(tmp_path, settings, trailer=None):
+    path = tmp_path / "white.wb"
+    with open(path, "w", encoding="utf-8") as f:
+        write_board(f, settings, [{"elements": [
+            {"type": "line", "points": [0, 0, 5, 5], "color": "white"},
+            {"type": "rectangle", "x1": 0, "y1": 0, "x2": 5, "y2": 5, "outline": "#FFFFFF", "fill": "white"},
+        ]}], trailer)
+    return str(path)
+
+
+def loaded_pages(path):
+    """The first page as load_board() and stream_board() return it"""
+    return (load_board(path)[0]["pages"][0],
+            next(message[1] for message in stream_board(path) if message[0] == "page"))
+
+
+def test_white_ink_of_older_dark_mode_boards_becomes_ink(tmp_path):
+    # Older boards were saved with the settings after the pages
+    path = white_board(tmp_path, {}, {"version": "1.0", "is_dark_mode": True})
+    for loaded in loaded_pages(path):
+        assert loaded["elements"][0]["color"] == "black"
+        assert loaded["elements"][1]["outline"] == "black"
+        assert loaded["elements"][1]["fill"] == "white"
+
+
+def test_white_stays_white_on_light_and_current_boards(tmp_path):
+    for settings, trailer in (({}, {"version": "1.0", "is_dark_mode": False}),
+                              ({"version": BOARD_VERSION, "is_dark_mode": True}, None)):
+        path = white_board(tmp_path, settings, trailer)
+        for loaded in loaded_pages(path):
+            assert loaded["elements"][0]["color"] == "white"
+            assert loaded["elements"][1]["outline"] == "#FFFFFF"
+
+
+def test_packed_older_boards_are_mapped_too(tmp_path):
+    path = tmp_path / "white.wbz"
+    with open(path, "wb") as f:
+        write_container(f, {"version": "1.0"}, [{"elements": [
+            {"type": "line", "points": [0, 0, 5, 5], "color": "white"}]}] * 2,
+            {"is_dark_mode": True}, codec="zlib")
+    assert load_board(str(path))[0]["pages"][1]["elements"][0]["color"] == "black"
+    messages = list(stream_board(str(path)))
+    assert messages[1] == ("page", {"elements": [{"type": "line", "points": [0, 0, 5, 5], "color": "black"}]}, None)
+    blob = next(message[2][0] for message in messages if message[0] == "page" and message[1] is None)
+    assert json.loads(zlib.decompress(blob))["elements"][0]["color"] == "black"
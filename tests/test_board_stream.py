@@ -0,0 +1,82 @@
+import io
+import json
+
+import pytest
+
+from modules.board_stream import (CHECKSUM_KEY, BoardStream, iter_board, page_checksum, page_text,
+                                  page_text_intact, recover_board, write_board)
+
+SETTINGS = {"version": "1.1", "current_page_index": 1}
+TRAILER = {"text_index": {"pages": {}, "terms": {}}}
+
+
+def page(number, size=20):
+    return {"elements": [{"type": "line", "points": [number, i, i, number], "color": "red"} for i in range(size)],
+            "background_color": "#FFFFFF"}
+
+
+def saved(pages, trailer=TRAILER):
+    f = io.StringIO()
+    assert write_board(f, SETTINGS, iter(pages), trailer) == len(pages)
+    return f.getvalue()
+
+
+def test_written_board_is_json_with_page_checksums():
+    data = json.loads(saved([page(0), page(1)]))
+    assert data["current_page_index"] == 1
+    assert data["text_index"] == TRAILER["text_index"]
+    for number, stored in enumerate(data["pages"]):
+        assert stored[CHECKSUM_KEY] == page_checksum(stored)
+        del stored[CHECKSUM_KEY]
+        assert stored == page(number)
+
+
+def test_page_text_intact():
+    text = page_text(page(3))
+    assert page_text_intact(text) is True
+    assert page_text_intact(text.replace("[3,0,0,3]", "[3,0,0,4]")) is False
+    assert page_text_intact(json.dumps(page(3))) is None
+
+
+def test_iter_board_in_file_order_with_small_reads(monkeypatch):
+    # Values span many reads
+    monkeypatch.setattr(BoardStream, "CHUNK_SIZE", 64)
+    text = saved([page(0), page(1), page(2)], trailer=lambda: {"late": True})
+    entries = list(iter_board(io.StringIO(text), verify=True))
+    assert [key for key, _ in entries] == ["version", "current_page_index", "pages", "pages", "pages", "late"]
+    assert [value for key, value in entries if key == "pages"] == [page(0), page(1), page(2)]
+
+
+def test_iter_board_leaves_the_checksum_on_damaged_pages():
+    text = saved([page(0), page(1)]).replace("[1,0,0,1]", "[1,0,0,2]")
+    pages = [value for key, value in iter_board(io.StringIO(text), verify=True) if key == "pages"]
+    assert CHECKSUM_KEY not in pages[0]
+    assert pages[1][CHECKSUM_KEY] != page_checksum(pages[1])
+
+
+def test_iter_board_raises_on_a_cut_off_file():
+    text = saved([page(0), page(1)])
+    with pytest.raises(ValueError):
+        list(iter_board(io.StringIO(text[:len(text) // 2])))
+
+
+def test_recover_skips_unreadable_pages():
+    lines = saved([page(0), page(1), page(2)]).split("\n")
+    # Pages are written one per line
+    number = next(i for i, line in enumerate(lines) if "[1,0,0,1]" in line)
+    lines[number] = lines[number].replace('"elements":[', '"elements":[#garbage#')
+    text = "\n".join(lines)
+    data, report = recover_board(io.StringIO(text))
+    assert report == {"unreadable": [2], "partial": None, "truncated": False}
+    assert [stored["elements"] for stored in data["pages"]] == [page(0)["elements"], page(2)["elements"]]
+    assert data["text_index"] == TRAILER["text_index"]
+
+
+def test_recover_keeps_the_complete_strokes_of_a_cut_off_page():
+    text = saved([page(0), page(1)])
+    cut = text.index("[1,10,10,1]")
+    data, report = recover_board(io.StringIO(text[:cut]))
+    assert report == {"unreadable": [], "partial": 2, "truncated": True}
+    assert data["pages"][0] == dict(page(0), **{CHECKSUM_KEY: page_checksum(page(0))})
+    assert data["pages"][1]["elements"] == page(1)["elements"][:10]
+    assert "text_index" not in data
@@ -0,0 +1,88 @@
+"""Broadcast pages of any size reach viewers and late joiners whole"""
+import asyncio
+
+from modules.broadcast_server import PAGE_CHUNK_OBJECTS, BroadcastServer, page_ops
+from modules.sync_server import FRAME_LIMIT, decode_message, encode_message
+
+
+def objects(count):
+    return [{"type": "line", "coords": [i, 0, i + 8, 8], "options": {"fill": "black", "width": 2.0}}
+            for i in range(count)]
+
+
+def test_page_ops_chunks():
+    page = objects(PAGE_CHUNK_OBJECTS * 2 + 1)
+    ops = page_ops(3, page)
+    assert [op["op"] for op in ops] == ["page", "page_more", "page_more"]
+    assert [op["more"] for op in ops] == [True, True, False]
+    assert sum((op["objects"] for op in ops), []) == page
+    assert page_ops(0, []) == [{"op": "page", "page": 0, "objects": [], "more": False}]
+
+
+async def read_ops(reader, until):
+    ops = []
+    while not until(ops):
+        message = decode_message(await asyncio.wait_for(reader.readline(), 5))
+        ops.extend(message.get("snapshot", []) + message.get("ops", []))
+    return ops
+
+
+def page_objects(ops):
+    return [item for op in ops if op.get("op") in ("page", "page_more") for item in op["objects"]]
+
+
+def test_large_page_reaches_viewers_and_late_joiners():
+    page = objects(3000)
+
+    async def run():
+        server = BroadcastServer(port=0)
+        await server.start()
+        connections = []
+
+        async def join(role):
+            reader, writer = await asyncio.open_connection(server.host, server.port, limit=FRAME_LIMIT)
+            writer.write(encode_message({"type": "hello", "client": role, "role": role}))
+            await writer.drain()
+            connections.append(writer)
+            return reader, writer
+
+        viewer, _ = await join("viewer")
+        _, presenter = await join("presenter")
+        presenter.write(encode_message({"type": "ops", "client": "presenter", "ops": page_ops(0, page)}))
+        await presenter.drain()
+        # The viewer first gets the empty page it joined on
+        received = await read_ops(viewer, lambda ops: len(page_objects(ops)) >= len(page))
+        late, _ = await join("viewer")
+        snapshot = await read_ops(late, lambda ops: len(page_objects(ops)) >= len(page))
+        assert len(server.presenters) == 1
+        for writer in connections:
+            writer.close()
+        await asyncio.sleep(0.1)    # Let the server see every client leave
+        await server.stop()
+        return received, snapshot
+
+    received, snapshot = asyncio.run(run())
+    assert page_objects(received) == page
+    assert page_objects(snapshot) == page
+
+
+def test_edits_of_page_objects_reach_late_joiners():
+    server = BroadcastServer(port=0)
+    presenter = object()
+    page = objects(3)
+    for index, obj in enumerate(page):
+        obj["options"]["tags"] = f"sync_p:{index} t_1"
+    ops = page_ops(0, page) + [
+        {"op": "erase", "page": 0, "id": "p:0"},
+        {"op": "transform", "page": 0, "id": "p:1", "transform": ["move", 10, 5]},
+    ]
+
+    async def run():
+        await server.handle_message({"type": "hello", "client": "presenter", "role": "presenter"}, presenter)
+        await server.handle_message({"type": "ops", "client": "presenter", "ops": ops}, presenter)
+
+    asyncio.run(run())
+    snapshot = server.snapshot()
+    assert [obj["coords"] for obj in page_objects(snapshot)] == [[11, 5, 19, 13], [2, 0, 10, 8]]
+    # The edits were applied to the page, not added to the document as well
+    assert [op["op"] for op in snapshot] == ["page"]
@@ -0,0 +1,97 @@
+import threading
+
+import pytest
+
+from modules.page_store import PackedPage, PageStore, content_digest
+from modules.timeline import UNTIMED
+
+
+def page(number, size=50):
+    return {"elements": [{"type": "line", "points": [number, i, i, number], "color": "red"} for i in range(size)],
+            "background_color": "#FFFFFF"}
+
+
+def test_pack_and_unpack():
+    store = PageStore()
+    packed = store.pack(page(1))
+    assert packed.object_count == 50
+    assert packed.digest == content_digest(page(1)["elements"])
+    assert packed.start == UNTIMED and store.pack({"objects": []}).start is None
+    assert packed.unpack() == page(1)
+    unpacked = packed.unpack()
+    unpacked["elements"].clear()
+    assert packed.unpack() == page(1)
+
+
+def test_pages_past_the_budget_are_spilled():
+    store = PageStore(memory_budget=2000)
+    pages = [store.pack(page(number)) for number in range(20)]
+    assert store.memory_used <= 2000
+    assert all(packed.unpack() == page(number) for number, packed in enumerate(pages))
+    pages[0].release()
+    pages[-1].release()
+    assert store.memory_used <= 2000
+    store.close()
+    assert store.memory_used == 0
+
+
+def test_mapping_access_decompresses_once():
+    store = PageStore()
+    background = {"kind": "image", "hash": "ab"}
+    packed = store.pack(dict(page(2), background=background))
+    assert packed.get("background") == background and store._recent is None
+    items = packed.get("objects") or packed.get("elements")
+    assert len(items) == 50 and packed["background_color"] == "#FFFFFF"
+    assert store._recent[0] == packed.key
+    assert isinstance(packed, PackedPage) and store.pack(page(3)).get("background") is None
+
+
+def test_readers_get_their_own_copy():
+    store = PageStore()
+    packed = store.pack(page(2))
+    packed["elements"].clear()
+    assert len(packed["elements"]) == 50
+    packed.release()
+    assert store._recent is None
+    with pytest.raises(KeyError):
+        packed["elements"]
+
+
+def test_spill_space_is_reused():
+    store = PageStore(memory_budget=0)
+    pages = [store.pack(page(number)) for number in range(10)]
+    size = store._spill_file.seek(0, 2)
+    for _ in range(20):
+        for number in range(0, 10, 2):
+            pages[number].release()
+            pages[number] = store.pack(page(number))
+    assert store._spill_file.seek(0, 2) <= size
+    assert all(packed.unpack() == page(number) for number, packed in enumerate(pages))
+    for packed in pages:
+        packed.release()
+    assert store._spill_file.seek(0, 2) == 0 and store._free == []
+
+
+def test_load_while_spilling():
+    store = PageStore(memory_budget=3000)
+    pages = [store.pack(page(number)) for number in range(5)]
+    errors = []
+    stop = threading.Event()
+
+    def read():
+        while not stop.is_set():
+            for number, packed in enumerate(pages[:5]):
+                try:
+                    assert packed.unpack() == page(number)
+                except Exception as e:
+                    errors.append(e)
+
+    workers = [threading.Thread(target=read) for _ in range(3)]
+    for worker in workers:
+        worker.start()
+    for number in range(5, 200):
+        pages.append(store.pack(page(number)))
+    stop.set()
+    for worker in workers:
+        worker.join()
+    assert errors == []
@@ -0,0 +1,50 @@
+import math
+
+from modules.shape_recognizer import RESAMPLE_POINTS, recognize, resample
+
+
+def flat(points):
+    return [value for point in points for value in point]
+
+
+def test_resample_spaces_points_evenly():
+    xs, ys = resample([0, 1, 60, 61, 63], [0, 0, 0, 0, 0])
+    assert len(xs) == len(ys) == RESAMPLE_POINTS
+    assert (xs[0], xs[-1]) == (0, 63)
+    steps = [x1 - x0 for x0, x1 in zip(xs, xs[1:])]
+    assert max(steps) - min(steps) < 1e-6
+
+
+def test_line():
+    points = [(x, 100 + (x % 3)) for x in range(0, 200, 5)]
+    kind, coords = recognize(flat(points))
+    assert kind == "line"
+    assert coords == [0, 100, 195, 100 + 195 % 3]
+
+
+def test_arrow():
+    shaft = [(x, 50) for x in range(0, 201, 5)]
+    head = [(200 - i * 4, 50 - i * 4) for i in range(1, 8)]
+    kind, coords = recognize(flat(shaft + head))
+    assert kind == "arrow"
+    assert coords[:2] == [0, 50]
+    # The tip is the resampled point nearest the turn
+    assert math.hypot(coords[2] - 200, coords[3] - 50) < 2 * 240 / RESAMPLE_POINTS
+
+
+def test_rectangle_and_oval():
+    side = range(0, 100, 5)
+    box = ([(x, 0) for x in side] + [(100, y) for y in side] +
+           [(100 - x, 100) for x in side] + [(0, 100 - y) for y in side] + [(0, 0)])
+    assert recognize(flat(box))[0] == "rectangle"
+    circle = [(50 + 50 * math.cos(a / 40 * 2 * math.pi), 50 + 50 * math.sin(a / 40 * 2 * math.pi))
+              for a in range(41)]
+    kind, coords = recognize(flat(circle))
+    assert kind == "oval"
+    assert all(abs(a - b) < 2 for a, b in zip(coords, [0, 0, 100, 100]))
+
+
+def test_small_and_scribbled_strokes_are_left_alone():
+    assert recognize([0, 0, 3, 3, 5, 1]) is None
+    zigzag = [(x, 0 if (x // 10) % 2 else 60) for x in range(0, 200, 10)]
+    assert recognize(flat(zigzag)) is None
@@ -0,0 +1,111 @@
+"""A sync server with several headless clients, over real sockets"""
+import json
+import time
+
+import pytest
+
+from modules.sync_client import SyncClient
+from modules.sync_document import SyncDocument
+from modules.sync_server import FRAME_BYTES, SyncServer, decode_message, encode_frames
+
+
+def wait_for(client, document, condition, timeout=5):
+    """Apply what client receives to document until condition(document) holds"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        for message in client.poll():
+            for op in message.get("snapshot", []) + message.get("ops", []):
+                document.apply(op)
+        if condition(document):
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def stroke_ops(client, page=0, points=20):
+    element_id = client.new_element_id()
+    return element_id, [
+        {"op": "begin", "page": page, "id": element_id, "color": "black", "width": 2, "pts": [0, 0]},
+        {"op": "pts", "page": page, "id": element_id, "pts": [float(i) for i in range(points)]},
+        {"op": "end", "page": page, "id": element_id},
+    ]
+
+
+@pytest.fixture
+def server():
+    server = SyncServer(port=0)
+    server.run_in_thread()
+    yield server
+
+
+@pytest.fixture
+def connect(server):
+    clients = []
+
+    def connect():
+        client = SyncClient(port=server.port)
+        client.start()
+        clients.append(client)
+        return client
+    yield connect
+    for client in clients:
+        client.stop()
+
+
+def test_encode_frames_splits_long_lists():
+    ops = [{"op": "pts", "id": "a:1", "pts": list(range(100))} for _ in range(500)]
+    frames = encode_frames({"type": "welcome", "seq": 7, "snapshot": ops}, "snapshot", next_type="snapshot")
+    assert len(frames) > 1
+    assert all(len(frame) < FRAME_BYTES + 1024 for frame in frames)
+    messages = [decode_message(frame) for frame in frames]
+    assert messages[0]["type"] == "welcome" and messages[0]["seq"] == 7
+    assert {message["type"] for message in messages[1:]} == {"snapshot"}
+    assert sum((message["snapshot"] for message in messages), []) == ops
+
+
+def test_encode_frames_empty_list():
+    (frame,) = encode_frames({"type": "ops", "ops": []}, "ops")
+    assert json.loads(frame) == {"type": "ops", "ops": []}
+
+
+def test_clients_converge(connect):
+    clients = [connect() for _ in range(3)]
+    documents = [SyncDocument() for _ in clients]
+    ids = []
+    for client in clients:
+        element_id, ops = stroke_ops(client)
+        ids.append(element_id)
+        for op in ops:
+            client.send(op)
+    for client, document in zip(clients, documents):
+        assert wait_for(client, document, lambda d: len(d.pages.get(0, {})) == len(ids))
+    orders = [list(document.pages[0]) for document in documents]
+    assert orders[0] == orders[1] == orders[2]
+    assert sorted(orders[0]) == sorted(ids)
+
+
+def test_late_joiner_gets_large_snapshot(server, connect):
+    writer = connect()
+    for _ in range(300):
+        for op in stroke_ops(writer, points=200)[1]:
+            writer.send(op)
+    assert wait_for(writer, SyncDocument(), lambda d: len(d.pages.get(0, {})) == 300)
+    assert len(json.dumps(server.document.snapshot())) > 64 * 1024
+
+    late = connect()
+    document = SyncDocument()
+    assert wait_for(late, document, lambda d: len(d.pages.get(0, {})) == 300)
+    assert late.error is None
+    assert all(element["done"] for element in document.pages[0].values())
+
+
+def test_large_batch_is_accepted(server, connect):
+    client = connect()
+    watcher = connect()
+    # Everything sent within one flush interval goes out as one batch
+    for _ in range(200):
+        for op in stroke_ops(client, points=300)[1]:
+            client.send(op)
+    document = SyncDocument()
+    assert wait_for(watcher, document, lambda d: len(d.pages.get(0, {})) == 200)
+    assert client.error is None and len(server.clients) == 2
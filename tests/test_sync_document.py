@@ -0,0 +1,95 @@
+import math
+
+from modules.sync_document import SyncDocument
+
+
+def stroke(element_id, page=0):
+    return [
+        {"op": "begin", "page": page, "id": element_id, "color": "black", "width": 2, "pts": [0, 0]},
+        {"op": "pts", "page": page, "id": element_id, "pts": [5, 5, 10, 10]},
+        {"op": "end", "page": page, "id": element_id},
+    ]
+
+
+def test_strokes_and_shapes_become_page_objects():
+    document = SyncDocument()
+    for op in stroke("a:1"):
+        assert document.apply(op)
+    assert document.apply({"op": "shape", "page": 0, "id": "a:2", "kind": "circle",
+                           "coords": [0, 0, 20, 20], "color": "red", "width": 3})
+    objects = document.to_page_objects(0)
+    assert [obj["type"] for obj in objects] == ["line", "oval"]
+    assert objects[0]["coords"] == [0, 0, 5, 5, 10, 10]
+    assert objects[1]["options"] == {"outline": "red", "width": 3}
+
+
+def test_erase_wins_over_later_edits():
+    document = SyncDocument()
+    ops = stroke("a:1")
+    document.apply(ops[0])
+    assert document.apply({"op": "erase", "page": 0, "id": "a:1"})
+    assert not document.apply(ops[1])
+    assert not document.apply(ops[0])
+    assert document.to_page_objects(0) == []
+
+
+def test_clear_tombstones_the_page():
+    document = SyncDocument()
+    for op in stroke("a:1") + stroke("b:1", page=1):
+        document.apply(op)
+    assert document.apply({"op": "clear", "page": 0})
+    assert not document.apply(stroke("a:1")[0])
+    assert document.to_page_objects(0) == []
+    assert len(document.to_page_objects(1)) == 1
+
+
+def test_snapshot_rebuilds_the_same_document():
+    document = SyncDocument()
+    for op in stroke("a:1") + stroke("b:1", page=2)[:2]:
+        document.apply({**op, "seq": 1})
+    document.apply({"op": "shape", "page": 2, "id": "b:2", "kind": "line", "coords": [0, 0, 1, 1]})
+    rebuilt = SyncDocument()
+    for op in document.snapshot():
+        assert rebuilt.apply(op)
+    assert rebuilt.pages == document.pages
+    assert document.snapshot(page=2) == [op for op in document.snapshot() if op["page"] == 2]
+
+
+def test_pages_are_keyed_by_id_and_inserted_in_sequence_order():
+    document = SyncDocument()
+    for op in stroke("a:1", page="p1"):
+        document.apply(op)
+    assert document.apply({"op": "add_page", "page": "a:2", "after": "p0"})
+    assert document.apply({"op": "add_page", "page": "b:1", "after": "p0"})
+    assert not document.apply({"op": "add_page", "page": "a:2", "after": "p1"})
+    assert document.page_order == ["p0", "b:1", "a:2"]
+    # Inserting pages does not move the elements of the others
+    assert len(document.to_page_objects("p1")) == 1
+    rebuilt = SyncDocument()
+    for op in document.snapshot():
+        assert rebuilt.apply(op)
+    assert rebuilt.page_order == document.page_order and rebuilt.pages == document.pages
+
+
+def test_text_and_transform_ops():
+    document = SyncDocument()
+    for op in stroke("a:1"):
+        document.apply(op)
+    document.apply({"op": "shape", "page": 0, "id": "a:2", "kind": "rectangle", "coords": [0, 0, 20, 10]})
+    assert document.apply({"op": "text", "page": 0, "id": "b:1", "x": 5, "y": 5, "text": "hi",
+                           "color": "red", "font_family": "Comic Sans MS", "font_size": 14})
+    assert document.apply({"op": "text", "page": 0, "id": "b:1", "text": "hello"})
+    assert not document.apply({"op": "text", "page": 0, "id": "a:2", "text": "no"})
+    for element_id in ("a:1", "a:2", "b:1"):
+        assert document.apply({"op": "transform", "page": 0, "id": element_id, "transform": ["move", 10, 1]})
+    assert not document.apply({"op": "transform", "page": 0, "id": "a:1", "transform": ["shear", 1]})
+    line, box, label = document.to_page_objects(0)
+    assert line["coords"] == [10, 1, 15, 6, 20, 11]
+    assert box["coords"] == [10, 1, 30, 11]
+    assert label["coords"] == [15, 6] and label["options"]["text"] == "hello"
+    assert label["options"]["font"] == "{Comic Sans MS} 14"
+    # Boxes stay axis-aligned when rotated: only their centre turns
+    assert document.apply({"op": "transform", "page": 0, "id": "a:2", "transform": ["rotate", 10, 1, math.pi]})
+    assert [round(value) for value in document.to_page_objects(0)[1]["coords"]] == [-10, -9, 10, 1]
+    assert document.apply({"op": "erase", "page": 0, "id": "b:1"})
+    assert not document.apply({"op": "text", "page": 0, "id": "b:1", "text": "late"})
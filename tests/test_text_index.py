@@ -0,0 +1,48 @@
+import json
+
+from modules.text_index import TextIndex, match_entries, text_entries
+
+PAGE_A = [{"type": "text", "x": 10, "y": 20, "text": "Quarterly results"},
+          {"type": "line", "points": [0, 0, 5, 5]},
+          {"type": "text", "x": 30, "y": 40, "text": "Next quarter plan"}]
+PAGE_B = [{"type": "text", "coords": [5, 6], "options": {"text": "results review"}}]
+
+
+def index():
+    text_index = TextIndex()
+    text_index.add_page("a", PAGE_A)
+    text_index.add_page("b", PAGE_B)
+    return text_index
+
+
+def test_text_entries_of_both_formats():
+    assert text_entries(PAGE_A) == [("Quarterly results", 10.0, 20.0), ("Next quarter plan", 30.0, 40.0)]
+    assert text_entries(PAGE_B) == [("results review", 5.0, 6.0)]
+
+
+def test_search_matches_every_word_and_the_last_as_a_prefix():
+    text_index = index()
+    assert text_index.search("results") == {"a": [0], "b": [0]}
+    assert text_index.search("quar") == {"a": [0, 1]}
+    assert text_index.search("results rev") == {"b": [0]}
+    assert text_index.search("plan results") == {}
+    assert text_index.search("  ") == {}
+    assert match_entries(text_entries(PAGE_A), ["next"], "quar") == [1]
+
+
+def test_removed_and_pruned_pages_are_not_found():
+    text_index = index()
+    text_index.remove_page("b")
+    assert text_index.search("review") == {}
+    text_index.prune(["b"])
+    assert text_index.search("results") == {}
+    assert not text_index.pages and not text_index.postings
+
+
+def test_saved_index_round_trip():
+    saved = json.loads(json.dumps(index().to_json(live_digests=["a"])))
+    assert set(saved["pages"]) == {"a"}
+    restored = TextIndex()
+    restored.load_json(saved)
+    assert "a" in restored and "b" not in restored
+    assert restored.search("quarter pl") == {"a": [1]}
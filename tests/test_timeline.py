@@ -0,0 +1,36 @@
+from modules.timeline import UNTIMED, element_time, iter_page, iter_session, page_start, time_from_tags
+
+
+def test_element_time_in_both_formats():
+    assert element_time({"t": 120}) == 120
+    assert element_time({"options": {"tags": "layer_ink t_45"}}) == 45
+    assert element_time({"type": "line"}) == UNTIMED
+    assert time_from_tags(("grid", "t_7")) == 7
+
+
+def test_iter_page_keeps_stacking_order_for_equal_times():
+    elements = [{"t": 5, "n": 0}, {"t": 1, "n": 1}, {"t": 5, "n": 2}, {"n": 3}]
+    assert [element["n"] for _, _, element in iter_page(elements)] == [3, 1, 0, 2]
+
+
+def test_iter_session_merges_in_time_order():
+    pages = {0: [{"t": 10}, {"t": 30}], 1: [{"t": 20}, {"t": 40}], 2: []}
+    sources = [(index, page_start(elements), lambda elements=elements: elements)
+               for index, elements in pages.items()]
+    assert [(stamp, page) for stamp, page, _ in iter_session(sources)] == [(10, 0), (20, 1), (30, 0), (40, 1)]
+
+
+def test_iter_session_loads_pages_when_reached():
+    loaded = []
+
+    def source(index, start):
+        def load():
+            loaded.append(index)
+            return [{"t": start}, {"t": start + 5}]
+        return index, start, load
+
+    stream = iter_session([source(0, 0), source(1, 100), source(2, 200)])
+    assert next(stream)[0] == 0
+    assert loaded == [0]
+    assert [entry[0] for entry in stream] == [5, 100, 105, 200, 205]
+    assert loaded == [0, 1, 2]
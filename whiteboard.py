@@ -53,6 +53,10 @@ def create_fallback_icon():
 from modules.whiteboard_app import DigitalWhiteboard
 
 if __name__ == "__main__":
+    # Replay export runs in a worker process, which frozen builds must allow
+    import multiprocessing
+    multiprocessing.freeze_support()
+    
     root = tk.Tk()
     
     # Set application icon with fallback
@@ -72,4 +76,7 @@ if __name__ == "__main__":
                 print("Could not create fallback icon, using default")
         
     app = DigitalWhiteboard(root)
+    # A board to open at startup, e.g. for a kiosk display
+    if len(sys.argv) > 1:
+        root.after(0, app.file_manager.load_file, sys.argv[1])
     root.mainloop()
\ No newline at end of file